@@ -0,0 +1,209 @@
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+LAMBDA_DIR = Path(__file__).resolve().parent.joinpath("lambda_functions")
+ARTIFACTS_DIR = Path(__file__).resolve().parent.joinpath("terraform", "files")
+# Must match 'runtime' of Lambda functions in terraform/lambda.tf
+LAMBDA_RUNTIME = "python3.11"
+# Lambda handler modules - one artifact per module with the module, shared modules and their bytecode only
+LAMBDA_MODULES = ["lambda_function_get", "lambda_function_post"]
+# Modules imported by all handlers - added to each artifact (zip root)
+LAMBDA_SHARED_MODULES = ["lambda_common"]
+# Fixed timestamp and permissions of zip entries - identical input gives identical zip
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644
+
+# Compile module with Lambda runtime's interpreter. Unchecked hash-based pyc is used without
+# comparing source mtime (extracted zip entries have fixed mtime) and doesn't embed build time.
+COMPILE_CODE = """
+import importlib.util, py_compile, sys
+source_path, pyc_path, module_filename = sys.argv[1:4]
+py_compile.compile(
+    source_path,
+    cfile=pyc_path,
+    dfile=module_filename,
+    doraise=True,
+    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+)
+print(importlib.util.cache_from_source(module_filename))
+"""
+
+# Single module import from extracted artifact - run in a fresh interpreter
+IMPORT_TIME_CODE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def get_runtime_python(runtime: str = LAMBDA_RUNTIME) -> Optional[str]:
+    """
+    Return path of interpreter matching Lambda runtime's Python version (None if not found).
+    """
+    version = runtime.removeprefix("python")
+    if f"{sys.version_info.major}.{sys.version_info.minor}" == version:
+        return sys.executable
+    return shutil.which(f"python{version}")
+
+
+def compile_module(python: str, source_path: Path) -> Dict[str, bytes]:
+    """
+    Return bytecode of module as {zip entry name: pyc content}.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pyc_path = Path(tmp_dir).joinpath("module.pyc")
+        pyc_name = subprocess.run(
+            args=[
+                python,
+                "-c",
+                COMPILE_CODE,
+                str(source_path),
+                str(pyc_path),
+                source_path.name,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        return {pyc_name: pyc_path.read_bytes()}
+
+
+def get_artifact_files(module: str, python: Optional[str]) -> Dict[str, bytes]:
+    """
+    Return files of module's artifact (module and shared modules) as {zip entry name: content}.
+    Bytecode is added only if interpreter matching Lambda runtime is available.
+    """
+    files = {}
+    for artifact_module in [module, *LAMBDA_SHARED_MODULES]:
+        source_path = LAMBDA_DIR.joinpath(f"{artifact_module}.py")
+        files[source_path.name] = source_path.read_bytes()
+        if python:
+            files.update(compile_module(python=python, source_path=source_path))
+    return files
+
+
+def create_zip(files: Dict[str, bytes]) -> bytes:
+    """
+    Return zip content with files sorted by name, fixed timestamps and permissions.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, mode="w") as zip_file:
+        for name in sorted(files):
+            info = zipfile.ZipInfo(filename=name, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = ZIP_FILE_MODE << 16
+            info.create_system = 3
+            zip_file.writestr(info, files[name], compresslevel=9)
+    return buffer.getvalue()
+
+
+def write_artifact(path: Path, content: bytes) -> bool:
+    """
+    Write artifact (replaced atomically). Return False if artifact is already up to date.
+    """
+    if path.exists() and path.read_bytes() == content:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def measure_import(zip_path: Path, module: str, python: str, rounds: int) -> float:
+    """
+    Return median time (ms) of module import from extracted artifact in a fresh interpreter.
+    Bytecode is not written while measuring - Lambda's code dir is read-only.
+    """
+    env = {**os.environ, "AWS_DEFAULT_REGION": "eu-west-1"}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with zipfile.ZipFile(zip_path) as zip_file:
+            zip_file.extractall(tmp_dir)
+        import_times = [
+            float(
+                subprocess.run(
+                    args=[python, "-B", "-c", IMPORT_TIME_CODE.format(module=module)],
+                    cwd=tmp_dir,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+            )
+            for _ in range(rounds)
+        ]
+    return round(statistics.median(import_times), 2)
+
+
+def build_artifacts(
+    output_dir: Path = ARTIFACTS_DIR,
+    modules: List[str] = LAMBDA_MODULES,
+    rounds: int = 0,
+) -> Dict:
+    """
+    Build Lambda artifacts and return report - size, hash (as Terraform's 'source_code_hash')
+    and, if 'rounds' > 0, cold-start import time of each artifact.
+    """
+    python = get_runtime_python()
+    report = {}
+    for module in modules:
+        files = get_artifact_files(module=module, python=python)
+        content = create_zip(files=files)
+        zip_path = Path(output_dir).joinpath(f"{module}_payload.zip")
+        updated = write_artifact(path=zip_path, content=content)
+        report[module] = {
+            "path": str(zip_path),
+            "updated": updated,
+            "files": sorted(files),
+            "size_bytes": len(content),
+            "uncompressed_bytes": sum(len(file) for file in files.values()),
+            "bytecode": python is not None,
+            "base64sha256": base64.b64encode(hashlib.sha256(content).digest()).decode(),
+        }
+        if rounds and python:
+            report[module]["import_ms"] = measure_import(
+                zip_path=zip_path, module=module, python=python, rounds=rounds
+            )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build deterministic Lambda zips with precompiled bytecode and report their size and import time"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        default=ARTIFACTS_DIR,
+        help=f"artifacts dir (default: {ARTIFACTS_DIR})",
+    )
+    parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        default=5,
+        help="number of cold-start imports measured per artifact (default: 5, 0 - not measured)",
+    )
+    args = parser.parse_args()
+    build_report = build_artifacts(output_dir=args.output_dir, rounds=args.rounds)
+    if not get_runtime_python():
+        print(
+            f"Warning: interpreter matching Lambda runtime {LAMBDA_RUNTIME} not found - artifacts without bytecode",
+            file=sys.stderr,
+        )
+    print(json.dumps(build_report, indent=2))
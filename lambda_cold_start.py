@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+
+LAMBDA_DIR = Path(__file__).resolve().parent.joinpath("lambda_functions")
+
+# Lambda handlers with events shaped the same way as by API Gateway mapping templates
+HANDLERS = {
+    "get": (
+        "lambda_function_get",
+        "lambda_handler_get",
+        {"year": "", "month": "", "http_method": "GET"},
+    ),
+    "post": (
+        "lambda_function_post",
+        "lambda_handler_post",
+        {
+            "body": {"txid": "cold-start-tx", "time": 1632750000, "amount": 12.0},
+            "http_method": "POST",
+        },
+    ),
+}
+
+# Single cold start (module import and first invocation) - run in a fresh interpreter
+COLD_START_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{module}.{handler}(json.loads(sys.argv[1]), {{}})
+invoked = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_invocation_ms": (invoked - imported) * 1000,
+    "total_ms": (invoked - start) * 1000,
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+
+class FakeDynamoDBHandler(BaseHTTPRequestHandler):
+    """
+    Request handler answering each DynamoDB API call with empty (successful) response.
+    First 'throttled_requests' calls are answered with throttling error.
+    """
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        if self.server.requests <= self.server.throttled_requests:
+            status_code = 400
+            body = json.dumps(
+                {
+                    "__type": "com.amazonaws.dynamodb.v20120810#ProvisionedThroughputExceededException",
+                    "message": "The level of configured provisioned throughput for the table was exceeded.",
+                }
+            ).encode()
+        else:
+            status_code = 200
+            body = b"{}"
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class FakeDynamoDBServer(ThreadingHTTPServer):
+    """
+    The class representing local DynamoDB endpoint (HTTP server run in a thread).
+    Network round trip is negligible, so measured time is spent in Lambda code and its imports.
+    """
+
+    def __init__(self, throttled_requests: int = 0) -> None:
+        super().__init__(("127.0.0.1", 0), FakeDynamoDBHandler)
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.throttled_requests = throttled_requests
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeDynamoDBServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+def run_cold_start(name: str, endpoint_url: str) -> Dict:
+    """
+    Import Lambda module and invoke its handler once in a fresh interpreter and return timings.
+    """
+    module, handler, event = HANDLERS[name]
+    env = {
+        **os.environ,
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "eu-west-1",
+        "AWS_ENDPOINT_URL_DYNAMODB": endpoint_url,
+        "DYNAMODB_TXIDS_NAME": "verus_stakes_txids_table_local",
+        "DYNAMODB_VALUES_NAME": "verus_stakes_values_table_local",
+    }
+    # Notification is not sent - only DynamoDB endpoint is emulated
+    env.pop("TOPIC_ARN", None)
+    response = subprocess.run(
+        args=[
+            sys.executable,
+            "-c",
+            COLD_START_CODE.format(module=module, handler=handler),
+            json.dumps(event),
+        ],
+        cwd=LAMBDA_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Handler's EMF metrics log lines are printed before the stats (last line)
+    return json.loads(response.stdout.splitlines()[-1])
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    """
+    Return median timings (ms) of cold start runs and number of modules loaded.
+    """
+    return {
+        "rounds": len(runs),
+        **{
+            key: round(statistics.median(run[key] for run in runs), 2)
+            for key in ["import_ms", "first_invocation_ms", "total_ms"]
+        },
+        "modules_loaded": len(runs[-1]["modules"]),
+    }
+
+
+def measure(names: List[str], rounds: int) -> Dict:
+    """
+    Measure cold starts of selected Lambda handlers.
+    """
+    with FakeDynamoDBServer() as server:
+        return {
+            name: summarize([run_cold_start(name, server.url) for _ in range(rounds)])
+            for name in names
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure Lambda module import and first invocation time in a fresh interpreter"
+    )
+    parser.add_argument(
+        "-f",
+        "--function",
+        choices=list(HANDLERS),
+        help="Lambda handler to measure (default: all)",
+    )
+    parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        default=10,
+        help="number of cold starts (default: 10)",
+    )
+    args = parser.parse_args()
+    names = [args.function] if args.function else list(HANDLERS)
+    print(json.dumps(measure(names=names, rounds=args.rounds), indent=2))
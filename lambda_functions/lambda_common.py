@@ -0,0 +1,240 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+import re
+from typing import Optional
+
+
+# Wallet id used when the request doesn't identify the wallet.
+DEFAULT_WALLET_ID = "default"
+# Partition of aggregates summed over all wallets ('#' is not allowed in wallet id).
+FLEET_WALLET_ID = "#fleet"
+WALLET_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+# Staking address (base58) - '#' separates period and address in per-address aggregates' ts_id
+ADDRESS_PATTERN = re.compile(r"^[A-Za-z0-9]{1,64}$")
+# CloudWatch namespace of metrics logged in Embedded Metric Format (EMF)
+METRICS_NAMESPACE = "VerusStakeNotification"
+# Max attempts (first call and retries) of AWS API calls in botocore adaptive retry mode
+# (retries with client-side rate limiting on throttling) - overridden by AWS_MAX_ATTEMPTS env var
+MAX_ATTEMPTS_DEFAULT = 5
+# Error codes of throttled AWS API calls
+THROTTLING_ERROR_CODES = frozenset(
+    [
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "ThrottlingException",
+        "Throttling",
+        "ThrottledException",
+        "TooManyRequestsException",
+    ]
+)
+# Cancellation reasons of transaction which can be sent again later (throttled or conflicting
+# with concurrent write of the same item)
+TRANSACTION_RETRY_CODES = frozenset(
+    ["ProvisionedThroughputExceeded", "ThrottlingError", "TransactionConflict"]
+)
+# Timestamp id (ts_id) of all-time totals and prefix of per-day buckets (rolling windows) items
+ALL_TIME_TS_ID = "all"
+DAY_TS_ID_PREFIX = "day#"
+
+
+class RetryCounter:
+    """
+    The class counting retried and throttled AWS API calls (handler of botocore 'needs-retry' event).
+    Clients are reused across invocations - counts are reset at the start of each invocation.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.retries = 0
+        self.throttles = 0
+
+    def __call__(self, response=None, attempts: int = 1, **kwargs) -> None:
+        # Event is emitted after each attempt - attempts after the first one are retries
+        if attempts > 1:
+            self.retries += 1
+        if response is not None:
+            error_code = response[1].get("Error", {}).get("Code")
+            if error_code in THROTTLING_ERROR_CODES:
+                self.throttles += 1
+
+
+retry_counter = RetryCounter()
+
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str):
+    """
+    Return low-level client reused across invocations.
+    The botocore is imported on first use - boto3 (with its resource model layer) is never loaded.
+    Throttled calls are retried in adaptive retry mode and counted with retry counter.
+    """
+    import botocore.config
+    import botocore.session
+
+    max_attempts = int(os.environ.get("AWS_MAX_ATTEMPTS", MAX_ATTEMPTS_DEFAULT))
+    client = botocore.session.get_session().create_client(
+        service_name,
+        config=botocore.config.Config(
+            retries={"mode": "adaptive", "total_max_attempts": max_attempts}
+        ),
+    )
+    client.meta.events.register("needs-retry", retry_counter)
+    return client
+
+
+class MetricsLogger:
+    """
+    The class collecting metrics of single invocation and printing them as CloudWatch
+    Embedded Metric Format (EMF) log - CloudWatch extracts metrics from it without API calls.
+    """
+
+    def __init__(self, function: str, method: str) -> None:
+        self.dimensions = {"Function": function, "Method": str(method)}
+        self.metrics = {}
+        self.properties = {}
+
+    def put_metric(self, name: str, value: float, unit: str = "Milliseconds") -> None:
+        self.metrics[name] = (value, unit)
+
+    def set_property(self, name: str, value) -> None:
+        """
+        Set value logged with metrics but not extracted as metric (fe. for CloudWatch Logs Insights).
+        """
+        self.properties[name] = value
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Put duration (ms) of code block as metric.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put_metric(name, round((time.perf_counter() - start) * 1000, 3))
+
+    def to_document(self) -> dict:
+        """
+        Return EMF document.
+        """
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [list(self.dimensions)],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit}
+                            for name, (_, unit) in self.metrics.items()
+                        ],
+                    }
+                ],
+            },
+            **self.dimensions,
+            **self.properties,
+            **{name: value for name, (value, _) in self.metrics.items()},
+        }
+
+    def flush(self) -> None:
+        """
+        Print EMF document (single line) to Lambda log.
+        """
+        if self.metrics:
+            print(json.dumps(self.to_document()))
+
+
+def get_timestamp_id(
+    year: bool = True, month: bool = True, date: Optional[datetime] = None
+) -> str:
+    """
+    Returns timestamp id (tp_id) in format '2021-01', '2021' or '01'.
+    Current date is used if date is not specified.
+    """
+    date = date or datetime.now(timezone.utc)
+    if not year:
+        return date.strftime("%m")
+    elif not month:
+        return date.strftime("%Y")
+    return date.strftime("%Y-%m")
+
+
+def get_address_timestamp_id(timestamp: str, address: str) -> str:
+    """
+    Returns timestamp id (ts_id) of staking address' aggregate in format '2021-01#<address>' or '2021#<address>'.
+    All addresses of the time period share ts_id prefix - they are fetched with single query.
+    """
+    return f"{timestamp}#{address}"
+
+
+def get_day_timestamp_id(date: datetime) -> str:
+    """
+    Returns timestamp id (ts_id) of per-day bucket in format 'day#2021-01-31'.
+    """
+    return f"{DAY_TS_ID_PREFIX}{date.strftime('%Y-%m-%d')}"
+
+
+def get_client_wallet_id(
+    client_id: str, requested_wallet_id: Optional[str]
+) -> Optional[str]:
+    """
+    Return wallet id - Cognito client id from authorizer claims or default wallet id (no claims).
+    Wallet id sent by caller (payload or query param) doesn't select the partition - None is returned
+    if it doesn't match the client's wallet id.
+    """
+    wallet_id = (
+        client_id
+        if client_id and WALLET_ID_PATTERN.fullmatch(client_id)
+        else DEFAULT_WALLET_ID
+    )
+    if requested_wallet_id and requested_wallet_id != wallet_id:
+        return None
+    return wallet_id
+
+
+def get_wallet_forbidden_response() -> dict:
+    """
+    Return response of request with wallet id not matching Cognito client.
+    """
+    return {"statusCode": 403, "body": json.dumps("Wallet id doesn't match client")}
+
+
+def get_aws_error_response(error, metrics: MetricsLogger) -> dict:
+    """
+    Return response of request failed with AWS API error after all retry attempts.
+    Throttled request (or transaction cancelled by throttling or conflict) is answered with 503
+    - it can be sent again later.
+    """
+    error_code = error.response.get("Error", {}).get("Code", "")
+    cancellation_codes = {
+        reason.get("Code") for reason in error.response.get("CancellationReasons", [])
+    }
+    metrics.set_property("error_code", error_code)
+    print(f"AWS API call failed after {retry_counter.retries} retries: {error}")
+    if (
+        error_code in THROTTLING_ERROR_CODES
+        or cancellation_codes & TRANSACTION_RETRY_CODES
+    ):
+        return {"statusCode": 503, "body": json.dumps("Service busy - try again later")}
+    return {"statusCode": 500, "body": json.dumps("Internal error")}
+
+
+def put_retry_stats(metrics: MetricsLogger, response: Optional[dict]) -> None:
+    """
+    Put retried and throttled AWS API calls count of invocation (if any) to metrics logger and response headers.
+    """
+    if not retry_counter.retries and not retry_counter.throttles:
+        return
+    metrics.put_metric("AWSRetries", retry_counter.retries, unit="Count")
+    metrics.put_metric("AWSThrottles", retry_counter.throttles, unit="Count")
+    if response:
+        response["headers"] = {
+            "X-Retry-Attempts": str(retry_counter.retries),
+            "X-Throttled-Requests": str(retry_counter.throttles),
+        }
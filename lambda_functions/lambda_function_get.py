@@ -1,33 +1,268 @@
+import base64
 import json
-import boto3
-import botocore.exceptions
 import os
-from datetime import datetime, timezone
-from decimal import Decimal
-from typing import Union
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
 
+# Shared with POST Lambda - packaged into both Lambda zips (see build_lambdas.py)
+from lambda_common import (
+    ADDRESS_PATTERN,
+    ALL_TIME_TS_ID,
+    DAY_TS_ID_PREFIX,
+    DEFAULT_WALLET_ID,
+    FLEET_WALLET_ID,
+    MetricsLogger,
+    get_address_timestamp_id,
+    get_aws_error_response,
+    get_client_wallet_id,
+    get_client,
+    get_day_timestamp_id,
+    get_timestamp_id,
+    get_wallet_forbidden_response,
+    put_retry_stats,
+    retry_counter,
+)
 
-def get_db_item(table_name: str, part_key: str) -> dict:
+
+# Rolling windows (number of days including current day) served from per-day buckets
+ROLLING_WINDOWS = {"7d": 7, "30d": 30, "365d": 365}
+# Global secondary index of txids table (wallet_id, stake_ts) used for stakes listing
+STAKE_TS_INDEX_NAME = "stake_ts_index"
+LIST_LIMIT_DEFAULT = 50
+LIST_LIMIT_MAX = 100
+# Query params passed to the handler (REST API mapping template or HTTP API proxy event)
+QUERY_PARAMS = (
+    "year",
+    "month",
+    "wallet_id",
+    "scope",
+    "period",
+    "mode",
+    "from",
+    "to",
+    "limit",
+    "cursor",
+    "order",
+    "address",
+)
+
+
+def parse_event(event: dict) -> dict:
+    """
+    Return event in the shape produced by REST API mapping template.
+    HTTP API proxy event (payload format version 2.0) is converted, other events are returned unchanged.
+    """
+    if event.get("version") != "2.0":
+        return event
+    request_context = event.get("requestContext", {})
+    claims = request_context.get("authorizer", {}).get("jwt", {}).get("claims", {})
+    query_params = event.get("queryStringParameters") or {}
+    return {
+        **{param: query_params.get(param, "") for param in QUERY_PARAMS},
+        "client_id": claims.get("client_id", ""),
+        "http_method": request_context.get("http", {}).get("method"),
+    }
+
+
+def get_wallet_id(event: dict) -> Optional[str]:
+    """
+    Return wallet id - fleet-wide partition for 'scope=fleet', Cognito client id or default wallet id.
+    Return None if 'wallet_id' query param doesn't match it.
+    """
+    if event.get("scope") == "fleet":
+        return FLEET_WALLET_ID
+    return get_client_wallet_id(
+        client_id=event.get("client_id", ""),
+        requested_wallet_id=event.get("wallet_id"),
+    )
+
+
+def get_db_item(
+    table_name: str, part_key: str, wallet_id: str = DEFAULT_WALLET_ID
+) -> dict:
     """
     Get item from specified DynamoDB table.
     If item not exist return {}.
     """
-    dynamodb = boto3.resource("dynamodb")
-    db_table = dynamodb.Table(table_name)
+    item_data = get_client("dynamodb").get_item(
+        TableName=table_name,
+        Key={"wallet_id": {"S": wallet_id}, "ts_id": {"S": part_key}},
+    )
+    # Return only number attributes converted to float
+    return {
+        key: float(value["N"])
+        for key, value in item_data.get("Item", {}).items()
+        if "N" in value
+    }
+
+
+def get_day_buckets(
+    table_name: str,
+    window: int,
+    wallet_id: str = DEFAULT_WALLET_ID,
+    date: Optional[datetime] = None,
+) -> dict:
+    """
+    Get per-day buckets ({'YYYY-MM-DD': [amount, count]}) of the last 'window' days (including current day)
+    from specified DynamoDB table with single query - each day's bucket is a separate item ('day#YYYY-MM-DD').
+    Expired buckets not removed by DynamoDB TTL yet are out of the queried range.
+    """
+    date = date or datetime.now(timezone.utc)
+    oldest_date = date - timedelta(days=window - 1)
+    response = get_client("dynamodb").query(
+        TableName=table_name,
+        KeyConditionExpression="wallet_id = :w AND ts_id BETWEEN :f AND :t",
+        ExpressionAttributeValues={
+            ":w": {"S": wallet_id},
+            ":f": {"S": get_day_timestamp_id(date=oldest_date)},
+            ":t": {"S": get_day_timestamp_id(date=date)},
+        },
+    )
+    return {
+        item["ts_id"]["S"].removeprefix(DAY_TS_ID_PREFIX): [
+            float(item["stakes_amount"]["N"]),
+            int(item["stakes_count"]["N"]),
+        ]
+        for item in response.get("Items", [])
+    }
+
+
+def get_address_items(
+    table_name: str, part_key: str, wallet_id: str = DEFAULT_WALLET_ID
+) -> list:
+    """
+    Get aggregates of all staking addresses for time period (timestamp id) with single query
+    - address' ts_id is '<period>#<address>'.
+    """
+    prefix = get_address_timestamp_id(timestamp=part_key, address="")
+    response = get_client("dynamodb").query(
+        TableName=table_name,
+        KeyConditionExpression="wallet_id = :w AND begins_with(ts_id, :p)",
+        ExpressionAttributeValues={":w": {"S": wallet_id}, ":p": {"S": prefix}},
+    )
+    return [
+        {
+            "address": item["ts_id"]["S"][len(prefix) :],
+            "stakes_count": float(item["stakes_count"]["N"]),
+            "stakes_amount": float(item["stakes_amount"]["N"]),
+        }
+        for item in response.get("Items", [])
+    ]
+
+
+def sum_rolling_window(
+    days: dict, window: int, date: Optional[datetime] = None
+) -> dict:
+    """
+    Return stakes amount & count of per-day buckets in the last 'window' days (including current day).
+    """
+    date = date or datetime.now(timezone.utc)
+    oldest_day = (date - timedelta(days=window - 1)).strftime("%Y-%m-%d")
+    buckets = [bucket for day, bucket in days.items() if day >= oldest_day]
+    return {
+        "stakes_count": sum(count for _, count in buckets),
+        "stakes_amount": round(sum(amount for amount, _ in buckets), 8),
+    }
+
+
+def encode_cursor(last_key: dict) -> str:
+    """
+    Return opaque pagination cursor for DynamoDB LastEvaluatedKey (wallet_id, tx_id, stake_ts).
+    """
+    return base64.urlsafe_b64encode(json.dumps(last_key).encode()).decode()
+
+
+def decode_cursor(cursor: str, wallet_id: str) -> dict:
+    """
+    Return DynamoDB ExclusiveStartKey from pagination cursor.
+    Raise ValueError if cursor is not valid or belongs to other wallet.
+    """
     try:
-        item_data = db_table.get_item(Key={"ts_id": part_key})
-        item = item_data.get("Item", {})
-    except botocore.exceptions.ClientError as error:
-        print(error)
-        item = {}
-    if item:
-        # Convert Decimal to float or int
-        item = {
-            key: float(value)
-            for key, value in item.items()
-            if isinstance(value, Decimal)
+        start_key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        # binascii.Error, UnicodeDecodeError and JSONDecodeError are ValueError subclasses
+        raise ValueError("Not valid cursor")
+    if not isinstance(start_key, dict) or start_key.get("wallet_id") != wallet_id:
+        raise ValueError("Not valid cursor")
+    if set(start_key) != {"wallet_id", "tx_id", "stake_ts"}:
+        raise ValueError("Not valid cursor")
+    if not isinstance(start_key["stake_ts"], int):
+        raise ValueError("Not valid cursor")
+    return start_key
+
+
+def list_stakes(
+    table_name: str,
+    wallet_id: str,
+    time_from: int,
+    time_to: int,
+    limit: int = LIST_LIMIT_DEFAULT,
+    cursor: str = "",
+    ascending: bool = False,
+) -> dict:
+    """
+    Return page of wallet's stakes in time window (newest first or oldest first if 'ascending')
+    and cursor of the next page. The cursor is None if there are no more pages.
+    """
+    query_params = {
+        "TableName": table_name,
+        "IndexName": STAKE_TS_INDEX_NAME,
+        "KeyConditionExpression": "wallet_id = :w AND stake_ts BETWEEN :f AND :t",
+        "ExpressionAttributeValues": {
+            ":w": {"S": wallet_id},
+            ":f": {"N": str(time_from)},
+            ":t": {"N": str(time_to)},
+        },
+        "ScanIndexForward": ascending,
+        "Limit": limit,
+    }
+    if cursor:
+        start_key = decode_cursor(cursor=cursor, wallet_id=wallet_id)
+        query_params["ExclusiveStartKey"] = {
+            "wallet_id": {"S": start_key["wallet_id"]},
+            "tx_id": {"S": start_key["tx_id"]},
+            "stake_ts": {"N": str(start_key["stake_ts"])},
+        }
+    response = get_client("dynamodb").query(**query_params)
+    last_key = response.get("LastEvaluatedKey")
+    if last_key:
+        last_key = {
+            "wallet_id": last_key["wallet_id"]["S"],
+            "tx_id": last_key["tx_id"]["S"],
+            "stake_ts": int(last_key["stake_ts"]["N"]),
         }
-    return item
+    return {
+        "stakes": [
+            {
+                "txid": item["tx_id"]["S"],
+                "time": int(item["stake_ts"]["N"]),
+                "amount": float(item["stake_amount"]["N"]),
+            }
+            for item in response.get("Items", [])
+        ],
+        "cursor": encode_cursor(last_key) if last_key else None,
+    }
+
+
+def sanitize_list_params(time_from: str, time_to: str, limit: str) -> tuple:
+    """
+    Returns the stakes listing query params in required format.
+    - time_from: epoch timestamp (default 0)
+    - time_to: epoch timestamp (default current time)
+    - limit: page size in range 1-LIST_LIMIT_MAX (default LIST_LIMIT_DEFAULT)
+    """
+    time_from = int(time_from) if time_from.isdigit() else 0
+    time_to = (
+        int(time_to)
+        if time_to.isdigit()
+        else int(datetime.now(timezone.utc).timestamp())
+    )
+    limit = (
+        min(max(int(limit), 1), LIST_LIMIT_MAX)
+        if limit.isdigit()
+        else LIST_LIMIT_DEFAULT
+    )
+    return time_from, time_to, limit
 
 
 def check_str_is_number(value: str) -> bool:
@@ -58,59 +293,183 @@ def sanitize_query_params(year: str, month: str) -> tuple:
     return year, month
 
 
-def get_timestamp_id(
-    year: bool = True, month: bool = True, date: datetime = datetime.now(timezone.utc)
-) -> str:
+def get_part_key(year: str, month: str) -> str:
     """
-    Returns timestamp id (tp_id) in format '2021-01', '2021' or '01'.
+    Returns DynamoDB partition key value (timestamp id) for the 'year' and 'month' query params.
     """
-    if not year:
-        return date.strftime("%m")
-    elif not month:
-        return date.strftime("%Y")
-    return date.strftime("%Y-%m")
+    # Sanitize query params
+    # Valid query params:
+    # - year: '' or number in format '1234' (range 0001-9999)
+    # - month" '' or number in format '02' (range 01-12)
+    qp_year, qp_month = sanitize_query_params(year=year, month=month)
 
+    if qp_year and not qp_month:
+        # The stakes amount for the whole 'year' will be returned
+        return f"{qp_year}"
+    elif not qp_year and qp_month:
+        # The stakes amount for the 'month' in current year will be returned
+        current_year = datetime.now(timezone.utc).strftime("%Y")
+        return f"{current_year}-{qp_month}"
+    elif qp_month and qp_year:
+        # The stakes amount for the 'month' in particular 'year' will be returned
+        return f"{qp_year}-{qp_month}"
+    # The stakes amount for the current 'month' will be returned
+    return get_timestamp_id()
 
-def lambda_handler_get(event, context) -> Union[dict, None]:
+
+def handle_request(
+    event: dict,
+    metrics: MetricsLogger,
+    table_values_name: str,
+    table_txid_name: str,
+) -> Union[dict, None]:
     """
-    Main function.
+    Handle GET request (event in REST API mapping template shape).
+    DynamoDB read latency is put to metrics logger.
     """
-    # Load envs
-    # Table that contains consolidated stake values for specific timestamp (time period).
-    table_values_name = os.environ.get("DYNAMODB_VALUES_NAME")
-
     http_method = event.get("http_method")
 
     if http_method == "GET":
-        # Get and sanitize query params
-        # Valid query params:
-        # - year: '' or number in format '1234' (range 0001-9999)
-        # - month" '' or number in format '02' (range 01-12)
-        qp_year, qp_month = sanitize_query_params(
-            year=event["year"], month=event["month"]
-        )
-
-        # Define DynamoDB partition key value
-        if qp_year and not qp_month:
-            # The stakes amount for the whole 'year' will be returned
-            part_key = f"{qp_year}"
-        elif not qp_year and qp_month:
-            # The stakes amount for the 'month' in current year will be returned
-            current_year = datetime.now(timezone.utc).strftime("%Y")
-            part_key = f"{current_year}-{qp_month}"
-        elif qp_month and qp_year:
-            # The stakes amount for the 'month' in particular 'year' will be returned
-            part_key = f"{qp_year}-{qp_month}"
+        wallet_id = get_wallet_id(event=event)
+        if not wallet_id:
+            return get_wallet_forbidden_response()
+        wallet_id_response = "fleet" if wallet_id == FLEET_WALLET_ID else wallet_id
+        metrics.set_property("wallet_id", wallet_id)
+        metrics.set_property("mode", event.get("mode") or "totals")
+        if event.get("mode") == "list":
+            # Individual stakes are stored per wallet only
+            if wallet_id == FLEET_WALLET_ID:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps("Stakes listing is not available for fleet"),
+                }
+            time_from, time_to, limit = sanitize_list_params(
+                time_from=event.get("from", ""),
+                time_to=event.get("to", ""),
+                limit=event.get("limit", ""),
+            )
+            try:
+                with metrics.timer("DynamoDBReadLatency"):
+                    stakes_page = list_stakes(
+                        table_name=table_txid_name,
+                        wallet_id=wallet_id,
+                        time_from=time_from,
+                        time_to=time_to,
+                        limit=limit,
+                        cursor=event.get("cursor", ""),
+                        ascending=event.get("order") == "asc",
+                    )
+            except ValueError as error:
+                return {"statusCode": 400, "body": json.dumps(str(error))}
+            metrics.put_metric("ItemsCount", len(stakes_page["stakes"]), unit="Count")
+            response = {"wallet_id": wallet_id_response, **stakes_page}
+            return {"statusCode": 200, "body": json.dumps(response)}
+        # Valid 'period' query param: 'all' (all-time totals) or rolling window ('7d', '30d', '365d')
+        period = event.get("period", "")
+        address = event.get("address", "")
+        if event.get("mode") == "addresses" or address:
+            # Per-address aggregates are kept for months and years only
+            if period:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps(
+                        "Address totals are available for year or month only"
+                    ),
+                }
+            part_key = get_part_key(year=event["year"], month=event["month"])
+        if event.get("mode") == "addresses":
+            with metrics.timer("DynamoDBReadLatency"):
+                addresses = get_address_items(
+                    table_name=table_values_name, part_key=part_key, wallet_id=wallet_id
+                )
+            metrics.put_metric("ItemsCount", len(addresses), unit="Count")
+            response = {
+                "wallet_id": wallet_id_response,
+                "timeframe": part_key,
+                "addresses": addresses,
+            }
+            return {"statusCode": 200, "body": json.dumps(response)}
+        if address:
+            if not ADDRESS_PATTERN.fullmatch(address):
+                return {"statusCode": 400, "body": json.dumps("Not valid address")}
+            with metrics.timer("DynamoDBReadLatency"):
+                item = get_db_item(
+                    table_name=table_values_name,
+                    part_key=get_address_timestamp_id(
+                        timestamp=part_key, address=address
+                    ),
+                    wallet_id=wallet_id,
+                )
+            response = {
+                "wallet_id": wallet_id_response,
+                "timeframe": part_key,
+                "address": address,
+                "stakes_count": item.get("stakes_count", 0),
+                "stakes_amount": item.get("stakes_amount", 0),
+            }
+            return {"statusCode": 200, "body": json.dumps(response)}
+        if period in ROLLING_WINDOWS:
+            with metrics.timer("DynamoDBReadLatency"):
+                days = get_day_buckets(
+                    table_name=table_values_name,
+                    window=ROLLING_WINDOWS[period],
+                    wallet_id=wallet_id,
+                )
+            response = {
+                "wallet_id": wallet_id_response,
+                "timeframe": period,
+                **sum_rolling_window(days=days, window=ROLLING_WINDOWS[period]),
+            }
+            return {"statusCode": 200, "body": json.dumps(response)}
+        if period == ALL_TIME_TS_ID:
+            part_key = ALL_TIME_TS_ID
         else:
-            # The stakes amount for the current 'month' will be returned
-            part_key = get_timestamp_id()
+            # Define DynamoDB partition key value from 'year' and 'month' query params
+            part_key = get_part_key(year=event["year"], month=event["month"])
 
-        item = get_db_item(table_name=table_values_name, part_key=part_key)
+        with metrics.timer("DynamoDBReadLatency"):
+            item = get_db_item(
+                table_name=table_values_name, part_key=part_key, wallet_id=wallet_id
+            )
         # If item not exists return count and amount = 0.
         response = {
+            "wallet_id": wallet_id_response,
             "timeframe": part_key,
             "stakes_count": item.get("stakes_count", 0),
             "stakes_amount": item.get("stakes_amount", 0),
         }
 
         return {"statusCode": 200, "body": json.dumps(response)}
+
+
+def lambda_handler_get(event, context) -> Union[dict, None]:
+    """
+    Main function.
+    """
+    # Load envs
+    # Table that contains consolidated stake values for specific timestamp (time period).
+    table_values_name = os.environ.get("DYNAMODB_VALUES_NAME")
+    # Table that contains list of individual stake transactions (tx) - stake tx id, stake amount, stake timestamp.
+    table_txid_name = os.environ.get("DYNAMODB_TXIDS_NAME")
+
+    event = parse_event(event=event)
+    metrics = MetricsLogger(function="get", method=event.get("http_method"))
+    retry_counter.reset()
+    try:
+        try:
+            response = handle_request(
+                event=event,
+                metrics=metrics,
+                table_values_name=table_values_name,
+                table_txid_name=table_txid_name,
+            )
+        except get_client("dynamodb").exceptions.ClientError as error:
+            response = get_aws_error_response(error=error, metrics=metrics)
+        put_retry_stats(metrics=metrics, response=response)
+        if response:
+            metrics.put_metric(
+                "ResponseSize", len(response["body"].encode()), unit="Bytes"
+            )
+        return response
+    finally:
+        metrics.flush()
@@ -1,165 +1,499 @@
+import base64
 import json
-import boto3
-import botocore.exceptions
 import os
-from datetime import datetime, timezone
-from decimal import Decimal
-from typing import Union
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Union
 
+# Shared with GET Lambda - packaged into both Lambda zips (see build_lambdas.py)
+from lambda_common import (
+    ADDRESS_PATTERN,
+    ALL_TIME_TS_ID,
+    DEFAULT_WALLET_ID,
+    FLEET_WALLET_ID,
+    WALLET_ID_PATTERN,
+    MetricsLogger,
+    get_address_timestamp_id,
+    get_aws_error_response,
+    get_client_wallet_id,
+    get_client,
+    get_day_timestamp_id,
+    get_timestamp_id,
+    get_wallet_forbidden_response,
+    put_retry_stats,
+    retry_counter,
+)
 
-def put_stake_txids_db(stake: dict, table_name: str) -> None:
+
+# Per-day buckets older than the longest rolling window are removed by DynamoDB TTL
+DAYS_KEPT = 365
+
+
+def get_wallet_id(event: dict) -> Optional[str]:
+    """
+    Return wallet id - Cognito client id or default wallet id.
+    Return None if 'wallet_id' from payload doesn't match it.
+    """
+    return get_client_wallet_id(
+        client_id=event.get("client_id", ""),
+        requested_wallet_id=event.get("body", {}).get("wallet_id"),
+    )
+
+
+def parse_event(event: dict) -> dict:
     """
-    Add new stake item to specified DynamoDB table (list of individual stake txs).
+    Return event in the shape produced by REST API mapping template.
+    HTTP API proxy event (payload format version 2.0) is converted, other events are returned unchanged.
+    Not valid JSON body is replaced with None.
     """
-    dynamodb = boto3.resource("dynamodb")
-    stakes_table = dynamodb.Table(table_name)
+    if event.get("version") != "2.0":
+        return event
+    request_context = event.get("requestContext", {})
+    claims = request_context.get("authorizer", {}).get("jwt", {}).get("claims", {})
+    body = event.get("body") or ""
     try:
-        item = {
-            "tx_id": stake["txid"],
-            "stake_amount": Decimal(str(stake["amount"])),
-            "stake_ts": stake["time"],
-        }
-        stakes_table.put_item(Item=item)
-    except botocore.exceptions.ClientError as error:
-        print(error)
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body).decode()
+        body = json.loads(body)
+    except ValueError:
+        body = None
+    return {
+        "body": body,
+        "client_id": claims.get("client_id", ""),
+        "http_method": request_context.get("http", {}).get("method"),
+    }
+
+
+def validate_stake_txid(stake) -> bool:
+    """
+    Validate stake data against the same schema as REST API 'StakeDELETE' model.
+    HTTP API doesn't validate request body.
+    """
+    if not isinstance(stake, dict):
+        return False
+    if not isinstance(stake.get("txid"), str) or not stake["txid"]:
+        return False
+    wallet_id = stake.get("wallet_id")
+    if wallet_id is not None and not (
+        isinstance(wallet_id, str) and WALLET_ID_PATTERN.fullmatch(wallet_id)
+    ):
+        return False
+    return True
+
+
+def validate_stake(stake) -> bool:
+    """
+    Validate stake data against the same schema as REST API 'StakePOST' model.
+    HTTP API doesn't validate request body.
+    """
+    if not validate_stake_txid(stake):
+        return False
+    if not isinstance(stake.get("time"), int) or isinstance(stake["time"], bool):
+        return False
+    amount = stake.get("amount")
+    if not isinstance(amount, (int, float)) or isinstance(amount, bool) or amount < 0:
+        return False
+    detected_at = stake.get("detected_at")
+    if detected_at is not None and (
+        not isinstance(detected_at, int) or isinstance(detected_at, bool)
+    ):
+        return False
+    address = stake.get("address")
+    if address is not None and not (
+        isinstance(address, str) and ADDRESS_PATTERN.fullmatch(address)
+    ):
+        return False
+    return True
+
+
+def get_stake_txid_put(
+    stake: dict,
+    table_name: str,
+    wallet_id: str = DEFAULT_WALLET_ID,
+    ingest_date: Optional[datetime] = None,
+) -> dict:
+    """
+    Return conditional put (TransactWriteItems 'Put') of new stake item - fails if stake is already stored.
+    Ingestion time and staking address are stored to find aggregates the stake was added to.
+    """
+    ingest_date = ingest_date or datetime.now(timezone.utc)
+    item = {
+        "wallet_id": {"S": wallet_id},
+        "tx_id": {"S": stake["txid"]},
+        "stake_amount": {"N": str(stake["amount"])},
+        "stake_ts": {"N": str(stake["time"])},
+        "ingest_ts": {"N": str(int(ingest_date.timestamp()))},
+    }
+    if stake.get("address"):
+        item["stake_address"] = {"S": stake["address"]}
+    return {
+        "TableName": table_name,
+        "Item": item,
+        "ConditionExpression": "attribute_not_exists(tx_id)",
+    }
+
+
+def get_stake_txids_db(
+    txid: str, table_name: str, wallet_id: str = DEFAULT_WALLET_ID
+) -> Optional[dict]:
+    """
+    Get stake item from specified DynamoDB table (list of individual stake txs).
+    Return stake ('txid', 'time', 'amount', 'ingest_ts' and, if stored, 'address') or None if stake not exist.
+    """
+    response = get_client("dynamodb").get_item(
+        TableName=table_name,
+        Key={"wallet_id": {"S": wallet_id}, "tx_id": {"S": txid}},
+        ConsistentRead=True,
+    )
+    item = response.get("Item")
+    if not item:
+        return None
+    stake_ts = int(item["stake_ts"]["N"])
+    stake = {
+        "txid": txid,
+        "time": stake_ts,
+        "amount": float(item["stake_amount"]["N"]),
+        # Stakes added before ingestion time was stored - stake time is the best guess
+        "ingest_ts": int(item.get("ingest_ts", {}).get("N", stake_ts)),
+    }
+    if "stake_address" in item:
+        stake["address"] = item["stake_address"]["S"]
+    return stake
+
+
+def get_stake_values_update(
+    table_name: str,
+    stake: dict,
+    timestamp: str,
+    wallet_id: str = DEFAULT_WALLET_ID,
+    count: int = 1,
+) -> dict:
+    """
+    Return update (TransactWriteItems 'Update') of stakes amount & count for specified wallet
+    and timestamp (time period). Item is created by the first update (ADD starts from 0).
+    Stake is subtracted with 'count' = -1 (orphaned stake).
+    """
+    return {
+        "TableName": table_name,
+        "Key": {"wallet_id": {"S": wallet_id}, "ts_id": {"S": timestamp}},
+        "UpdateExpression": "ADD stakes_amount :a, stakes_count :c",
+        "ExpressionAttributeValues": {
+            ":a": {"N": str(count * stake.get("amount", 0))},
+            ":c": {"N": str(count)},
+        },
+    }
 
 
-def put_stake_values_db(table_name: str, stake: dict, timestamp: str) -> None:
+def get_day_bucket_update(
+    table_name: str,
+    stake: dict,
+    date: datetime,
+    wallet_id: str = DEFAULT_WALLET_ID,
+    count: int = 1,
+) -> dict:
     """
-    Add or update stakes amount & count for specified timestamp (time period) in DynamoDB table.
-    Create new item if not exist.
+    Return update (TransactWriteItems 'Update') of stakes amount & count in bucket of given day.
+    Bucket is a separate item created by the first update - it expires (DynamoDB TTL 'expire_at')
+    when it drops out of the longest rolling window.
     """
-    # ts_id - timestamp id
-    dynamodb = boto3.resource("dynamodb")
-    db_table = dynamodb.Table(table_name)
+    day_start = datetime(date.year, date.month, date.day, tzinfo=timezone.utc)
+    expire_at = int((day_start + timedelta(days=DAYS_KEPT)).timestamp())
+    update = get_stake_values_update(
+        table_name=table_name,
+        stake=stake,
+        timestamp=get_day_timestamp_id(date=date),
+        wallet_id=wallet_id,
+        count=count,
+    )
+    update["UpdateExpression"] += " SET expire_at = :e"
+    update["ExpressionAttributeValues"][":e"] = {"N": str(expire_at)}
+    return update
+
 
-    item_to_update = get_db_item(table_name=table_name, part_key=timestamp)
-    if item_to_update:
-        # Update item if timestamp id (ts_id) already exist in db
-        updated_stake_data = {
-            "stakes_amount": item_to_update.get("stakes_amount", 0)
-            + stake.get("amount", 0),
-            "stakes_count": item_to_update.get("stakes_count", 0) + 1,
+def get_aggregates_updates(
+    table_name: str,
+    stake: dict,
+    date: datetime,
+    wallet_id: str = DEFAULT_WALLET_ID,
+    count: int = 1,
+) -> List[dict]:
+    """
+    Return updates (TransactWriteItems) adding stake ('count' = 1) or subtracting it ('count' = -1)
+    from month, year, all-time and day bucket rows of given date and, if stake has staking address,
+    from address' month and year rows.
+    """
+    timestamps = [
+        get_timestamp_id(date=date),
+        get_timestamp_id(month=False, date=date),
+        ALL_TIME_TS_ID,
+    ]
+    if stake.get("address"):
+        timestamps += [
+            get_address_timestamp_id(timestamp=timestamp, address=stake["address"])
+            for timestamp in timestamps[:2]
+        ]
+    updates = [
+        {
+            "Update": get_stake_values_update(
+                table_name=table_name,
+                stake=stake,
+                timestamp=timestamp,
+                wallet_id=wallet_id,
+                count=count,
+            )
         }
-        update_db_item(
-            table_name=table_name, part_key=timestamp, updated_data=updated_stake_data
-        )
-    else:
-        # Put new item if timestamp id (ts_id) not exist in db
-        item_new = {
-            "ts_id": timestamp,
-            "stakes_amount": Decimal(str(stake.get("amount", 0))),
-            "stakes_count": 1,
+        for timestamp in timestamps
+    ]
+    updates.append(
+        {
+            "Update": get_day_bucket_update(
+                table_name=table_name,
+                stake=stake,
+                date=date,
+                wallet_id=wallet_id,
+                count=count,
+            )
         }
-        db_table.put_item(Item=item_new)
+    )
+    return updates
 
 
-def get_db_item(table_name: str, part_key: str) -> dict:
+def put_stake_db(
+    stake: dict,
+    table_txid_name: str,
+    table_values_name: str,
+    wallet_id: str = DEFAULT_WALLET_ID,
+    ingest_date: Optional[datetime] = None,
+) -> bool:
     """
-    Get item from specified DynamoDB table.
-    If item not exist return {}.
+    Store new stake and add it to aggregates of ingestion date in wallet's partition and in fleet-wide
+    partition (sum over all wallets) in a single transaction - all items are written or none.
+    Return False if stake is already stored (retried or duplicated request) - aggregates are not changed.
     """
-    dynamodb = boto3.resource("dynamodb")
-    db_table = dynamodb.Table(table_name)
-    try:
-        item_data = db_table.get_item(Key={"ts_id": part_key})
-        item = item_data.get("Item", {})
-    except botocore.exceptions.ClientError as error:
-        print(error)
-        item = {}
-    if item:
-        # Convert Decimal to float or int
-        item = {
-            key: float(value)
-            for key, value in item.items()
-            if isinstance(value, Decimal)
+    ingest_date = ingest_date or datetime.now(timezone.utc)
+    transact_items = [
+        {
+            "Put": get_stake_txid_put(
+                stake=stake,
+                table_name=table_txid_name,
+                wallet_id=wallet_id,
+                ingest_date=ingest_date,
+            )
         }
-    return item
+    ]
+    for aggregate_wallet_id in [wallet_id, FLEET_WALLET_ID]:
+        transact_items.extend(
+            get_aggregates_updates(
+                table_name=table_values_name,
+                stake=stake,
+                date=ingest_date,
+                wallet_id=aggregate_wallet_id,
+            )
+        )
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.transact_write_items(TransactItems=transact_items)
+    except dynamodb.exceptions.TransactionCanceledException as error:
+        reasons = error.response.get("CancellationReasons", [])
+        if reasons and reasons[0].get("Code") == "ConditionalCheckFailed":
+            return False
+        raise
+    return True
 
 
-def update_db_item(table_name: str, part_key: str, updated_data: dict) -> None:
+def remove_stake_db(
+    txid: str,
+    table_txid_name: str,
+    table_values_name: str,
+    wallet_id: str = DEFAULT_WALLET_ID,
+) -> Optional[dict]:
     """
-    Update DynamoDB item.
+    Remove stake and subtract it from aggregates of its ingestion date in wallet's partition and in fleet-wide
+    partition in a single transaction - stake stays stored (and counted) if any write fails.
+    Return removed stake or None if stake not exist (not stored or already removed).
     """
-    dynamodb = boto3.resource("dynamodb")
-    db_table = dynamodb.Table(table_name)
-
-    db_table.update_item(
-        Key={
-            "ts_id": part_key,
-        },
-        UpdateExpression="set stakes_amount=:a, stakes_count=:c",
-        ExpressionAttributeValues={
-            ":a": Decimal(str(updated_data["stakes_amount"])),
-            ":c": Decimal(str(updated_data["stakes_count"])),
-        },
-        ReturnValues="NONE",
+    stake = get_stake_txids_db(
+        txid=txid, table_name=table_txid_name, wallet_id=wallet_id
     )
+    if not stake:
+        return None
+    ingest_date = datetime.fromtimestamp(stake["ingest_ts"], tz=timezone.utc)
+    transact_items = [
+        {
+            "Delete": {
+                "TableName": table_txid_name,
+                "Key": {"wallet_id": {"S": wallet_id}, "tx_id": {"S": txid}},
+                # Removed meanwhile by concurrent request - stake is subtracted once
+                "ConditionExpression": "attribute_exists(tx_id)",
+            }
+        }
+    ]
+    for aggregate_wallet_id in [wallet_id, FLEET_WALLET_ID]:
+        transact_items.extend(
+            get_aggregates_updates(
+                table_name=table_values_name,
+                stake=stake,
+                date=ingest_date,
+                wallet_id=aggregate_wallet_id,
+                count=-1,
+            )
+        )
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.transact_write_items(TransactItems=transact_items)
+    except dynamodb.exceptions.TransactionCanceledException as error:
+        reasons = error.response.get("CancellationReasons", [])
+        if reasons and reasons[0].get("Code") == "ConditionalCheckFailed":
+            return None
+        raise
+    return stake
 
 
 def publish_to_sns(topic_arn: str, stake: dict) -> None:
     """
     Publish a message to the SNS topic.
     """
-    sns_client = boto3.client("sns")
     stake_amount = stake["amount"]
-    sns_client.publish(
+    get_client("sns").publish(
         TopicArn=topic_arn,
         Message=f"New stake in your VRSC wallet - {stake_amount} VRSC",
         Subject="New stake",
     )
 
 
-def get_timestamp_id(
-    year: bool = True, month: bool = True, date: datetime = datetime.now(timezone.utc)
-) -> str:
+def put_stake_latency_metrics(
+    metrics: MetricsLogger, stake: dict, date: datetime
+) -> None:
     """
-    Returns timestamp id (tp_id) in format '2021-01', '2021' or '01'.
+    Put stake age at ingest (since stake tx time) and, if checker sent detection time,
+    detection delay and detection-to-ingest latency to metrics logger.
     """
-    if not year:
-        return date.strftime("%m")
-    elif not month:
-        return date.strftime("%Y")
-    return date.strftime("%Y-%m")
+    ingest_ts = date.timestamp()
+    metrics.put_metric("StakeAgeAtIngest", ingest_ts - stake["time"], unit="Seconds")
+    detected_at = stake.get("detected_at")
+    if detected_at is not None:
+        metrics.put_metric(
+            "DetectionDelay", detected_at - stake["time"], unit="Seconds"
+        )
+        metrics.put_metric(
+            "DetectionToIngestLatency", ingest_ts - detected_at, unit="Seconds"
+        )
 
 
-def lambda_handler_post(event, context) -> Union[dict, None]:
+def handle_request(
+    event: dict,
+    metrics: MetricsLogger,
+    table_values_name: str,
+    table_txid_name: str,
+    sns_topic_arn: Optional[str],
+) -> Union[dict, None]:
     """
-    Main function.
+    Handle POST or DELETE request (event in REST API mapping template shape).
+    Stake age at ingest, DynamoDB & SNS latencies and payload size are put to metrics logger.
     """
-    # Load envs
-    # Table that contains consolidated stake values for specific timestamp (time period).
-    table_values_name = os.environ.get("DYNAMODB_VALUES_NAME")
-    # Table that contains list of individual stake transactions (tx) - stake tx id, stake amount, stake timestamp.
-    table_txid_name = os.environ.get("DYNAMODB_TXIDS_NAME")
-    sns_topic_arn = os.environ.get("TOPIC_ARN")
-
     http_method = event.get("http_method")
+    if event.get("body") is not None:
+        metrics.put_metric(
+            "PayloadSize", len(json.dumps(event["body"]).encode()), unit="Bytes"
+        )
 
     if http_method == "POST":
         # POST method
         # Get stake data from POST request
         stake_data = event["body"]
+        if not validate_stake(stake_data):
+            return {"statusCode": 400, "body": json.dumps("Not valid stake data")}
+        wallet_id = get_wallet_id(event=event)
+        if not wallet_id:
+            return get_wallet_forbidden_response()
+        date_now = datetime.now(timezone.utc)
+        put_stake_latency_metrics(metrics=metrics, stake=stake_data, date=date_now)
+        metrics.set_property("txid", stake_data["txid"])
+        metrics.set_property("wallet_id", wallet_id)
 
+        # Store stake by wallet id and transaction id (txid) and update stakes amount and stakes count
+        # for its time periods in a single transaction
+        with metrics.timer("DynamoDBTransactWriteLatency"):
+            stake_added = put_stake_db(
+                stake=stake_data,
+                table_txid_name=table_txid_name,
+                table_values_name=table_values_name,
+                wallet_id=wallet_id,
+                ingest_date=date_now,
+            )
+        if not stake_added:
+            # Retried or duplicated request - stake is counted and notified once
+            metrics.set_property("duplicate", True)
+            return {"statusCode": 200, "body": json.dumps("Stake already stored")}
+
+        response = "Tables updated and notification sent!"
         if sns_topic_arn:
             # Publish msg to SNS topic
-            publish_to_sns(topic_arn=sns_topic_arn, stake=stake_data)
+            try:
+                with metrics.timer("SNSPublishLatency"):
+                    publish_to_sns(topic_arn=sns_topic_arn, stake=stake_data)
+            except get_client("sns").exceptions.ClientError as error:
+                # Stake is already stored - request sent again would be a duplicate
+                print(f"SNS publish failed: {error}")
+                metrics.set_property(
+                    "sns_error", error.response.get("Error", {}).get("Code", "")
+                )
+                response = "Tables updated, notification not sent"
 
-        # Put stake by transaction id (txid) into DynamoDB table
-        put_stake_txids_db(stake=stake_data, table_name=table_txid_name)
+        return {"statusCode": 200, "body": json.dumps(response)}
 
-        # Put or update stakes amount and stakes count for selected timestamp (time period):
-        # - month row
-        put_stake_values_db(
-            table_name=table_values_name, stake=stake_data, timestamp=get_timestamp_id()
-        )
-        # - year row
-        put_stake_values_db(
-            table_name=table_values_name,
-            stake=stake_data,
-            timestamp=get_timestamp_id(month=False),
-        )
+    if http_method == "DELETE":
+        # DELETE method - compensation for orphaned stake
+        stake_data = event["body"]
+        if not validate_stake_txid(stake_data):
+            return {"statusCode": 400, "body": json.dumps("Not valid stake data")}
+        wallet_id = get_wallet_id(event=event)
+        if not wallet_id:
+            return get_wallet_forbidden_response()
+        metrics.set_property("txid", stake_data["txid"])
+        metrics.set_property("wallet_id", wallet_id)
 
-        response = "Tables updated and notification sent!"
+        # Stake is removed and subtracted from time periods it was added to (ingestion time)
+        # in a single transaction - repeated request doesn't subtract stake twice
+        with metrics.timer("DynamoDBTransactWriteLatency"):
+            stake_removed = remove_stake_db(
+                txid=stake_data["txid"],
+                table_txid_name=table_txid_name,
+                table_values_name=table_values_name,
+                wallet_id=wallet_id,
+            )
+        if not stake_removed:
+            return {"statusCode": 404, "body": json.dumps("Stake not found")}
 
-        return {"statusCode": 200, "body": json.dumps(response)}
+        return {"statusCode": 200, "body": json.dumps("Stake removed")}
+
+
+def lambda_handler_post(event, context) -> Union[dict, None]:
+    """
+    Main function.
+    """
+    # Load envs
+    # Table that contains consolidated stake values for specific timestamp (time period).
+    table_values_name = os.environ.get("DYNAMODB_VALUES_NAME")
+    # Table that contains list of individual stake transactions (tx) - stake tx id, stake amount, stake timestamp.
+    table_txid_name = os.environ.get("DYNAMODB_TXIDS_NAME")
+    sns_topic_arn = os.environ.get("TOPIC_ARN")
+
+    event = parse_event(event=event)
+    metrics = MetricsLogger(function="post", method=event.get("http_method"))
+    retry_counter.reset()
+    try:
+        try:
+            response = handle_request(
+                event=event,
+                metrics=metrics,
+                table_values_name=table_values_name,
+                table_txid_name=table_txid_name,
+                sns_topic_arn=sns_topic_arn,
+            )
+        except get_client("dynamodb").exceptions.ClientError as error:
+            # Not stored stake is posted again by the stake checker (not 200 response)
+            response = get_aws_error_response(error=error, metrics=metrics)
+        put_retry_stats(metrics=metrics, response=response)
+        return response
+    finally:
+        metrics.flush()
@@ -0,0 +1,388 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+# The new_stake_script directory is deployed standalone - its modules use flat imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.joinpath("new_stake_script")))
+from call_aws_api import ApiCall, parse_api_body  # noqa: E402
+from check_new_stake import ApiCallError  # noqa: E402
+
+
+@dataclass
+class RequestResult:
+    """
+    The class representing result of single API request.
+    """
+
+    method: str
+    status_code: int
+    latency: float
+    amount: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    @property
+    def throttled(self) -> bool:
+        return self.status_code == 429
+
+
+def percentile(values: List[float], percent: int) -> float:
+    """
+    Return percentile of values (0 if no values).
+    """
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class SimulatedWallet:
+    """
+    The class representing single wallet posting stakes and polling stakes data at configured rates.
+    """
+
+    def __init__(
+        self, api_call: ApiCall, post_rate: float, get_rate: float, stop_at: float
+    ) -> None:
+        self.api_call = api_call
+        self.post_rate = post_rate
+        self.get_rate = get_rate
+        self.stop_at = stop_at
+        self.results: List[RequestResult] = []
+        self._lock = threading.Lock()
+
+    def _request(self, method: str, data: dict, amount: float = 0.0) -> None:
+        """
+        Send single request and store its result.
+        Connection errors are recorded with status code 0.
+        """
+        start = time.perf_counter()
+        try:
+            status_code = self.api_call.api.send(method=method, data=data).status_code
+        except (requests.exceptions.RequestException, ApiCallError):
+            # Connection error or access token can't be fetched
+            status_code = 0
+        result = RequestResult(
+            method=method,
+            status_code=status_code,
+            latency=time.perf_counter() - start,
+            amount=amount,
+        )
+        with self._lock:
+            self.results.append(result)
+
+    def _post_stake(self) -> None:
+        amount = round(random.uniform(1, 100), 8)
+        data = {
+            "txid": uuid.uuid4().hex,
+            "time": int(datetime.now(timezone.utc).timestamp()),
+            "amount": amount,
+        }
+        self._request(method="post", data=data, amount=amount)
+
+    def _get_stakes(self) -> None:
+        self._request(method="get", data={})
+
+    def _run_at_rate(self, action, rate: float) -> None:
+        """
+        Run action 'rate' times per second until stop time (first run at random offset).
+        """
+        interval = 1 / rate
+        next_run = time.monotonic() + random.uniform(0, interval)
+        while next_run < self.stop_at:
+            time.sleep(max(0.0, next_run - time.monotonic()))
+            action()
+            next_run += interval
+
+    def threads(self) -> List[threading.Thread]:
+        """
+        Return (not started) threads generating wallet's load.
+        """
+        threads = []
+        if self.post_rate:
+            threads.append(
+                threading.Thread(
+                    target=self._run_at_rate, args=(self._post_stake, self.post_rate)
+                )
+            )
+        if self.get_rate:
+            threads.append(
+                threading.Thread(
+                    target=self._run_at_rate, args=(self._get_stakes, self.get_rate)
+                )
+            )
+        return threads
+
+
+class LoadGenerator:
+    """
+    The class responsible for running load against stake API and reporting results.
+    """
+
+    def __init__(
+        self,
+        wallets: int,
+        duration: float,
+        post_rate: float,
+        get_rate: float,
+        env_api_filenames: List[str],
+    ) -> None:
+        self.wallets = wallets
+        self.duration = duration
+        self.post_rate = post_rate
+        self.get_rate = get_rate
+        # API env files (one per Cognito client - wallet id) assigned to simulated wallets in turn
+        self.env_api_filenames = env_api_filenames
+        self.results: List[RequestResult] = []
+        self.elapsed = 0.0
+        self.totals_before: Dict = {}
+        self.totals_after: Dict = {}
+
+    @property
+    def wallets_env_api_filenames(self) -> List[str]:
+        """
+        Return API env file of each simulated wallet.
+        """
+        return [
+            self.env_api_filenames[index % len(self.env_api_filenames)]
+            for index in range(self.wallets)
+        ]
+
+    def _get_wallet_totals(self, env_api_filename: str, attempts: int) -> Dict:
+        """
+        Return current month stakes count and amount of wallet (Cognito client) from API env file.
+        Throttled request is retried with backoff.
+        """
+        api_call = ApiCall(env_api_filename=env_api_filename)
+        for attempt in range(attempts):
+            response = api_call.api.send(method="get", data={})
+            if response.status_code != 429:
+                break
+            time.sleep(0.1 * 2**attempt)
+        api_call.api._check_response_status(response)
+        return parse_api_body(response.json())
+
+    def _get_totals(self, attempts: int = 10) -> Dict:
+        """
+        Return current month stakes count and amount summed over simulated wallets.
+        """
+        totals = {"stakes_count": 0, "stakes_amount": 0}
+        for env_api_filename in sorted(set(self.wallets_env_api_filenames)):
+            wallet_totals = self._get_wallet_totals(
+                env_api_filename=env_api_filename, attempts=attempts
+            )
+            for key in totals:
+                totals[key] += wallet_totals.get(key, 0)
+        return totals
+
+    def run(self) -> Dict:
+        """
+        Run load and return report.
+        """
+        self.totals_before = self._get_totals()
+        start = time.monotonic()
+        stop_at = start + self.duration
+        wallets = [
+            SimulatedWallet(
+                api_call=ApiCall(env_api_filename=env_api_filename),
+                post_rate=self.post_rate,
+                get_rate=self.get_rate,
+                stop_at=stop_at,
+            )
+            for env_api_filename in self.wallets_env_api_filenames
+        ]
+        threads = [thread for wallet in wallets for thread in wallet.threads()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - start
+        self.results = [result for wallet in wallets for result in wallet.results]
+        self.totals_after = self._get_totals()
+        return self.report()
+
+    def _method_report(self, method: str) -> Dict:
+        """
+        Return throughput, latency percentiles (ms), throttles and errors of selected HTTP method.
+        """
+        results = [result for result in self.results if result.method == method]
+        latencies = sorted(result.latency * 1000 for result in results if result.ok)
+        return {
+            "requests": len(results),
+            "ok": sum(result.ok for result in results),
+            "throttled": sum(result.throttled for result in results),
+            "errors": sum(not result.ok and not result.throttled for result in results),
+            "throughput_rps": round(len(results) / self.elapsed, 2)
+            if self.elapsed
+            else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 2),
+                "p90": round(percentile(latencies, 90), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "max": round(max(latencies, default=0.0), 2),
+            },
+        }
+
+    def _correctness_report(self) -> Dict:
+        """
+        Compare acknowledged stakes with the change of aggregated stakes data.
+        """
+        posted = [
+            result for result in self.results if result.method == "post" and result.ok
+        ]
+        expected_count = len(posted)
+        expected_amount = round(sum(result.amount for result in posted), 8)
+        actual_count = int(
+            self.totals_after.get("stakes_count", 0)
+            - self.totals_before.get("stakes_count", 0)
+        )
+        actual_amount = round(
+            self.totals_after.get("stakes_amount", 0)
+            - self.totals_before.get("stakes_amount", 0),
+            8,
+        )
+        return {
+            "expected_count": expected_count,
+            "actual_count": actual_count,
+            "expected_amount": expected_amount,
+            "actual_amount": actual_amount,
+            "consistent": expected_count == actual_count
+            and abs(expected_amount - actual_amount) < 1e-6,
+        }
+
+    def report(self) -> Dict:
+        """
+        Return load test report.
+        """
+        return {
+            "wallets": self.wallets,
+            "duration_s": round(self.elapsed, 2),
+            "throughput_rps": round(len(self.results) / self.elapsed, 2)
+            if self.elapsed
+            else 0.0,
+            "post": self._method_report(method="post"),
+            "get": self._method_report(method="get"),
+            "correctness": self._correctness_report(),
+        }
+
+
+def run_local(args: argparse.Namespace) -> Optional[Dict]:
+    """
+    Run load against local stand-in (Lambda handlers with moto-backed DynamoDB and SNS).
+    Each simulated wallet uses its own Cognito client id - its own wallet id.
+    """
+    import tempfile
+
+    from local_stack import LambdaApiServer
+
+    server = LambdaApiServer(
+        rate_limit=args.rate_limit,
+        lambda_concurrency=args.lambda_concurrency,
+        api_type=args.api_type,
+    )
+    server.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env_api_filenames = []
+            for index in range(args.wallets):
+                env_api_path = Path(tmp_dir).joinpath(f".env-api-local-{index}")
+                server.write_env_api_file(
+                    path=env_api_path, client_id=f"load-wallet-{index}"
+                )
+                env_api_filenames.append(str(env_api_path))
+            report = LoadGenerator(
+                wallets=args.wallets,
+                duration=args.duration,
+                post_rate=args.post_rate,
+                get_rate=args.get_rate,
+                env_api_filenames=env_api_filenames,
+            ).run()
+        report["lambda_errors"] = len(server.lambda_errors)
+        return report
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="The load and soak test generator for the verus-notification API"
+    )
+    parser.add_argument(
+        "-w", "--wallets", type=int, default=5, help="number of simulated wallets"
+    )
+    parser.add_argument(
+        "-d", "--duration", type=float, default=30, help="test duration in seconds"
+    )
+    parser.add_argument(
+        "--post-rate",
+        type=float,
+        default=0.5,
+        help="stakes posted per second by each wallet (default: 0.5)",
+    )
+    parser.add_argument(
+        "--get-rate",
+        type=float,
+        default=0.2,
+        help="GET polls per second by each wallet (default: 0.2)",
+    )
+    parser.add_argument(
+        "--target-env",
+        type=str,
+        nargs="+",
+        help="API env file(s) in new_stake_script dir of deployed test stack - required without --local "
+        "(stakes are stored in DynamoDB tables and notified with SNS). Each file should hold its own "
+        "Cognito app client (wallet id) - files are assigned to simulated wallets in turn",
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="run against local Lambda handlers with moto-backed DynamoDB and SNS",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0,
+        help="local API throttling limit in requests per second (default: 0 - no limit)",
+    )
+    parser.add_argument(
+        "--lambda-concurrency",
+        type=int,
+        default=10,
+        help="local Lambda concurrency limit (default: 10)",
+    )
+    parser.add_argument(
+        "--api-type",
+        choices=["rest", "http"],
+        default="rest",
+        help="local API Gateway type - REST API mapping templates or HTTP API proxy events (default: rest)",
+    )
+    args = parser.parse_args()
+    if args.local:
+        load_report = run_local(args)
+    elif not args.target_env:
+        parser.error(
+            "--target-env is required without --local - load is sent to deployed API"
+        )
+    else:
+        load_report = LoadGenerator(
+            wallets=args.wallets,
+            duration=args.duration,
+            post_rate=args.post_rate,
+            get_rate=args.get_rate,
+            env_api_filenames=args.target_env,
+        ).run()
+    print(json.dumps(load_report, indent=2))
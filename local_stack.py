@@ -0,0 +1,901 @@
+import base64
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path, PosixPath
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+# Lambda handlers are deployed as zips with shared module at zip root - they use flat imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.joinpath("lambda_functions")))
+
+
+# The 'verus' CLI shim. It answers Verus RPC calls with data from wallet state file (JSON) stored next to it.
+VERUS_SHIM_TEMPLATE = """#!{python}
+import json
+import sys
+from pathlib import Path
+
+state = json.loads(Path(__file__).resolve().parent.joinpath("{state_filename}").read_text())
+command, params = sys.argv[1], sys.argv[2:]
+if command == "getwalletinfo":
+    print(json.dumps(state["walletinfo"]))
+elif command == "getmininginfo":
+    print(json.dumps({{**state["mininginfo"], "blocks": state["blockcount"]}}))
+elif command == "getbestblockhash":
+    print(state["bestblockhash"])
+elif command == "getblockcount":
+    print(json.dumps(state["blockcount"]))
+elif command == "listtransactions":
+    count = int(params[1]) if len(params) > 1 else 10
+    print(json.dumps(state["transactions"][-count:]))
+elif command == "gettransaction":
+    txs = {{tx["txid"]: tx for tx in state["transactions"]}}
+    if params[0] not in txs:
+        print("error code: -5", file=sys.stderr)
+        print("error message:", file=sys.stderr)
+        print("Invalid or non-wallet transaction id", file=sys.stderr)
+        sys.exit(1)
+    tx = txs[params[0]]
+    confirmations = 0 if tx["category"] == "orphan" else state["blockcount"] - tx["height"] + 1
+    print(json.dumps({{**tx, "confirmations": confirmations, "details": [{{"category": tx["category"]}}]}}))
+else:
+    print(f"error: unknown command {{command}}", file=sys.stderr)
+    sys.exit(1)
+"""
+
+
+class FakeRpcError(Exception):
+    """
+    Verus RPC call error (JSON-RPC error code and message).
+    """
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeVerusWallet:
+    """
+    The class representing local stand-in for Verus wallet (verusd process and verus CLI).
+    """
+
+    def __init__(self, directory: PosixPath, process_name: str = "verusd") -> None:
+        self.directory = Path(directory)
+        self.process_name = process_name
+        self.state_filename = "wallet_state.json"
+        self.walletinfo = {
+            "txcount": 0,
+            "immature_balance": 0.0,
+            "eligible_staking_balance": 1000.0,
+        }
+        self.mininginfo = {"staking": True, "generate": True, "stakingsupply": 1e7}
+        self.transactions = []
+        self.blockcount = 0
+        # Snapshot of the last stored state - read by JSON-RPC server threads
+        self._state: Dict = {}
+        self._process = None
+        self._write_shim()
+        self._store_state()
+
+    @property
+    def state_file_path(self) -> PosixPath:
+        """
+        Return wallet state file absolute path.
+        """
+        return self.directory.joinpath(self.state_filename)
+
+    def _write_shim(self) -> None:
+        """
+        Create executable 'verus' CLI shim in wallet directory.
+        """
+        shim_path = self.directory.joinpath("verus")
+        shim_path.write_text(
+            VERUS_SHIM_TEMPLATE.format(
+                python=sys.executable, state_filename=self.state_filename
+            )
+        )
+        shim_path.chmod(0o755)
+
+    def _store_state(self) -> None:
+        """
+        Store wallet state in state file read by 'verus' CLI shim.
+        """
+        state = {
+            "walletinfo": self.walletinfo,
+            "mininginfo": self.mininginfo,
+            "transactions": self.transactions,
+            "blockcount": self.blockcount,
+            "bestblockhash": self.best_block_hash,
+        }
+        state_json = json.dumps(state)
+        self._state = json.loads(state_json)
+        self.state_file_path.write_text(state_json)
+
+    def rpc_call(self, method: str, params: list):
+        """
+        Return result of Verus RPC call - the same as returned by 'verus' CLI shim.
+        """
+        state = self._state
+        if method == "getwalletinfo":
+            return state["walletinfo"]
+        if method == "getmininginfo":
+            return {**state["mininginfo"], "blocks": state["blockcount"]}
+        if method == "getbestblockhash":
+            return state["bestblockhash"]
+        if method == "getblockcount":
+            return state["blockcount"]
+        if method == "listtransactions":
+            count = int(params[1]) if len(params) > 1 else 10
+            return state["transactions"][-count:]
+        if method == "gettransaction":
+            txs = {tx["txid"]: tx for tx in state["transactions"]}
+            if not params or params[0] not in txs:
+                raise FakeRpcError(
+                    code=-5, message="Invalid or non-wallet transaction id"
+                )
+            tx = txs[params[0]]
+            confirmations = (
+                0
+                if tx["category"] == "orphan"
+                else state["blockcount"] - tx["height"] + 1
+            )
+            return {
+                **tx,
+                "confirmations": confirmations,
+                "details": [{"category": tx["category"]}],
+            }
+        raise FakeRpcError(code=-32601, message="Method not found")
+
+    @property
+    def best_block_hash(self) -> str:
+        """
+        Return dummy hash of the best (tip) block.
+        """
+        return hashlib.sha256(str(self.blockcount).encode()).hexdigest()
+
+    def add_block(self) -> None:
+        """
+        Add new block (without wallet's stake) to the chain.
+        """
+        self.blockcount += 1
+        self._store_state()
+
+    def add_stake(
+        self, txid: str, time: int, amount: float = 12.0, address: str = "RXXX"
+    ) -> None:
+        """
+        Add new block with stake (mint) transaction to the wallet.
+        """
+        self.blockcount += 1
+        self.transactions.append(
+            {
+                "address": address,
+                "category": "mint",
+                "amount": amount,
+                "txid": txid,
+                "time": time,
+                "height": self.blockcount,
+            }
+        )
+        self.walletinfo["txcount"] += 1
+        self._store_state()
+
+    def add_blocks(self, number: int) -> None:
+        """
+        Add 'number' new blocks (without wallet's stake) to the chain.
+        """
+        self.blockcount += number
+        self._store_state()
+
+    def orphan_stake(self, txid: str) -> None:
+        """
+        Mark wallet's stake as orphaned - its block was replaced by another block at the same height.
+        """
+        for tx in self.transactions:
+            if tx["txid"] == txid:
+                tx["category"] = "orphan"
+        # Chain tip changes after reorganization
+        self.add_block()
+
+    def set_staking(self, staking: bool, eligible_balance: float = 1000.0) -> None:
+        """
+        Set wallet's staking status and balance eligible for staking.
+        """
+        self.mininginfo["staking"] = staking
+        self.walletinfo["eligible_staking_balance"] = eligible_balance
+        self._store_state()
+
+    def start(self) -> None:
+        """
+        Start dummy process that pretends to be 'verusd' running in wallet directory.
+        """
+        # Copy of 'sleep' binary named as 'verusd' - discoverable by name with wallet directory as cwd
+        process_path = self.directory.joinpath(self.process_name)
+        shutil.copy(shutil.which("sleep"), process_path)
+        self._process = subprocess.Popen(
+            [str(process_path), "3600"], cwd=self.directory
+        )
+
+    def stop(self) -> None:
+        """
+        Terminate dummy 'verusd' process.
+        """
+        if self._process:
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
+
+
+class ScriptedChain:
+    """
+    The class representing scripted chain played step by step on local Verus wallet stand-in.
+    Script steps: 'block' (block without wallet's stake), 'stake <txid> [amount]' (block with
+    wallet's stake) and 'orphan <txid>' (reorganization orphaning wallet's stake).
+    """
+
+    def __init__(
+        self,
+        wallet: FakeVerusWallet,
+        script: List[str],
+        confirmations: int = 3,
+        start_time: int = 1632750000,
+    ) -> None:
+        self.wallet = wallet
+        self.steps = [step.split() for step in script]
+        self.confirmations = confirmations
+        self.start_time = start_time
+        self.position = 0
+        # Monotonic time when stake got required number of confirmations (detectable by stake checker)
+        self.confirmed_at: Dict[str, float] = {}
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.steps)
+
+    def step(self) -> None:
+        """
+        Play next script step on wallet.
+        """
+        command, *args = self.steps[self.position]
+        self.position += 1
+        if command == "block":
+            self.wallet.add_block()
+        elif command == "stake":
+            amount = float(args[1]) if len(args) > 1 else 12.0
+            self.wallet.add_stake(
+                txid=args[0], time=self.start_time + self.position, amount=amount
+            )
+        elif command == "orphan":
+            self.wallet.orphan_stake(txid=args[0])
+        else:
+            raise ValueError(f"Unknown chain script step: {command}")
+        now = time.monotonic()
+        for tx in self.wallet.transactions:
+            confirmed = (
+                tx["category"] == "mint"
+                and self.wallet.blockcount - tx["height"] + 1 >= self.confirmations
+            )
+            if confirmed:
+                self.confirmed_at.setdefault(tx["txid"], now)
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """
+    The class representing local HTTP server run in a background thread (random free port).
+    """
+
+    def __init__(self, handler_class) -> None:
+        super().__init__(("127.0.0.1", 0), handler_class)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """
+        Serve requests in background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving requests and close server socket.
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+class FakeVerusRpcHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving Verus daemon JSON-RPC interface (single and batched requests).
+    """
+
+    server: "FakeVerusRpcServer"
+
+    def log_message(self, format: str, *args) -> None:
+        # Keep test and benchmark output clean
+        pass
+
+    def _call(self, request: dict) -> dict:
+        """
+        Return JSON-RPC response to single call.
+        """
+        self.server.calls += 1
+        response = {"result": None, "error": None, "id": request.get("id")}
+        try:
+            response["result"] = self.server.wallet.rpc_call(
+                method=request.get("method", ""), params=request.get("params", [])
+            )
+        except FakeRpcError as error:
+            response["error"] = {"code": error.code, "message": error.message}
+        return response
+
+    def do_POST(self) -> None:
+        self.server.requests += 1
+        if self.headers.get("Authorization") != self.server.authorization:
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        if isinstance(payload, list):
+            response = [self._call(request) for request in payload]
+        else:
+            response = self._call(payload)
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeVerusRpcServer(LocalHTTPServer):
+    """
+    The class representing local stand-in for Verus daemon JSON-RPC interface.
+    Calls are answered with data of local Verus wallet stand-in.
+    """
+
+    rpc_user = "local-user"
+    rpc_password = "local-password"
+
+    def __init__(self, wallet: FakeVerusWallet) -> None:
+        super().__init__(FakeVerusRpcHandler)
+        self.wallet = wallet
+        credentials = f"{self.rpc_user}:{self.rpc_password}".encode()
+        self.authorization = f"Basic {base64.b64encode(credentials).decode()}"
+        # Number of HTTP requests and single calls (batched request holds many calls)
+        self.requests = 0
+        self.calls = 0
+
+    def write_conf_file(self, path: PosixPath) -> None:
+        """
+        Write Verus daemon config file (VRSC.conf) with JSON-RPC credentials of local server.
+        """
+        host, port = self.server_address[:2]
+        Path(path).write_text(
+            f"rpcuser={self.rpc_user}\n"
+            f"rpcpassword={self.rpc_password}\n"
+            f"rpchost={host}\n"
+            f"rpcport={port}\n"
+        )
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving Cognito token endpoint and API Gateway stake endpoint.
+    """
+
+    server: "FakeApiServer"
+    # Cognito client id of request's access token (set by access check)
+    client_id: Optional[str] = None
+
+    def log_message(self, format: str, *args) -> None:
+        # Keep test and benchmark output clean
+        pass
+
+    def _send_json(self, data: dict, status_code: int = 200) -> None:
+        """
+        Send JSON response.
+        """
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        """
+        Return request body.
+        """
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_POST(self) -> None:
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path == self.server.token_path:
+            self.server.token_requests += 1
+            self._send_json(
+                {
+                    "access_token": self.server.issue_access_token(
+                        client_id=self._get_basic_auth_user()
+                    ),
+                    "expires_in": 3600,
+                    "token_type": "Bearer",
+                }
+            )
+        elif path == self.server.api_path:
+            if self._check_api_access():
+                self._handle_api_post(body=json.loads(body))
+        else:
+            self._send_json({"message": "Not Found"}, status_code=404)
+
+    def do_DELETE(self) -> None:
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path != self.server.api_path:
+            self._send_json({"message": "Not Found"}, status_code=404)
+            return
+        if self._check_api_access():
+            self._handle_api_delete(body=json.loads(body))
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != self.server.api_path:
+            self._send_json({"message": "Not Found"}, status_code=404)
+            return
+        if self._check_api_access():
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._handle_api_get(query=query)
+
+    def _get_basic_auth_user(self) -> str:
+        """
+        Return user (Cognito client id) of HTTP Basic authentication ('' if not sent).
+        """
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("Basic "):
+            return ""
+        credentials = base64.b64decode(authorization[len("Basic ") :]).decode()
+        return credentials.partition(":")[0]
+
+    def _check_api_access(self) -> bool:
+        """
+        Check access token and API throttling limit. Send error response if request is rejected.
+        Cognito client id of the token is stored as 'client_id' (authorizer claim).
+        """
+        self.client_id = self.server.access_tokens.get(
+            self.headers.get("Authorization")
+        )
+        if not self.client_id:
+            self._send_json({"message": "Unauthorized"}, status_code=401)
+            return False
+        if not self.server.acquire_request_token():
+            self._send_json({"message": "Too Many Requests"}, status_code=429)
+            return False
+        return True
+
+    def _handle_api_post(self, body: dict) -> None:
+        """
+        Record posted stake. Stakes with txid in server's 'fail_txids' are rejected.
+        """
+        if body.get("txid") in self.server.fail_txids:
+            self._send_json({"message": "Internal Server Error"}, status_code=500)
+            return
+        self.server.stakes.append(body)
+        self._send_json(
+            {
+                "statusCode": 200,
+                "body": json.dumps("Tables updated and notification sent!"),
+            }
+        )
+
+    def _handle_api_delete(self, body: dict) -> None:
+        """
+        Remove recorded stake (orphaned stake).
+        """
+        stakes = [
+            stake for stake in self.server.stakes if stake["txid"] != body["txid"]
+        ]
+        if len(stakes) == len(self.server.stakes):
+            self._send_json({"statusCode": 404, "body": json.dumps("Stake not found")})
+            return
+        self.server.stakes = stakes
+        self.server.removed_txids.append(body["txid"])
+        self._send_json({"statusCode": 200, "body": json.dumps("Stake removed")})
+
+    def _handle_api_get(self, query: dict) -> None:
+        """
+        Return count and sum of recorded stakes.
+        """
+        response = {
+            "timeframe": "-".join(
+                value for value in [query.get("year"), query.get("month")] if value
+            ),
+            "stakes_count": len(self.server.stakes),
+            "stakes_amount": sum(stake["amount"] for stake in self.server.stakes),
+        }
+        self._send_json({"statusCode": 200, "body": json.dumps(response)})
+
+
+class FakeApiServer(LocalHTTPServer):
+    """
+    The class representing local stand-in for Cognito and API Gateway (HTTP server run in a thread).
+    """
+
+    token_path = "/oauth2/token"
+    api_path = "/stake"
+    client_id = "local-client-id"
+
+    def __init__(self, handler_class=FakeApiHandler, rate_limit: float = 0) -> None:
+        super().__init__(handler_class)
+        self.stakes: List[Dict] = []
+        self.removed_txids: List[str] = []
+        # Posting of stakes with these txids fails (API error simulation)
+        self.fail_txids: Set[str] = set()
+        self.token_requests = 0
+        # Issued access tokens with Cognito client id they were issued for
+        self.access_tokens: Dict[str, str] = {}
+        # API throttling (token bucket) - 'rate_limit' requests per second, 0 means no limit
+        self.rate_limit = rate_limit
+        self._bucket_tokens = rate_limit
+        self._bucket_updated = time.monotonic()
+        self._bucket_lock = threading.Lock()
+
+    def acquire_request_token(self) -> bool:
+        """
+        Take token from API throttling bucket. Return False if request should be throttled.
+        """
+        if not self.rate_limit:
+            return True
+        with self._bucket_lock:
+            now = time.monotonic()
+            elapsed = now - self._bucket_updated
+            self._bucket_tokens = min(
+                self.rate_limit, self._bucket_tokens + elapsed * self.rate_limit
+            )
+            self._bucket_updated = now
+            if self._bucket_tokens < 1:
+                return False
+            self._bucket_tokens -= 1
+            return True
+
+    def issue_access_token(self, client_id: str) -> str:
+        """
+        Return access token of Cognito client - any client id is accepted (default one if not given).
+        """
+        client_id = client_id or self.client_id
+        access_token = f"test-token-{client_id}"
+        self.access_tokens[access_token] = client_id
+        return access_token
+
+    def get_env_api_data(self, client_id: Optional[str] = None) -> dict:
+        """
+        Return API env data pointing to local server (default Cognito client id if not given).
+        """
+        return {
+            "NOTIFICATION_API_URL": f"{self.url}{self.api_path}",
+            "COGNITO_CLIENT_ID": client_id or self.client_id,
+            "COGNITO_CLIENT_SECRET": "local-client-secret",
+            "COGNITO_TOKEN_URL": f"{self.url}{self.token_path}",
+            "COGNITO_CUSTOM_SCOPES": "verus-api/access",
+        }
+
+    def write_env_api_file(
+        self, path: PosixPath, client_id: Optional[str] = None
+    ) -> None:
+        """
+        Write .env-api file pointing to local server (default Cognito client id if not given).
+        """
+        content = "".join(
+            f"{key}='{value}'\n"
+            for key, value in self.get_env_api_data(client_id=client_id).items()
+        )
+        Path(path).write_text(content)
+
+
+# Global secondary index of txids table - the same as in Terraform configuration
+STAKE_TS_INDEX = {
+    "IndexName": "stake_ts_index",
+    "KeySchema": [
+        {"AttributeName": "wallet_id", "KeyType": "HASH"},
+        {"AttributeName": "stake_ts", "KeyType": "RANGE"},
+    ],
+    "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["stake_amount"]},
+    "ProvisionedThroughput": {"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+}
+
+
+class LocalAwsBackend:
+    """
+    The class representing moto-backed DynamoDB tables and SNS topic used by Lambda handlers.
+    Resources are created the same way as in Terraform configuration.
+    """
+
+    def __init__(self, region: str = "eu-west-1") -> None:
+        self.region = region
+        self.table_txids_name = "verus_stakes_txids_table_local"
+        self.table_values_name = "verus_stakes_values_table_local"
+        self._mock = None
+        self._env_previous: Dict[str, Optional[str]] = {}
+
+    def start(self) -> None:
+        """
+        Start AWS services mock, create resources and set Lambda environment variables.
+        """
+        import boto3
+        from moto import mock_aws
+
+        for env in [
+            "AWS_ACCESS_KEY_ID",
+            "AWS_SECRET_ACCESS_KEY",
+            "AWS_SECURITY_TOKEN",
+            "AWS_SESSION_TOKEN",
+        ]:
+            self._set_env(env, "testing")
+        self._set_env("AWS_DEFAULT_REGION", self.region)
+        self._mock = mock_aws()
+        self._mock.start()
+        dynamodb = boto3.client("dynamodb")
+        for table_name, key in [
+            (self.table_txids_name, "tx_id"),
+            (self.table_values_name, "ts_id"),
+        ]:
+            dynamodb.create_table(
+                TableName=table_name,
+                AttributeDefinitions=[
+                    {"AttributeName": "wallet_id", "AttributeType": "S"},
+                    {"AttributeName": key, "AttributeType": "S"},
+                ],
+                KeySchema=[
+                    {"AttributeName": "wallet_id", "KeyType": "HASH"},
+                    {"AttributeName": key, "KeyType": "RANGE"},
+                ],
+                BillingMode="PROVISIONED",
+                ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+            )
+        dynamodb.update_table(
+            TableName=self.table_txids_name,
+            AttributeDefinitions=[{"AttributeName": "stake_ts", "AttributeType": "N"}],
+            GlobalSecondaryIndexUpdates=[{"Create": STAKE_TS_INDEX}],
+        )
+        topic = boto3.client("sns").create_topic(Name="verus_topic_local")
+        self._set_env("DYNAMODB_TXIDS_NAME", self.table_txids_name)
+        self._set_env("DYNAMODB_VALUES_NAME", self.table_values_name)
+        self._set_env("TOPIC_ARN", topic["TopicArn"])
+
+    def _set_env(self, name: str, value: str) -> None:
+        """
+        Set environment variable and remember its previous value.
+        """
+        self._env_previous.setdefault(name, os.environ.get(name))
+        os.environ[name] = value
+
+    def stop(self) -> None:
+        """
+        Stop AWS services mock (all resources are removed) and restore environment variables.
+        """
+        if self._mock:
+            self._mock.stop()
+            self._mock = None
+        for name, value in self._env_previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self._env_previous = {}
+
+
+class LambdaApiHandler(FakeApiHandler):
+    """
+    Request handler passing API Gateway stake endpoint requests to the Lambda handlers.
+    Lambda events are shaped the same way as by REST API mapping templates or
+    HTTP API proxy integration (payload format version 2.0).
+    """
+
+    server: "LambdaApiServer"
+
+    def _invoke(
+        self, handler, event: dict, persisted_txid: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Invoke Lambda handler, send its result as API Gateway does and return the result (None on error).
+        REST API (non-proxy integration) returns handler's result as response body.
+        HTTP API (proxy integration) uses handler's 'statusCode' and 'body' as response.
+        Stake 'persisted_txid' is recorded as persisted before the response is sent - client
+        receiving the response sees the stake recorded.
+        """
+        with self.server.lambda_concurrency:
+            try:
+                result = handler(event, {})
+            except Exception as error:
+                self.server.lambda_errors.append(repr(error))
+                self._send_json({"message": "Internal server error"}, status_code=502)
+                return None
+        if persisted_txid and result and result["statusCode"] == 200:
+            self.server.persisted_at.setdefault(persisted_txid, time.monotonic())
+        if self.server.api_type == "http":
+            body = result["body"].encode()
+            self.send_response(result["statusCode"])
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(result)
+        return result
+
+    def _http_api_event(self, method: str, **event_data) -> dict:
+        """
+        Return HTTP API proxy event (payload format version 2.0).
+        """
+        return {
+            "version": "2.0",
+            "routeKey": f"{method} {self.server.api_path}",
+            "rawPath": self.server.api_path,
+            "requestContext": {
+                "authorizer": {"jwt": {"claims": {"client_id": self.client_id}}},
+                "http": {"method": method, "path": self.server.api_path},
+            },
+            "isBase64Encoded": False,
+            **event_data,
+        }
+
+    def _handle_api_post(self, body: dict) -> None:
+        from lambda_functions.lambda_function_post import lambda_handler_post
+
+        if self.server.api_type == "http":
+            event = self._http_api_event(method="POST", body=json.dumps(body))
+        else:
+            event = {
+                "body": body,
+                "client_id": self.client_id,
+                "http_method": "POST",
+            }
+        self._invoke(lambda_handler_post, event, persisted_txid=body.get("txid"))
+
+    def _handle_api_delete(self, body: dict) -> None:
+        from lambda_functions.lambda_function_post import lambda_handler_post
+
+        if self.server.api_type == "http":
+            event = self._http_api_event(method="DELETE", body=json.dumps(body))
+        else:
+            event = {
+                "body": body,
+                "client_id": self.client_id,
+                "http_method": "DELETE",
+            }
+        self._invoke(lambda_handler_post, event)
+
+    def _handle_api_get(self, query: dict) -> None:
+        from lambda_functions.lambda_function_get import (
+            QUERY_PARAMS,
+            lambda_handler_get,
+        )
+
+        if self.server.api_type == "http":
+            event = self._http_api_event(
+                method="GET", queryStringParameters=query or None
+            )
+        else:
+            event = {
+                **{param: query.get(param, "") for param in QUERY_PARAMS},
+                "client_id": self.client_id,
+                "http_method": "GET",
+            }
+        self._invoke(lambda_handler_get, event)
+
+
+class LambdaApiServer(FakeApiServer):
+    """
+    The class representing local stand-in for Cognito and API Gateway with real Lambda handlers
+    behind it (moto-backed DynamoDB and SNS).
+    """
+
+    def __init__(
+        self,
+        rate_limit: float = 0,
+        lambda_concurrency: int = 10,
+        api_type: str = "rest",
+    ) -> None:
+        super().__init__(handler_class=LambdaApiHandler, rate_limit=rate_limit)
+        # API Gateway type - 'rest' (mapping templates) or 'http' (proxy integration)
+        self.api_type = api_type
+        self.aws_backend = LocalAwsBackend()
+        # Max number of Lambda invocations processed at the same time
+        self.lambda_concurrency = threading.BoundedSemaphore(lambda_concurrency)
+        self.lambda_errors: List[str] = []
+        # Monotonic time when stake was stored in DynamoDB for the first time (by txid)
+        self.persisted_at: Dict[str, float] = {}
+
+    def start(self) -> None:
+        import lambda_common
+
+        self.aws_backend.start()
+        # Lambda clients are cached (shared by both handlers) - new clients have to be created for mocked AWS services
+        lambda_common.get_client.cache_clear()
+        super().start()
+
+    def stop(self) -> None:
+        super().stop()
+        self.aws_backend.stop()
+
+
+class LocalStack:
+    """
+    The class representing complete local stand-in stack for end-to-end tests: Verus wallet
+    ('verusd' JSON-RPC server and 'verus' CLI shim) and Cognito and API Gateway with Lambda handlers.
+    All files (wallet state, VRSC.conf, .env-api, tx history) are stored in 'directory'.
+    """
+
+    def __init__(self, directory: PosixPath, api_type: str = "rest") -> None:
+        self.directory = Path(directory)
+        self.wallet = FakeVerusWallet(directory=self.directory)
+        self.rpc_server = FakeVerusRpcServer(wallet=self.wallet)
+        self.api_server = LambdaApiServer(api_type=api_type)
+        self.verus_conf_path = self.directory.joinpath("VRSC.conf")
+        self.env_api_path = self.directory.joinpath(".env-api-local")
+
+    def start(self) -> None:
+        """
+        Start all stand-in services and write their config files.
+        """
+        self.wallet.start()
+        self.rpc_server.start()
+        self.api_server.start()
+        self.rpc_server.write_conf_file(path=self.verus_conf_path)
+        self.api_server.write_env_api_file(path=self.env_api_path)
+
+    def stop(self) -> None:
+        """
+        Stop all stand-in services.
+        """
+        self.api_server.stop()
+        self.rpc_server.stop()
+        self.wallet.stop()
+
+    def create_stake_checker(self, **kwargs):
+        """
+        Return VerusStakeChecker object using stand-in services (single cron invocation).
+        """
+        from new_stake_script.check_new_stake import VerusStakeChecker
+
+        return VerusStakeChecker(
+            tx_hist_filename=str(self.directory.joinpath("tx_history_local.json")),
+            env_api_filename=str(self.env_api_path),
+            verus_conf_path=self.verus_conf_path,
+            **kwargs,
+        )
+
+    def play(self, script: List[str], confirmations: int = 3) -> Dict[str, float]:
+        """
+        Play chain script with stake checker run after each block.
+        Return detection-to-persist latency (seconds) of each persisted stake - time from
+        stake getting required confirmations to its first write in DynamoDB.
+        """
+        chain = ScriptedChain(
+            wallet=self.wallet, script=script, confirmations=confirmations
+        )
+        while not chain.finished:
+            chain.step()
+            self.create_stake_checker(confirmations=confirmations).run()
+        return {
+            txid: self.api_server.persisted_at[txid] - confirmed_at
+            for txid, confirmed_at in chain.confirmed_at.items()
+            if txid in self.api_server.persisted_at
+        }
@@ -2,18 +2,31 @@ import uuid
 from datetime import datetime, timezone
 import time
 import argparse
+import csv
+import gzip
+import json
 import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Iterator
 
 from check_new_stake import ApiGatewayCognito
 
+# Incremental export re-queries stakes this much older than the last exported one - stakes are posted
+# after confirmations or later (retries of failed posts), so older stakes can appear after the last export
+EXPORT_OVERLAP_SECONDS = 86400
+
 
 class ApiCall:
     """
     The class representing call to AWS API Gateway dedicated to the verus-notification project.
     """
 
-    def __init__(self) -> None:
-        self.api = ApiGatewayCognito(cli_logging=True)
+    def __init__(self, env_api_filename: str = ".env-api") -> None:
+        self.api = ApiGatewayCognito(
+            env_api_filename=env_api_filename, cli_logging=True
+        )
 
     def post_data(self, vrsc_amount: float) -> dict:
         """
@@ -40,6 +53,125 @@ class ApiCall:
         response = self.api.call(method="get", data=date)
         return response
 
+    def list_stakes(
+        self, time_window: dict, limit: int = 50, ascending: bool = False
+    ) -> Iterator[dict]:
+        """
+        Yield individual stakes in selected time window (newest first or oldest first if 'ascending').
+        API pages are fetched one by one.
+        """
+        data = {"mode": "list", "limit": limit, **time_window}
+        if ascending:
+            data["order"] = "asc"
+        while True:
+            response = self.api.call(method="get", data=data)
+            body = parse_api_body(response)
+            if response.get("statusCode", 200) != 200:
+                self.api.logger.error(f"API call: {body}")
+                sys.exit()
+            yield from body["stakes"]
+            if not body["cursor"]:
+                break
+            data["cursor"] = body["cursor"]
+
+    def export_stakes(
+        self, output_filename: str, time_window: dict, incremental: bool = False
+    ) -> int:
+        """
+        Export stakes (oldest first) to gzip'd CSV file and return number of exported stakes.
+        Stakes are streamed page by page, so memory usage doesn't depend on number of stakes.
+        With 'incremental' only stakes not exported yet are appended to the file - time window overlaps
+        the last export by EXPORT_OVERLAP_SECONDS, so late-posted older stakes are exported too.
+        Orphaned stakes removed from API after export are not removed from the file.
+        """
+        output_path = Path(output_filename)
+        state_path = output_path.with_name(f"{output_path.name}.state.json")
+        incremental = incremental and output_path.exists() and state_path.exists()
+        # The newest exported stake time and txids exported within overlap window ({txid: time})
+        state = {"last_time": 0, "txids": {}}
+        if incremental:
+            state = json.loads(state_path.read_text())
+            # State saved before overlap window was added holds only txids with the last time
+            state.setdefault(
+                "txids",
+                {txid: state["last_time"] for txid in state.pop("last_txids", [])},
+            )
+            time_window = {
+                **time_window,
+                "from": max(
+                    time_window.get("from", 0),
+                    state["last_time"] - EXPORT_OVERLAP_SECONDS,
+                ),
+            }
+        exported_txids = state["txids"]
+        pruned_txids_count = max(len(exported_txids), 100)
+        stakes_count = 0
+        # New rows are written to temporary file first - output file is not corrupted on failure
+        tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+        with gzip.open(tmp_path, mode="wt", newline="") as file:
+            writer = csv.writer(file)
+            if not incremental:
+                writer.writerow(["txid", "time", "date_utc", "amount"])
+            for stake in self.list_stakes(
+                time_window=time_window, limit=100, ascending=True
+            ):
+                if stake["txid"] in exported_txids:
+                    continue
+                date_utc = datetime.fromtimestamp(stake["time"], tz=timezone.utc)
+                writer.writerow(
+                    [
+                        stake["txid"],
+                        stake["time"],
+                        date_utc.isoformat(),
+                        stake["amount"],
+                    ]
+                )
+                exported_txids[stake["txid"]] = stake["time"]
+                state["last_time"] = max(state["last_time"], stake["time"])
+                stakes_count += 1
+                # Txids are pruned when their number doubles - memory usage doesn't depend on number of stakes
+                if len(exported_txids) > 2 * pruned_txids_count:
+                    exported_txids = overlapping_txids(
+                        txids=exported_txids, last_time=state["last_time"]
+                    )
+                    pruned_txids_count = max(len(exported_txids), 100)
+        if incremental:
+            # Gzip file can consist of multiple members - new member is appended
+            if stakes_count:
+                with (
+                    tmp_path.open("rb") as file_src,
+                    output_path.open("ab") as file_dst,
+                ):
+                    shutil.copyfileobj(file_src, file_dst)
+            tmp_path.unlink()
+        else:
+            tmp_path.replace(output_path)
+        state["txids"] = overlapping_txids(
+            txids=exported_txids, last_time=state["last_time"]
+        )
+        state_path.write_text(json.dumps(state))
+        return stakes_count
+
+
+def overlapping_txids(txids: dict, last_time: int) -> dict:
+    """
+    Return exported txids ({txid: time}) within overlap window of incremental export ending at 'last_time'.
+    """
+    return {
+        txid: stake_time
+        for txid, stake_time in txids.items()
+        if stake_time >= last_time - EXPORT_OVERLAP_SECONDS
+    }
+
+
+def parse_api_body(response_data: dict) -> dict:
+    """
+    Return API response body.
+    REST API (non-proxy integration) returns Lambda result with JSON 'body', HTTP API returns the body itself.
+    """
+    body = response_data.get("body", response_data)
+    return json.loads(body) if isinstance(body, str) else body
+
 
 def validate_date(date: str) -> dict:
     """
@@ -60,6 +192,21 @@ def validate_date(date: str) -> dict:
     return {}
 
 
+def get_time_window(date: dict) -> dict:
+    """
+    Return time window (epoch timestamps 'from' and 'to') for validated date (year or month of year).
+    """
+    year = int(date["year"])
+    if "month" in date:
+        month = int(date["month"])
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    else:
+        start = datetime(year, 1, 1, tzinfo=timezone.utc)
+        end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    return {"from": int(start.timestamp()), "to": int(end.timestamp()) - 1}
+
+
 if __name__ == "__main__":
     # Date in format 2021-12
     date_current = datetime.now(timezone.utc).strftime("%Y-%m")
@@ -80,6 +227,32 @@ if __name__ == "__main__":
         default=f"{date_current}",
         help=f"year or month of year (default: {date_current})",
     )
+    parser_get.add_argument(
+        "-p",
+        "--period",
+        type=str,
+        choices=["all", "7d", "30d", "365d"],
+        help="all-time or rolling window (last 7, 30 or 365 days) - overrides date",
+    )
+    parser_get.add_argument(
+        "-f",
+        "--fleet",
+        action="store_true",
+        help="get value of VRSC stakes summed over all wallets",
+    )
+    parser_get_address = parser_get.add_mutually_exclusive_group()
+    parser_get_address.add_argument(
+        "-a",
+        "--address",
+        type=str,
+        help="get value of VRSC stakes of specified staking address (year or month only)",
+    )
+    parser_get_address.add_argument(
+        "-A",
+        "--addresses",
+        action="store_true",
+        help="get value of VRSC stakes of each staking address (year or month only)",
+    )
     # Create parser for 'post' method (command 'call_aws_api.py post')
     parser_post = subparsers.add_parser(
         name="post", help="post new VRSC stake with specified value"
@@ -87,12 +260,60 @@ if __name__ == "__main__":
     parser_post.add_argument(
         "-v", "--value", type=float, default=12.0, help="stake value (default: 12.0)"
     )
+    # Create parser for 'list' command (command 'call_aws_api.py list')
+    parser_list = subparsers.add_parser(
+        name="list", help="list individual VRSC stakes (newest first)"
+    )
+    parser_list.add_argument(
+        "-d",
+        "--date",
+        type=str,
+        help="year or month of year (default: all stakes)",
+    )
+    parser_list.add_argument(
+        "-l",
+        "--limit",
+        type=int,
+        default=50,
+        help="number of stakes fetched with single API call (default: 50, max: 100)",
+    )
+    # Create parser for 'export' command (command 'call_aws_api.py export')
+    parser_export = subparsers.add_parser(
+        name="export", help="export VRSC stakes to gzip'd CSV file (oldest first)"
+    )
+    parser_export.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="stakes.csv.gz",
+        help="output file (default: stakes.csv.gz)",
+    )
+    parser_export.add_argument(
+        "-d",
+        "--date",
+        type=str,
+        help="year or month of year (default: all stakes)",
+    )
+    parser_export.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="append only stakes not exported yet to output file",
+    )
     # Parse arguments
     args = parser_parent.parse_args()
     if args.method == "get":
         date_argument = args.date
         post_validation_date = validate_date(date=date_argument)
         if post_validation_date:
+            if args.period:
+                post_validation_date = {"period": args.period}
+            if args.fleet:
+                post_validation_date["scope"] = "fleet"
+            if args.address:
+                post_validation_date["address"] = args.address
+            elif args.addresses:
+                post_validation_date["mode"] = "addresses"
             api_response = ApiCall().get_data(date=post_validation_date)
             print(api_response)
         else:
@@ -101,6 +322,27 @@ if __name__ == "__main__":
         value_argument = args.value
         api_response = ApiCall().post_data(vrsc_amount=value_argument)
         print(api_response)
+    elif args.method in ["list", "export"]:
+        time_window = {}
+        if args.date:
+            post_validation_date = validate_date(date=args.date)
+            if not post_validation_date:
+                subparsers.choices[args.method].error(
+                    "argument -d/--date: wrong format - use: YYYY or YYYY-MM"
+                )
+            time_window = get_time_window(date=post_validation_date)
+        if args.method == "list":
+            for stake in ApiCall().list_stakes(
+                time_window=time_window, limit=args.limit
+            ):
+                print(json.dumps(stake))
+        else:
+            exported_count = ApiCall().export_stakes(
+                output_filename=args.output,
+                time_window=time_window,
+                incremental=args.incremental,
+            )
+            print(f"Exported {exported_count} stakes to {args.output}")
     else:
         # if no method is given, print help
         parser_parent.print_help()
@@ -108,3 +350,7 @@ if __name__ == "__main__":
         parser_get.print_help()
         print('\n"get" method ', end="")
         parser_post.print_help()
+        print('\n"list" command ', end="")
+        parser_list.print_help()
+        print('\n"export" command ', end="")
+        parser_export.print_help()
@@ -1,21 +1,163 @@
 import psutil
 import subprocess
 import json
-from typing import Union
+import os
+from typing import Callable, Optional, Union
 import sys
 from pathlib import Path
 import logging
-from logging import config
+import threading
+import time
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 
-from dotenv import dotenv_values
-import requests
 
+# Max number of stakes posted to API concurrently
+API_MAX_WORKERS = 8
+# Stake is posted to API after this number of confirmations (orphaned stakes are not counted)
+STAKE_CONFIRMATIONS = 3
+# Posted stake is tracked (re-checked for orphan) until it matures
+STAKE_MATURITY = 100
+# Verus daemon config file with JSON-RPC credentials
+VERUS_CONF_PATH = Path.home().joinpath(".komodo", "VRSC", "VRSC.conf")
+VERUS_RPC_PORT = 27486
+# Period of all-time stake stats (same as API's all-time timestamp id)
+STATS_ALL_TIME = "all"
 
-# Load custom loggers config - Logging only to file or only to CLI
+# Custom loggers config - Logging only to file or only to CLI
 logging_conf_path = Path(__file__).resolve().parent.joinpath("logging.conf")
-config.fileConfig(logging_conf_path)
+logging_configured = False
+# Log records format: 'text' (formatter from loggers config) or 'json' (JSON lines)
+LOG_FORMAT_ENV = "STAKE_LOG_FORMAT"
+# Listener writing queued file log records in background thread
+log_listener = None
+# Correlation id of current check cycle - added to log records
+log_cycle_id = ""
+# Parsed config files (API env file, Verus daemon config, deployment tools' configs) cached by path and parser
+config_cache = {}
+
+
+def set_log_cycle_id(cycle_id: str) -> None:
+    """
+    Set correlation id added to log records of current check cycle.
+    """
+    global log_cycle_id
+    log_cycle_id = cycle_id
+
+
+class CycleIdFilter(logging.Filter):
+    """
+    The class adding correlation id of current check cycle to log records.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.cycle_id = log_cycle_id
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    The class formatting log records as JSON lines.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "cycle_id": getattr(record, "cycle_id", ""),
+            "message": record.getMessage(),
+        }
+        return json.dumps(entry)
+
+
+def configure_logging(conf_path: Path, log_format: str = "text"):
+    """
+    Load custom loggers config and return started listener of file logger's queue.
+    File logger's handlers are moved behind a queue - records are written by listener's
+    background thread, so log calls don't block on disk I/O.
+    """
+    import queue
+    from logging import config, handlers
+
+    config.fileConfig(conf_path)
+    for logger_name in ["file_log", "cli_log"]:
+        for handler in logging.getLogger(logger_name).handlers:
+            if log_format == "json":
+                handler.setFormatter(JsonLinesFormatter())
+    for handler in logging.getLogger("cli_log").handlers:
+        handler.addFilter(CycleIdFilter())
+    file_logger = logging.getLogger("file_log")
+    file_handlers = file_logger.handlers[:]
+    log_queue = queue.SimpleQueue()
+    queue_handler = handlers.QueueHandler(log_queue)
+    # Cycle id is added in logging thread - before record is queued. File handlers run in listener's
+    # thread and keep it (cycle id may have changed meanwhile)
+    queue_handler.addFilter(CycleIdFilter())
+    for handler in file_handlers:
+        file_logger.removeHandler(handler)
+    file_logger.addHandler(queue_handler)
+    listener = handlers.QueueListener(
+        log_queue, *file_handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+def setup_logging() -> None:
+    """
+    Load custom loggers config.
+    Config is loaded on first use - a run without new stake doesn't need it.
+    Queued log records are written before the script exits.
+    """
+    global logging_configured, log_listener
+    if not logging_configured:
+        import atexit
+
+        log_listener = configure_logging(
+            conf_path=logging_conf_path,
+            log_format=os.environ.get(LOG_FORMAT_ENV, "text"),
+        )
+        atexit.register(log_listener.stop)
+        logging_configured = True
+
+
+def load_config_file(path: Path, parser: Callable[[Path], dict]) -> dict:
+    """
+    Return config file parsed with 'parser' (callable taking file path).
+    Shared with deployment tools (utils.py) - the script dir is deployed standalone.
+    Parsed config is cached until file's mtime, size or inode changes - OSError is raised if file not exists.
+    """
+    stat = Path(path).stat()
+    file_version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cache_key = (str(path), parser)
+    cached = config_cache.get(cache_key)
+    if cached is None or cached[0] != file_version:
+        cached = (file_version, parser(path))
+        config_cache[cache_key] = cached
+    # Callers get a copy - cached config is not modified
+    return dict(cached[1])
+
+
+def parse_env_file(path: Path) -> dict:
+    """
+    Return variables from env file ('KEY=value' lines).
+    """
+    from dotenv import dotenv_values
+
+    return dotenv_values(path)
+
+
+def parse_verus_conf(path: Path) -> dict:
+    """
+    Return Verus daemon config ('key=value' lines).
+    """
+    conf = {}
+    for line in Path(path).read_text().splitlines():
+        key, separator, value = line.partition("=")
+        if separator and not key.startswith("#"):
+            conf[key.strip()] = value.strip()
+    return conf
 
 
 class VerusProcess:
@@ -25,6 +167,7 @@ class VerusProcess:
 
     def __init__(self, name: str = "verusd") -> None:
         self.name = name
+        self._process_found = None
 
     @property
     def status(self) -> bool:
@@ -34,12 +177,24 @@ class VerusProcess:
     def _process(self) -> Union[None, psutil.Process]:
         """
         Return process if exist.
+        Process found once is reused as long as it is running - no further process table scans.
         """
-        process_list_by_name = [
-            proc for proc in psutil.process_iter() if proc.name() == self.name
-        ]
-        if process_list_by_name:
-            return process_list_by_name[0]
+        if self._process_found and self._process_found.is_running():
+            return self._process_found
+        self._process_found = self._find_process()
+        return self._process_found
+
+    def _find_process(self) -> Union[None, psutil.Process]:
+        """
+        Return first not zombie process with specified name.
+        """
+        # Name and status are fetched in single pass over process table
+        for proc in psutil.process_iter(["name", "status"]):
+            if (
+                proc.info["name"] == self.name
+                and proc.info["status"] != psutil.STATUS_ZOMBIE
+            ):
+                return proc
 
     @property
     def directory(self) -> str:
@@ -69,44 +224,230 @@ class VerusStakeChecker:
         tx_hist_filename: str,
         env_api_filename: str = ".env-api",
         cli_logging: bool = False,
+        max_workers: int = API_MAX_WORKERS,
+        confirmations: int = STAKE_CONFIRMATIONS,
+        verus_conf_path: Union[str, Path] = VERUS_CONF_PATH,
     ) -> None:
         self.verus_process = VerusProcess()
         self.verus_script_name = "verus"
         # tx data history filename (JSON)
         self.tx_hist_filename = tx_hist_filename
         self.env_api_filename = env_api_filename
-        self.wallet_info = self._get_wallet_info()
+        # Wallet info is fetched only when chain tip has moved (see run())
+        self.wallet_info = {}
         self.tx_hist_data = self._read_tx_hist_file()
         self.stake_txs = StakeTransactions()
+        # Stakes count and amount per period - served locally by stats server
+        self.stake_stats = StakeStats(aggregates=self.tx_hist_data.get("stake_stats"))
+        self.cli_logging = cli_logging
+        self.max_workers = max_workers
+        self.confirmations = confirmations
+        self.verus_rpc = VerusRpc(conf_path=verus_conf_path)
+        # Correlation id of log records of this check cycle
+        self.cycle_id = os.urandom(6).hex()
+
+    @property
+    def logger(self) -> logging.Logger:
+        """
+        Return logger (loggers config is loaded on first use).
+        """
+        setup_logging()
         # Set logger: True - log output to CLI, False - log output to log file
-        if cli_logging:
-            self.logger = logging.getLogger("cli_log")
-        else:
-            self.logger = logging.getLogger("file_log")
+        if self.cli_logging:
+            return logging.getLogger("cli_log")
+        return logging.getLogger("file_log")
 
-    def run(self) -> None:
+    def run(self, best_block_hash: Optional[str] = None) -> None:
         """
         Run stake checker.
+        Chain tip ('best_block_hash') already fetched by the caller is not fetched again.
         """
+        set_log_cycle_id(self.cycle_id)
         if self.verus_process.status:
-            if not self._check_txcount_changed():
+            # A stake can only appear with a new block - skip wallet RPCs if chain tip has not moved
+            if best_block_hash is None:
+                best_block_hash = self._get_best_block_hash()
+            if not self._check_chain_tip_changed(best_block_hash=best_block_hash):
                 return
-            self._update_txcount()
-            # Trigger external API
-            api = ApiGatewayCognito(env_api_filename=self.env_api_filename)
-            new_stake_txs = self._get_wallet_new_stake_txs()
-            for tx in new_stake_txs:
-                data_to_post = {"txid": tx.txid, "time": tx.time, "amount": tx.amount}
-                api.call(method="post", data=data_to_post)
-                tx_timestamp_format = datetime.fromtimestamp(
-                    data_to_post["time"]
-                ).strftime("%Y-%m-%d %H:%M:%SLT")
-                self.logger.info(f"New stake in wallet at {tx_timestamp_format}")
-            self._update_stake_txid()
+            self._update_best_block_hash(best_block_hash=best_block_hash)
+            if not self.wallet_info:
+                self.wallet_info = self._get_wallet_info()
+            if self._check_txcount_changed():
+                # New stakes are tracked locally until confirmed
+                self._add_pending_stakes(stake_txs=self._get_wallet_new_stake_txs())
+                self._update_stake_txid()
+                self._update_txcount()
+            if self.pending_stakes:
+                self._process_pending_stakes()
+            # Store new chain tip
             self._store_new_tx_data()
             return
         self.logger.error("verusd process is not running")
 
+    @property
+    def pending_stakes(self) -> dict:
+        """
+        Return stakes not confirmed yet or posted but not mature yet ({txid: stake data}, oldest first).
+        """
+        return self.tx_hist_data.setdefault("pending_stakes", {})
+
+    def _add_pending_stakes(self, stake_txs: list) -> None:
+        """
+        Add new stake txs to pending stakes (not posted to API yet).
+        Detection time is sent to API with stake (detection latency metrics).
+        Staking address is sent to API with stake (per-address aggregates).
+        """
+        detected_at = int(time.time())
+        for tx in stake_txs:
+            self.pending_stakes[tx.txid] = {
+                "time": tx.time,
+                "amount": tx.amount,
+                "address": tx.address,
+                "confirmations": 0,
+                "posted": False,
+                "detected_at": detected_at,
+            }
+
+    def _process_pending_stakes(self) -> None:
+        """
+        Re-check confirmations of pending stakes:
+        - stakes with required number of confirmations are posted to API;
+        - orphaned stakes are dropped (or removed from API if already posted);
+        - mature stakes are no longer tracked.
+        Stakes which failed to be posted or removed stay pending and are retried on next run.
+        """
+        confirmations = self._get_confirmations(txids=list(self.pending_stakes))
+        to_post, to_remove = [], []
+        for txid, stake in list(self.pending_stakes.items()):
+            if txid not in confirmations:
+                # Confirmations not known (fe. RPC error) - re-checked on next run
+                continue
+            stake["confirmations"] = confirmations[txid]
+            if stake["confirmations"] < 0:
+                if stake["posted"]:
+                    to_remove.append(txid)
+                else:
+                    self.logger.info(f"Stake {txid} orphaned before posting to API")
+                    del self.pending_stakes[txid]
+            elif not stake["posted"] and stake["confirmations"] >= self.confirmations:
+                to_post.append(txid)
+            elif stake["posted"] and stake["confirmations"] >= STAKE_MATURITY:
+                del self.pending_stakes[txid]
+        if not to_post and not to_remove:
+            return
+        api = ApiGatewayCognito(env_api_filename=self.env_api_filename)
+        results_post = self._dispatch_stakes(
+            api=api,
+            method="post",
+            stakes=[self._stake_post_data(txid=txid) for txid in to_post],
+        )
+        # Stake already removed from API (or never stored) is not found - nothing to compensate
+        results_remove = self._dispatch_stakes(
+            api=api,
+            method="delete",
+            stakes=[{"txid": txid} for txid in to_remove],
+            ok_status_codes=(200, 404),
+        )
+        # Results are logged in stake order
+        for txid, posted in zip(to_post, results_post):
+            if posted:
+                self.pending_stakes[txid]["posted"] = True
+                self.stake_stats.add_stake(stake=self.pending_stakes[txid])
+                tx_timestamp_format = datetime.fromtimestamp(
+                    self.pending_stakes[txid]["time"]
+                ).strftime("%Y-%m-%d %H:%M:%SLT")
+                self.logger.info(f"New stake in wallet at {tx_timestamp_format}")
+            else:
+                self.logger.error(f"Stake {txid} not posted to API")
+        for txid, removed in zip(to_remove, results_remove):
+            if removed:
+                self.stake_stats.add_stake(
+                    stake=self.pending_stakes.pop(txid), count=-1
+                )
+                self.logger.info(f"Orphaned stake {txid} removed from API")
+            else:
+                self.logger.error(f"Orphaned stake {txid} not removed from API")
+        if not all(results_post + results_remove):
+            # Unknown chain tip - next run doesn't skip pending stakes check
+            self._update_best_block_hash(best_block_hash="")
+
+    def _stake_post_data(self, txid: str) -> dict:
+        """
+        Return POST request data of pending stake.
+        Stakes added by older versions have no detection time and staking address.
+        """
+        stake = self.pending_stakes[txid]
+        data = {"txid": txid, "time": stake["time"], "amount": stake["amount"]}
+        for key in ["detected_at", "address"]:
+            if stake.get(key):
+                data[key] = stake[key]
+        return data
+
+    def _dispatch_stakes(
+        self,
+        api: "ApiGatewayCognito",
+        method: str,
+        stakes: list,
+        ok_status_codes: tuple = (200,),
+    ) -> list:
+        """
+        Send stakes data to API concurrently (at most 'max_workers' requests at once).
+        Return list of results (True - request succeeded) in stakes order.
+        """
+        if not stakes:
+            return []
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(stakes))
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda data: api.dispatch(
+                        method=method, data=data, ok_status_codes=ok_status_codes
+                    ),
+                    stakes,
+                )
+            )
+
+    def _get_confirmations(self, txids: list) -> dict:
+        """
+        Return number of confirmations of txs ({txid: confirmations}, -1 for orphaned tx).
+        Txs are fetched with single batched JSON-RPC call or, if JSON-RPC is not available, with Verus CLI.
+        Txs which couldn't be fetched are omitted.
+        """
+        responses = self.verus_rpc.batch(
+            method="gettransaction", params_list=[[txid] for txid in txids]
+        )
+        if responses is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # CLI calls are run concurrently (one process per tx)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                responses = list(executor.map(self._get_transaction_cli, txids))
+        confirmations = {}
+        for txid, (tx, error) in zip(txids, responses):
+            if tx:
+                confirmations[txid] = get_tx_confirmations(tx=tx)
+            elif error and error.get("code") == RPC_INVALID_ADDRESS_OR_KEY:
+                # Tx is not known to wallet anymore (fe. removed after reorg)
+                confirmations[txid] = -1
+        return confirmations
+
+    def _get_transaction_cli(self, txid: str) -> tuple:
+        """
+        Return (tx, error) fetched with Verus CLI 'gettransaction' call.
+        """
+        if not self.verus_process.status:
+            return None, None
+        options = [self.verus_script_path, "gettransaction", txid]
+        response = subprocess.run(args=options, capture_output=True, text=True)
+        if response.returncode == 0:
+            return json.loads(response.stdout), None
+        if f"error code: {RPC_INVALID_ADDRESS_OR_KEY}" in response.stderr:
+            return None, {"code": RPC_INVALID_ADDRESS_OR_KEY}
+        return None, {"code": None, "message": response.stderr.strip()}
+
     @property
     def verus_script_path(self) -> str:
         """
@@ -127,9 +468,21 @@ class VerusStakeChecker:
         """
         Initial content for tx history file.
         """
-        content = {"txid_stake_previous": "", "txcount_previous": "0"}
+        content = {
+            "txid_stake_previous": "",
+            "txcount_previous": "0",
+            "bestblockhash_previous": "",
+            "pending_stakes": {},
+            "stake_stats": {},
+        }
         return content
 
+    def _update_best_block_hash(self, best_block_hash: str) -> None:
+        """
+        Update 'bestblockhash' data with current value.
+        """
+        self.tx_hist_data["bestblockhash_previous"] = best_block_hash
+
     def _update_txcount(self) -> None:
         """
         Update 'txcount' data with current value.
@@ -160,6 +513,13 @@ class VerusStakeChecker:
         """
         return self.tx_hist_data.get("txcount_previous", 0)
 
+    @property
+    def _best_block_hash_hist(self) -> str:
+        """
+        Return best block hash stored in tx history file (recent value).
+        """
+        return self.tx_hist_data.get("bestblockhash_previous", "")
+
     @property
     def _txid_stake_hist(self) -> str:
         """
@@ -186,8 +546,14 @@ class VerusStakeChecker:
             with open(self.tx_hist_file_path) as file:
                 content = json.load(file)
                 # Check that the necessary keys are in the file content.
-                if initial_content.keys() == content.keys():
-                    return content
+                # Files created by older versions lack block hash, pending stakes and stake stats keys.
+                required_keys = initial_content.keys() - {
+                    "bestblockhash_previous",
+                    "pending_stakes",
+                    "stake_stats",
+                }
+                if required_keys <= content.keys() <= initial_content.keys():
+                    return {**initial_content, **content}
         except (FileNotFoundError, json.decoder.JSONDecodeError):
             pass
         self._create_tx_hist_file()
@@ -201,13 +567,35 @@ class VerusStakeChecker:
         wallet_info = self._process_call(options=options)
         return wallet_info if wallet_info else {}
 
-    def _process_call(self, options: list) -> Union[dict, list, None]:
+    def _get_mining_info(self) -> dict:
+        """
+        Get mining and staking info (fe. staking status, network staking supply) from Verus process api.
+        """
+        options = [self.verus_script_path, "getmininginfo"]
+        mining_info = self._process_call(options=options)
+        return mining_info if mining_info else {}
+
+    def _get_best_block_hash(self) -> str:
+        """
+        Get hash of the best (tip) block from Verus process api.
+        Cheap call that doesn't lock the wallet.
+        """
+        options = [self.verus_script_path, "getbestblockhash"]
+        best_block_hash = self._process_call(options=options, parse_json=False)
+        return best_block_hash if best_block_hash else ""
+
+    def _process_call(
+        self, options: list, parse_json: bool = True
+    ) -> Union[dict, list, str, None]:
         """
         Call Verus process api.
+        Plain string results (fe. block hash) are returned without JSON parsing.
         """
         if self.verus_process.status:
             response = subprocess.run(args=options, capture_output=True, text=True)
-            return json.loads(response.stdout)
+            if parse_json:
+                return json.loads(response.stdout)
+            return response.stdout.strip()
 
     @property
     def _last_wallet_stake_txid(self) -> str:
@@ -224,12 +612,14 @@ class VerusStakeChecker:
         response = self._process_call(options=options)
         txs = response if response else []
         for tx in txs:
-            if tx["category"] == "mint":
+            # Orphaned stakes are kept - last known stake txid can point to stake that has been orphaned
+            if tx["category"] in ["mint", "orphan"]:
                 stake_tx = StakeTransaction(
                     txid=tx["txid"],
                     time=tx["time"],
                     amount=tx["amount"],
                     address=tx["address"],
+                    category=tx["category"],
                 )
                 self.stake_txs.add_stake_tx(stake_tx)
 
@@ -239,14 +629,26 @@ class VerusStakeChecker:
         New txs relative to stored hist stake txid.
         """
         self._get_wallet_stake_txs()
-        return self.stake_txs.get_new_stakes_txs(txid_last=self._txid_stake_hist)
+        return [
+            tx
+            for tx in self.stake_txs.get_new_stakes_txs(txid_last=self._txid_stake_hist)
+            if tx.category == "mint"
+        ]
 
     def _store_new_tx_data(self) -> None:
         """
         Store new/updated tx data in tx history file.
         """
+        self.tx_hist_data["stake_stats"] = self.stake_stats.to_dict()
         self._create_tx_hist_file(content=self.tx_hist_data)
 
+    def _check_chain_tip_changed(self, best_block_hash: str) -> bool:
+        """
+        Check whether chain tip (best block hash) changed.
+        Unknown chain tip is treated as changed.
+        """
+        return not best_block_hash or best_block_hash != self._best_block_hash_hist
+
     def _check_txcount_changed(self) -> bool:
         """
         Check whether 'txcount' changed.
@@ -254,6 +656,75 @@ class VerusStakeChecker:
         return self.txcount_current != self.txcount_hist
 
 
+# JSON-RPC error code of not known (fe. non-wallet) tx id
+RPC_INVALID_ADDRESS_OR_KEY = -5
+
+
+def get_tx_confirmations(tx: dict) -> int:
+    """
+    Return number of tx confirmations ('gettransaction' response) or -1 if tx is orphaned.
+    """
+    categories = [tx.get("category")] + [
+        detail.get("category") for detail in tx.get("details", [])
+    ]
+    if "orphan" in categories:
+        return -1
+    return int(tx.get("confirmations", 0))
+
+
+class VerusRpc:
+    """
+    The class responsible for calling Verus daemon JSON-RPC interface.
+    Credentials are read from Verus daemon config file.
+    """
+
+    def __init__(self, conf_path: Union[str, Path] = VERUS_CONF_PATH) -> None:
+        self.conf_path = Path(conf_path)
+
+    def _read_conf(self) -> dict:
+        """
+        Return Verus daemon config ('key=value' lines) or {} if config file not exists.
+        Config is parsed again only when config file changes.
+        """
+        try:
+            return load_config_file(path=self.conf_path, parser=parse_verus_conf)
+        except OSError:
+            return {}
+
+    def batch(self, method: str, params_list: list) -> Union[list, None]:
+        """
+        Call method once per params in single batched JSON-RPC request.
+        Return list of (result, error) in params order or None if JSON-RPC is not available.
+        """
+        import requests
+
+        conf = self._read_conf()
+        if not conf.get("rpcuser") or not conf.get("rpcpassword"):
+            return None
+        url = f"http://{conf.get('rpchost', '127.0.0.1')}:{conf.get('rpcport', VERUS_RPC_PORT)}"
+        payload = [
+            {"jsonrpc": "1.0", "id": number, "method": method, "params": params}
+            for number, params in enumerate(params_list)
+        ]
+        try:
+            response = requests.post(
+                url, json=payload, auth=(conf["rpcuser"], conf["rpcpassword"])
+            )
+            responses = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+        if not isinstance(responses, list):
+            return None
+        responses_by_id = {item.get("id"): item for item in responses}
+        return [
+            (
+                responses_by_id.get(number, {}).get("result"),
+                responses_by_id.get(number, {}).get("error"),
+            )
+            for number in range(len(params_list))
+        ]
+
+
 @dataclass
 class StakeTransaction:
     """
@@ -264,6 +735,7 @@ class StakeTransaction:
     time: int
     amount: float
     address: str
+    category: str = "mint"
 
 
 class StakeTransactions:
@@ -325,6 +797,91 @@ class StakeTransactions:
             return []
 
 
+class StakeStats:
+    """
+    The class representing stakes count and amount per period - month, year, all-time and staking address'
+    month and year (periods in the same format as API's timestamp ids: '2021-09', '2021', 'all', '2021-09#<address>').
+    Aggregates are updated incrementally with each stake posted to (or removed from) API and read by stats server threads.
+    """
+
+    def __init__(self, aggregates: dict = None) -> None:
+        # {period: [stakes amount, stakes count]}
+        self.aggregates = {
+            period: list(values) for period, values in (aggregates or {}).items()
+        }
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_periods(stake: dict) -> list:
+        """
+        Return periods of stake (stake time in UTC).
+        """
+        date = datetime.fromtimestamp(stake["time"], tz=timezone.utc)
+        periods = [date.strftime("%Y-%m"), date.strftime("%Y")]
+        if stake.get("address"):
+            periods += [f"{period}#{stake['address']}" for period in periods]
+        return periods + [STATS_ALL_TIME]
+
+    def add_stake(self, stake: dict, count: int = 1) -> None:
+        """
+        Add stake ('count' = 1) to its periods or subtract it ('count' = -1, orphaned stake).
+        """
+        with self._lock:
+            for period in self.get_periods(stake=stake):
+                amount, stakes_count = self.aggregates.get(period, [0, 0])
+                self.aggregates[period] = [
+                    round(amount + count * stake["amount"], 8),
+                    stakes_count + count,
+                ]
+
+    def replace(self, aggregates: dict) -> None:
+        """
+        Replace all aggregates (fe. with aggregates loaded from tx history file).
+        """
+        with self._lock:
+            self.aggregates = {
+                period: list(values) for period, values in aggregates.items()
+            }
+
+    def get_period(self, period: str) -> dict:
+        """
+        Return stakes count and amount of period.
+        """
+        with self._lock:
+            amount, count = self.aggregates.get(period, [0, 0])
+        return {"timeframe": period, "stakes_count": count, "stakes_amount": amount}
+
+    def get_addresses(self, period: str) -> list:
+        """
+        Return stakes count and amount of each staking address in period (sorted by address).
+        """
+        prefix = f"{period}#"
+        with self._lock:
+            items = sorted(self.aggregates.items())
+        return [
+            {
+                "address": key[len(prefix) :],
+                "stakes_count": count,
+                "stakes_amount": amount,
+            }
+            for key, (amount, count) in items
+            if key.startswith(prefix)
+        ]
+
+    def to_dict(self) -> dict:
+        """
+        Return copy of aggregates.
+        """
+        with self._lock:
+            return {period: list(values) for period, values in self.aggregates.items()}
+
+
+class ApiCallError(Exception):
+    """
+    Raised when API or Cognito token request fails (error is already logged).
+    """
+
+
 class ApiGatewayCognito:
     """
     Class responsible for calling external API using the access token fetched from Cognito service.
@@ -334,6 +891,7 @@ class ApiGatewayCognito:
         self, env_api_filename: str = ".env-api", cli_logging: bool = False
     ) -> None:
         self.env_api_filename = env_api_filename
+        setup_logging()
         # Set logger: True - log output to CLI, False - log output to log file
         if cli_logging:
             self.logger = logging.getLogger("cli_log")
@@ -346,6 +904,12 @@ class ApiGatewayCognito:
         self.cognito_client_secret = env_data["COGNITO_CLIENT_SECRET"]
         self.scopes = env_data["COGNITO_CUSTOM_SCOPES"]
         self.api_gateway_url = env_data["NOTIFICATION_API_URL"]
+        # Optional - if not specified the API uses Cognito client id as wallet id
+        self.wallet_id = env_data.get("WALLET_ID") or ""
+        # Access token is shared by concurrent requests and refreshed before it expires
+        self._access_token = ""
+        self._access_token_expires_at = 0.0
+        self._access_token_lock = threading.Lock()
 
     def _get_env_data(self) -> dict:
         """
@@ -379,39 +943,81 @@ class ApiGatewayCognito:
 
     def _load_env_data(self) -> dict:
         """
-        Load API environment variables from API env file.
+        Load API environment variables from API env file (parsed again only when file changes).
         If API env file doesn't exist the script is terminated and relevant error is logged.
         """
         env_path = self.env_api_file_path
         if not env_path.exists() or not env_path.is_file():
             self.logger.error(f"File {env_path} not exists!")
             sys.exit()
-        return dotenv_values(env_path)
+        return load_config_file(path=env_path, parser=parse_env_file)
 
     def call(self, method: str, data: dict) -> dict:
         """
         Method triggers the API Gateway endpoint with access token as the value of the Authorization header.
+        The script is terminated if request fails (CLI use only - in worker threads use dispatch()).
         """
+        import requests
+
         self.check_http_method(method=method)
-        access_token = self._get_access_token()
-        headers = {"Authorization": access_token}
         try:
-            if method.lower() == "get":
-                # data = {'year': '2021', 'month': '11'}
-                response = requests.get(
-                    self.api_gateway_url, headers=headers, params=data
-                )
-                self._check_response_status(response)
-                return response.json()
-            else:
-                response = requests.post(
-                    self.api_gateway_url, headers=headers, json=data
-                )
-                self._check_response_status(response)
-                return response.json()
+            response = self.send(method=method, data=data)
+            self._check_response_status(response)
         except requests.exceptions.RequestException:
             self.logger.error("API call: failed to establish a new connection")
             sys.exit()
+        except ApiCallError:
+            sys.exit()
+        return response.json()
+
+    def dispatch(
+        self, method: str, data: dict, ok_status_codes: tuple = (200,)
+    ) -> bool:
+        """
+        Call the API Gateway endpoint and return True if request succeeded.
+        Unlike call() failures are logged without terminating the script - safe to use in worker threads.
+        REST API returns Lambda's status code in response body - it's checked as well.
+        """
+        import requests
+
+        try:
+            response = self.send(method=method, data=data)
+        except requests.exceptions.RequestException:
+            self.logger.error("API call: failed to establish a new connection")
+            return False
+        except ApiCallError:
+            # Access token can't be fetched (error already logged)
+            return False
+        if response.status_code not in ok_status_codes:
+            self._log_response_error(response)
+            return False
+        try:
+            status_code = response.json().get("statusCode", 200)
+        except (ValueError, AttributeError):
+            status_code = 200
+        if status_code not in ok_status_codes:
+            self._log_response_error(response)
+            return False
+        return True
+
+    def send(self, method: str, data: dict):
+        """
+        Send request to the API Gateway endpoint and return raw response.
+        Response status is not checked and connection errors are raised (requests.exceptions.RequestException).
+        ApiCallError is raised if access token can't be fetched.
+        """
+        import requests
+
+        if self.wallet_id and "wallet_id" not in data:
+            data = {**data, "wallet_id": self.wallet_id}
+        access_token = self._get_access_token()
+        headers = {"Authorization": access_token}
+        if method.lower() == "get":
+            # data = {'year': '2021', 'month': '11'}
+            return requests.get(self.api_gateway_url, headers=headers, params=data)
+        if method.lower() == "delete":
+            return requests.delete(self.api_gateway_url, headers=headers, json=data)
+        return requests.post(self.api_gateway_url, headers=headers, json=data)
 
     @property
     def env_api_file_path(self):
@@ -425,14 +1031,33 @@ class ApiGatewayCognito:
         """
         Check whether the HTTP method is allowed for API call.
         """
-        if method.lower() not in ["post", "get"]:
+        if method.lower() not in ["post", "get", "delete"]:
             self.logger.error(f"API method: {method} is not allowed HTTP method")
             sys.exit()
 
     def _get_access_token(self) -> str:
+        """
+        Return cached access token or fetch new one if not fetched yet or about to expire.
+        """
+        with self._access_token_lock:
+            if (
+                not self._access_token
+                or time.monotonic() >= self._access_token_expires_at
+            ):
+                token_data = self._fetch_access_token()
+                self._access_token = token_data["access_token"]
+                # Token is refreshed a minute before it expires
+                expires_in = int(token_data.get("expires_in", 3600))
+                self._access_token_expires_at = time.monotonic() + expires_in - 60
+            return self._access_token
+
+    def _fetch_access_token(self) -> dict:
         """
         Method retrieves the access token from Amazon Cognito authorization server.
+        ApiCallError is raised if access token can't be fetched.
         """
+        import requests
+
         body = {"grant_type": "client_credentials", "scope": self.scopes}
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         try:
@@ -442,24 +1067,28 @@ class ApiGatewayCognito:
                 auth=(self.cognito_client_id, self.cognito_client_secret),
                 headers=headers,
             )
-        except requests.exceptions.RequestException:
+        except requests.exceptions.RequestException as error:
             self.logger.error("API access token: failed to establish a new connection")
-            sys.exit()
+            raise ApiCallError("access token request failed") from error
         self._check_response_status(response)
-        return response.json()["access_token"]
+        return response.json()
 
     def _check_response_status(self, response) -> None:
         """
-        Exit script when response status code different than 200.
+        Log error and raise ApiCallError when response status code different than 200.
         """
         if response.status_code != 200:
-            response_text = (
-                (response.text[:87] + "...")
-                if len(response.text) > 90
-                else response.text
-            )
-            self.logger.error(f"API response: {response.status_code} {response_text}")
-            sys.exit()
+            self._log_response_error(response)
+            raise ApiCallError(f"API response status code {response.status_code}")
+
+    def _log_response_error(self, response) -> None:
+        """
+        Log response status code and (shortened) response text.
+        """
+        response_text = (
+            (response.text[:87] + "...") if len(response.text) > 90 else response.text
+        )
+        self.logger.error(f"API response: {response.status_code} {response_text}")
 
 
 if __name__ == "__main__":
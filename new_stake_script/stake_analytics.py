@@ -0,0 +1,357 @@
+import argparse
+import csv
+import gzip
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Verus: 1 minute block time and (on average) every second block is a stake (PoS) block
+BLOCKS_PER_DAY = 1440
+POS_BLOCKS_SHARE = 0.5
+SECONDS_PER_DAY = 86400
+DAYS_PER_YEAR = 365
+# numpy datetime units of supported yield periods
+PERIODS = {"day": "D", "month": "M", "year": "Y"}
+
+
+@dataclass
+class StakeHistory:
+    """
+    The class representing stake history of many wallets as numpy arrays (one element per stake).
+    """
+
+    wallets: np.ndarray
+    wallet_idx: np.ndarray
+    times: np.ndarray
+    amounts: np.ndarray
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, int, float]]) -> "StakeHistory":
+        """
+        Return stake history built from (wallet, time, amount) records.
+        """
+        records = list(records)
+        if not records:
+            return cls(
+                wallets=np.array([], dtype=str),
+                wallet_idx=np.array([], dtype=np.int64),
+                times=np.array([], dtype=np.int64),
+                amounts=np.array([], dtype=np.float64),
+            )
+        wallet_names, times, amounts = zip(*records)
+        wallets, wallet_idx = np.unique(np.array(wallet_names), return_inverse=True)
+        return cls(
+            wallets=wallets,
+            wallet_idx=wallet_idx.astype(np.int64),
+            times=np.array(times, dtype=np.int64),
+            amounts=np.array(amounts, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_export_files(cls, paths: List[str]) -> "StakeHistory":
+        """
+        Return stake history loaded from gzip'd CSV files created by 'call_aws_api.py export'.
+        Each file holds stakes of one wallet - file name (without extensions) is used as wallet name.
+        """
+        records = []
+        for path in map(Path, paths):
+            wallet = path.name.split(".")[0]
+            with gzip.open(path, mode="rt", newline="") as file:
+                records.extend(
+                    (wallet, int(row["time"]), float(row["amount"]))
+                    for row in csv.DictReader(file)
+                    # Appended gzip members (incremental export) don't repeat the header
+                    if row["time"] != "time"
+                )
+        return cls.from_records(records)
+
+    @classmethod
+    def from_api(cls, api_call, time_window: dict, wallet: str) -> "StakeHistory":
+        """
+        Return stake history of wallet fetched from API (ApiCall object).
+        """
+        return cls.from_records(
+            (wallet, stake["time"], stake["amount"])
+            for stake in api_call.list_stakes(
+                time_window=time_window, limit=100, ascending=True
+            )
+        )
+
+    def window(self, start: int, end: int) -> "StakeHistory":
+        """
+        Return stake history limited to stakes in time window (epoch timestamps, inclusive).
+        """
+        mask = (self.times >= start) & (self.times <= end)
+        return StakeHistory(
+            wallets=self.wallets,
+            wallet_idx=self.wallet_idx[mask],
+            times=self.times[mask],
+            amounts=self.amounts[mask],
+        )
+
+
+def stake_intervals(history: StakeHistory) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return mean and max interval between consecutive stakes (seconds) of each wallet.
+    Wallets with less than two stakes have NaN intervals.
+    """
+    wallets_number = len(history.wallets)
+    order = np.lexsort((history.times, history.wallet_idx))
+    wallet_idx = history.wallet_idx[order]
+    intervals = np.diff(history.times[order])
+    # Only intervals between stakes of the same wallet are valid
+    same_wallet = wallet_idx[1:] == wallet_idx[:-1]
+    intervals, interval_wallets = intervals[same_wallet], wallet_idx[1:][same_wallet]
+    counts = np.bincount(interval_wallets, minlength=wallets_number)
+    sums = np.bincount(interval_wallets, weights=intervals, minlength=wallets_number)
+    maxs = np.zeros(wallets_number)
+    np.maximum.at(maxs, interval_wallets, intervals)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return means, np.where(counts > 0, maxs, np.nan)
+
+
+def period_yields(
+    history: StakeHistory, period: str = "month"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return periods (numpy datetimes) and matrix of staked amounts (wallets x periods).
+    """
+    stake_periods = history.times.astype("datetime64[s]").astype(
+        f"datetime64[{PERIODS[period]}]"
+    )
+    periods, period_idx = np.unique(stake_periods, return_inverse=True)
+    yields = np.zeros((len(history.wallets), len(periods)))
+    np.add.at(yields, (history.wallet_idx, period_idx), history.amounts)
+    return periods, yields
+
+
+def expected_stakes_count(
+    eligible_balance: np.ndarray, stake_supply: float, seconds: float
+) -> np.ndarray:
+    """
+    Return expected number of stakes in 'seconds' for given eligible balance and network stake weight.
+    Wallet's chance to stake a PoS block equals its share of network staking supply.
+    """
+    pos_blocks = seconds / SECONDS_PER_DAY * BLOCKS_PER_DAY * POS_BLOCKS_SHARE
+    return pos_blocks * np.asarray(eligible_balance, dtype=np.float64) / stake_supply
+
+
+def hours(seconds: float) -> Union[float, None]:
+    """
+    Return seconds converted to hours (None if not known).
+    """
+    if np.isnan(seconds):
+        return None
+    return round(float(seconds) / 3600, 2)
+
+
+def summarize(
+    history: StakeHistory,
+    start: int,
+    end: int,
+    eligible_balances: Optional[Dict[str, float]] = None,
+    stake_supply: float = 0.0,
+    period: str = "month",
+) -> dict:
+    """
+    Return per-wallet staking performance summary in time window (epoch timestamps, inclusive).
+    Effective APY and expected stakes count are computed only for wallets with known eligible balance
+    ('eligible_balances' by wallet name) and when stake supply is known.
+    """
+    history = history.window(start=start, end=end)
+    seconds = end - start + 1
+    wallets_number = len(history.wallets)
+    counts = np.bincount(history.wallet_idx, minlength=wallets_number)
+    amounts = np.bincount(
+        history.wallet_idx, weights=history.amounts, minlength=wallets_number
+    )
+    interval_means, interval_maxs = stake_intervals(history)
+    periods, yields = period_yields(history, period=period)
+    summary = {
+        "from": datetime.fromtimestamp(start, tz=timezone.utc).isoformat(),
+        "to": datetime.fromtimestamp(end, tz=timezone.utc).isoformat(),
+        "wallets": {},
+    }
+    # Wallets without known eligible balance have zero balance - their APY is not computed
+    balances = np.array(
+        [(eligible_balances or {}).get(str(wallet), 0.0) for wallet in history.wallets],
+        dtype=np.float64,
+    )
+    if stake_supply:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            apys = amounts / balances * (DAYS_PER_YEAR * SECONDS_PER_DAY / seconds)
+        expected = expected_stakes_count(
+            eligible_balance=balances, stake_supply=stake_supply, seconds=seconds
+        )
+    for idx, wallet in enumerate(history.wallets):
+        wallet_summary = {
+            "stakes_count": int(counts[idx]),
+            "stakes_amount": round(float(amounts[idx]), 8),
+            "interval_mean_h": hours(interval_means[idx]),
+            "interval_max_h": hours(interval_maxs[idx]),
+            "yields": {
+                str(period_date): round(float(amount), 8)
+                for period_date, amount in zip(periods, yields[idx])
+                if amount
+            },
+        }
+        if balances[idx] and stake_supply:
+            wallet_summary["effective_apy_pct"] = round(float(apys[idx]) * 100, 2)
+            wallet_summary["expected_stakes_count"] = round(float(expected[idx]), 2)
+            wallet_summary["stakes_ratio"] = (
+                round(float(counts[idx] / expected[idx]), 2) if expected[idx] else None
+            )
+        summary["wallets"][str(wallet)] = wallet_summary
+    return summary
+
+
+def parse_date(date: str) -> int:
+    """
+    Return epoch timestamp of date in format YYYY-MM-DD (UTC).
+    """
+    date_parsed = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(date_parsed.timestamp())
+
+
+def parse_balances(values: List[str], wallets: np.ndarray) -> Dict[str, float]:
+    """
+    Return eligible balances by wallet name from 'wallet=balance' values.
+    Single balance without wallet name is used only if history holds one wallet.
+    """
+    if len(values) == 1 and "=" not in values[0]:
+        if len(wallets) != 1:
+            raise ValueError("balance without wallet name requires single wallet")
+        return {str(wallets[0]): float(values[0])}
+    balances = {}
+    for value in values:
+        wallet, separator, balance = value.rpartition("=")
+        if not separator or not wallet:
+            raise ValueError(f"not valid balance '{value}' - use 'wallet=balance'")
+        balances[wallet] = float(balance)
+    return balances
+
+
+def get_verus_info(method: str) -> dict:
+    """
+    Return result of Verus info call without arguments (fe. 'getwalletinfo') or {} if not available.
+    Called with JSON-RPC or, if JSON-RPC is not available, with Verus CLI - tx history file is not touched.
+    """
+    import subprocess
+
+    from check_new_stake import VerusProcess, VerusRpc
+
+    verus_process = VerusProcess()
+    if not verus_process.status:
+        return {}
+    responses = VerusRpc().batch(method=method, params_list=[[]])
+    if responses is not None:
+        result, _ = responses[0]
+        return result if isinstance(result, dict) else {}
+    options = [Path(verus_process.directory).joinpath("verus"), method]
+    response = subprocess.run(args=options, capture_output=True, text=True)
+    try:
+        result = json.loads(response.stdout)
+    except json.decoder.JSONDecodeError:
+        return {}
+    return result if isinstance(result, dict) else {}
+
+
+def get_wallet_staking_data() -> Tuple[float, float]:
+    """
+    Return eligible staking balance and network staking supply from running Verus wallet (zeros if not running).
+    """
+    wallet_info = get_verus_info(method="getwalletinfo")
+    mining_info = get_verus_info(method="getmininginfo")
+    return (
+        float(wallet_info.get("eligible_staking_balance", 0.0)),
+        float(mining_info.get("stakingsupply", 0.0)),
+    )
+
+
+if __name__ == "__main__":
+    date_today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    parser = argparse.ArgumentParser(
+        description="Summarize staking performance of Verus wallets in selected time window"
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        nargs="+",
+        help="gzip'd CSV files exported with 'call_aws_api.py export' - one file per wallet (default: fetch stakes from API)",
+    )
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        default="2021-01-01",
+        help="window start date YYYY-MM-DD (default: 2021-01-01)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        default=date_today,
+        help=f"window end date YYYY-MM-DD, inclusive (default: {date_today})",
+    )
+    parser.add_argument(
+        "-p",
+        "--period",
+        choices=list(PERIODS),
+        default="month",
+        help="yield period (default: month)",
+    )
+    parser.add_argument(
+        "--balance",
+        nargs="+",
+        help="eligible staking balance of each wallet as 'wallet=balance' or single balance for single "
+        "wallet (default: from running Verus wallet if single wallet is summarized)",
+    )
+    parser.add_argument(
+        "--stake-supply",
+        type=float,
+        help="network staking supply (default: from running Verus wallet)",
+    )
+    args = parser.parse_args()
+    start = parse_date(args.date_from)
+    end = parse_date(args.date_to) + SECONDS_PER_DAY - 1
+    if args.input:
+        stake_history = StakeHistory.from_export_files(paths=args.input)
+    else:
+        from call_aws_api import ApiCall
+
+        stake_history = StakeHistory.from_api(
+            api_call=ApiCall(),
+            time_window={"from": start, "to": end},
+            wallet="wallet",
+        )
+    balances, stake_supply = {}, args.stake_supply
+    if args.balance:
+        try:
+            balances = parse_balances(
+                values=args.balance, wallets=stake_history.wallets
+            )
+        except ValueError as error:
+            parser.error(str(error))
+    # Running Verus wallet's balance applies only to the wallet being summarized
+    running_wallet_balance = not args.balance and len(stake_history.wallets) == 1
+    if running_wallet_balance or stake_supply is None:
+        wallet_balance, wallet_stake_supply = get_wallet_staking_data()
+        if running_wallet_balance:
+            balances = {str(stake_history.wallets[0]): wallet_balance}
+        stake_supply = wallet_stake_supply if stake_supply is None else stake_supply
+    print(
+        json.dumps(
+            summarize(
+                history=stake_history,
+                start=start,
+                end=end,
+                eligible_balances=balances,
+                stake_supply=stake_supply,
+                period=args.period,
+            ),
+            indent=2,
+        )
+    )
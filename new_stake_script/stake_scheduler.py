@@ -0,0 +1,372 @@
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+from check_new_stake import (
+    LOG_FORMAT_ENV,
+    StakeStats,
+    VerusProcess,
+    VerusStakeChecker,
+    set_log_cycle_id,
+    setup_logging,
+)
+from stats_server import STATS_HOST, StatsServer
+
+
+@dataclass
+class StakingState:
+    """
+    The class representing staking state of Verus wallet.
+    """
+
+    process_running: bool
+    staking: bool = False
+    eligible_balance: float = 0.0
+    wallet_locked: bool = False
+
+    @classmethod
+    def from_rpc(cls, mining_info: dict, wallet_info: dict) -> "StakingState":
+        """
+        Return staking state based on 'getmininginfo' and 'getwalletinfo' responses.
+        Encrypted wallet is locked when 'unlocked_until' is 0 (not present for not encrypted wallet).
+        """
+        return cls(
+            process_running=True,
+            staking=bool(mining_info.get("staking", False)),
+            eligible_balance=float(wallet_info.get("eligible_staking_balance", 0.0)),
+            wallet_locked=wallet_info.get("unlocked_until") == 0,
+        )
+
+    @property
+    def mode(self) -> str:
+        """
+        Return scheduler mode: 'down' - verusd not running, 'active' - wallet is staking,
+        'idle' - wallet can't stake (fe. locked, no eligible UTXOs, still syncing).
+        """
+        if not self.process_running:
+            return "down"
+        if self.staking and self.eligible_balance > 0 and not self.wallet_locked:
+            return "active"
+        return "idle"
+
+
+class PollingScheduler:
+    """
+    The class responsible for choosing interval to next wallet check based on staking state.
+    """
+
+    def __init__(
+        self,
+        active_interval: float = 30,
+        idle_interval: float = 600,
+        backoff_base: float = 60,
+        backoff_max: float = 1800,
+    ) -> None:
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Number of consecutive checks with verusd not running
+        self.down_count = 0
+
+    def next_interval(self, state: StakingState) -> float:
+        """
+        Return seconds to next check.
+        Interval is doubled with each consecutive check while verusd is not running.
+        """
+        if state.mode == "down":
+            interval = min(self.backoff_base * 2**self.down_count, self.backoff_max)
+            self.down_count += 1
+            return interval
+        self.down_count = 0
+        if state.mode == "active":
+            return self.active_interval
+        return self.idle_interval
+
+
+# Staking state is refreshed at least every STATE_REFRESH_CHECKS checks even if chain tip has not moved
+STATE_REFRESH_CHECKS = 10
+
+
+class StakeDaemon:
+    """
+    The class responsible for running stake checker at intervals adapted to wallet's staking state.
+    Staking state (wallet RPCs) is refreshed only when chain tip has moved or every 'state_refresh_checks' checks.
+    Scheduler state is logged on mode change and stored in metrics file (JSON) after each check.
+    Stake stats are kept in memory across checks and, if 'stats_address' is given, served by local stats server.
+    """
+
+    def __init__(
+        self,
+        tx_hist_filename: str = "tx_history.json",
+        env_api_filename: str = ".env-api",
+        metrics_filename: str = "scheduler_metrics.json",
+        scheduler: Optional[PollingScheduler] = None,
+        cli_logging: bool = False,
+        stats_address: Optional[Tuple[str, int]] = None,
+        state_refresh_checks: int = STATE_REFRESH_CHECKS,
+    ) -> None:
+        self.tx_hist_filename = tx_hist_filename
+        self.env_api_filename = env_api_filename
+        self.metrics_filename = metrics_filename
+        self.scheduler = scheduler or PollingScheduler()
+        self.cli_logging = cli_logging
+        # Process found once is reused by all checks
+        self.verus_process = VerusProcess()
+        self.checks = 0
+        self.mode = ""
+        # Staking state of the last refresh and number of checks since then
+        self.state: Optional[StakingState] = None
+        self.state_age = 0
+        self.state_refresh_checks = state_refresh_checks
+        # Stake stats shared by all checks and stats server threads
+        self.stake_stats = StakeStats()
+        self.stake_stats_loaded = False
+        self.stats_address = stats_address
+        self.stats_server: Optional[StatsServer] = None
+
+    @property
+    def logger(self) -> logging.Logger:
+        """
+        Return logger (loggers config is loaded on first use).
+        """
+        setup_logging()
+        if self.cli_logging:
+            return logging.getLogger("cli_log")
+        return logging.getLogger("file_log")
+
+    @property
+    def metrics_file_path(self) -> Path:
+        """
+        Return metrics file absolute path.
+        Metrics file is stored in the same dir as this script.
+        """
+        return Path(__file__).resolve().parent.joinpath(self.metrics_filename)
+
+    def _create_stake_checker(self) -> VerusStakeChecker:
+        """
+        Return stake checker sharing daemon's Verus process.
+        """
+        stake_checker = VerusStakeChecker(
+            tx_hist_filename=self.tx_hist_filename,
+            env_api_filename=self.env_api_filename,
+            cli_logging=self.cli_logging,
+        )
+        stake_checker.verus_process = self.verus_process
+        self.load_stake_stats(stake_checker=stake_checker)
+        stake_checker.stake_stats = self.stake_stats
+        return stake_checker
+
+    def load_stake_stats(
+        self, stake_checker: Optional[VerusStakeChecker] = None
+    ) -> None:
+        """
+        Load stake stats stored in tx history file (by stake checker) once - then they are updated
+        in memory by each check.
+        """
+        if self.stake_stats_loaded:
+            return
+        stake_checker = stake_checker or VerusStakeChecker(
+            tx_hist_filename=self.tx_hist_filename,
+            env_api_filename=self.env_api_filename,
+            cli_logging=self.cli_logging,
+        )
+        self.stake_stats.replace(aggregates=stake_checker.stake_stats.to_dict())
+        self.stake_stats_loaded = True
+
+    def run_once(self) -> float:
+        """
+        Check staking state, run stake checker and return seconds to next check.
+        A stake can only appear with a new block - if chain tip has not moved, staking state of previous check
+        is reused and stake checker (wallet RPCs) is skipped.
+        """
+        self.checks += 1
+        stake_checker = self._create_stake_checker()
+        # Daemon's log records share correlation id with the check cycle
+        set_log_cycle_id(stake_checker.cycle_id)
+        state = StakingState(process_running=False)
+        if self.verus_process.status:
+            best_block_hash = stake_checker._get_best_block_hash()
+            if self._check_state_stale(
+                stake_checker=stake_checker, best_block_hash=best_block_hash
+            ):
+                state = self._refresh_state(
+                    stake_checker=stake_checker, best_block_hash=best_block_hash
+                )
+            else:
+                state = self.state
+                self.state_age += 1
+        self.state = state if state.process_running else None
+        interval = self.scheduler.next_interval(state=state)
+        self._log_state(state=state, interval=interval)
+        self._store_metrics(state=state, interval=interval)
+        return interval
+
+    def _check_state_stale(
+        self, stake_checker: VerusStakeChecker, best_block_hash: str
+    ) -> bool:
+        """
+        Check whether staking state has to be refreshed - chain tip moved (or unknown), no state yet
+        or state not refreshed in the last 'state_refresh_checks' checks.
+        """
+        return (
+            self.state is None
+            or self.state_age + 1 >= self.state_refresh_checks
+            or stake_checker._check_chain_tip_changed(best_block_hash=best_block_hash)
+        )
+
+    def _refresh_state(
+        self, stake_checker: VerusStakeChecker, best_block_hash: str
+    ) -> StakingState:
+        """
+        Fetch staking state from wallet and run stake checker.
+        """
+        self.state_age = 0
+        try:
+            wallet_info = stake_checker._get_wallet_info()
+            mining_info = stake_checker._get_mining_info()
+        except (json.decoder.JSONDecodeError, OSError):
+            # verusd is running but its RPC is not available yet (fe. still loading)
+            return StakingState(process_running=False)
+        # Wallet info and chain tip fetched for staking state are reused by stake checker
+        stake_checker.wallet_info = wallet_info
+        try:
+            stake_checker.run(best_block_hash=best_block_hash)
+        except (json.decoder.JSONDecodeError, OSError) as error:
+            # Not valid wallet reply (fe. verusd restarting) - daemon keeps running and backs off
+            self.logger.error(f"Stake check failed: {error!r}")
+            return StakingState(process_running=False)
+        return StakingState.from_rpc(mining_info=mining_info, wallet_info=wallet_info)
+
+    def run_forever(self, max_checks: Optional[int] = None) -> None:
+        """
+        Run checks until interrupted (or until 'max_checks' checks are done).
+        Stats server (if enabled) runs until checks are finished.
+        """
+        if self.stats_address:
+            self.start_stats_server()
+        try:
+            while max_checks is None or self.checks < max_checks:
+                interval = self.run_once()
+                if max_checks is not None and self.checks >= max_checks:
+                    break
+                time.sleep(interval)
+        finally:
+            if self.stats_server:
+                self.stats_server.stop()
+
+    def start_stats_server(self) -> StatsServer:
+        """
+        Start local stats server serving daemon's stake stats.
+        Stats stored in tx history file are served from the start (before the first check).
+        """
+        self.load_stake_stats()
+        host, port = self.stats_address or (STATS_HOST, 0)
+        self.stats_server = StatsServer(
+            stake_stats=self.stake_stats, host=host, port=port
+        )
+        self.stats_server.start()
+        self.logger.info(f"Stake stats served at {self.stats_server.url}")
+        return self.stats_server
+
+    def _log_state(self, state: StakingState, interval: float) -> None:
+        """
+        Log scheduler state on mode change and every check while verusd is not running.
+        """
+        if state.mode == "down":
+            self.logger.error(
+                f"verusd process is not running or not responding - next check in {interval:.0f}s"
+            )
+        elif state.mode != self.mode:
+            self.logger.info(
+                f"Scheduler mode: {state.mode} (staking: {state.staking}, "
+                f"eligible balance: {state.eligible_balance}, wallet locked: {state.wallet_locked}) "
+                f"- checking every {interval:.0f}s"
+            )
+        self.mode = state.mode
+
+    def _store_metrics(self, state: StakingState, interval: float) -> None:
+        """
+        Store scheduler state in metrics file (replaced atomically).
+        """
+        metrics = {
+            "mode": state.mode,
+            "interval_s": interval,
+            "down_count": self.scheduler.down_count,
+            "checks": self.checks,
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **asdict(state),
+        }
+        metrics_path = self.metrics_file_path
+        tmp_path = metrics_path.with_name(f"{metrics_path.name}.tmp")
+        tmp_path.write_text(json.dumps(metrics))
+        os.replace(tmp_path, metrics_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check Verus wallet for new stakes at intervals adapted to staking state"
+    )
+    parser.add_argument(
+        "--active-interval",
+        type=float,
+        default=30,
+        help="seconds between checks while wallet is staking (default: 30)",
+    )
+    parser.add_argument(
+        "--idle-interval",
+        type=float,
+        default=600,
+        help="seconds between checks while wallet is not staking (default: 600)",
+    )
+    parser.add_argument(
+        "--backoff-max",
+        type=float,
+        default=1800,
+        help="max seconds between checks while verusd is not running (default: 1800)",
+    )
+    parser.add_argument(
+        "--stats-port",
+        type=int,
+        help="serve stake stats (read-only HTTP API) on this port (default: not served)",
+    )
+    parser.add_argument(
+        "--stats-host",
+        default=STATS_HOST,
+        help=f"stake stats server address (default: {STATS_HOST})",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="run single check and exit",
+    )
+    parser.add_argument(
+        "--cli-logging",
+        action="store_true",
+        help="log to CLI instead of log file",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        help=f"log records format - 'json' for JSON lines with check cycle id (default: {LOG_FORMAT_ENV} env var or 'text')",
+    )
+    args = parser.parse_args()
+    if args.log_format:
+        # Loggers config is loaded on first use and reads format from env var
+        os.environ[LOG_FORMAT_ENV] = args.log_format
+    daemon = StakeDaemon(
+        scheduler=PollingScheduler(
+            active_interval=args.active_interval,
+            idle_interval=args.idle_interval,
+            backoff_max=args.backoff_max,
+        ),
+        cli_logging=args.cli_logging,
+        stats_address=(args.stats_host, args.stats_port) if args.stats_port else None,
+    )
+    daemon.run_forever(max_checks=1 if args.once else None)
@@ -0,0 +1,167 @@
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from check_new_stake import STATS_ALL_TIME, StakeStats
+
+
+# Max number of requests handled concurrently
+STATS_MAX_WORKERS = 4
+STATS_HOST = "127.0.0.1"
+STATS_PATH = "/stats"
+# Staking address (base58) - '#' separates period and address in stake stats
+ADDRESS_PATTERN = re.compile(r"^[A-Za-z0-9]{1,64}$")
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+MONTH_PATTERN = re.compile(r"^\d{1,2}$")
+
+
+def get_timeframe(year: str, month: str) -> Optional[str]:
+    """
+    Return period ('2021-09' or '2021') for the 'year' and 'month' query params (current month if not given).
+    Return None if query params are not valid.
+    """
+    date_now = datetime.now(timezone.utc)
+    if year and not YEAR_PATTERN.fullmatch(year):
+        return None
+    if month and not (MONTH_PATTERN.fullmatch(month) and 0 < int(month) < 13):
+        return None
+    if year and not month:
+        return year
+    year = year or date_now.strftime("%Y")
+    if month:
+        return f"{year}-{int(month):02d}"
+    return date_now.strftime("%Y-%m")
+
+
+def get_stats_response(stake_stats: StakeStats, query: dict) -> Tuple[int, dict]:
+    """
+    Return status code and body of stats request - query params and response shape follow API's GET method:
+    - 'year' and 'month' - period (default: current month);
+    - 'period=all' - all-time stats;
+    - 'address' - stats of staking address in period;
+    - 'mode=addresses' - stats of each staking address in period.
+    Values may differ from API's ones - stakes are counted by stake time (UTC), not by ingestion time,
+    and only stakes posted since stake stats are kept in tx history file are counted (no backfill from API).
+    """
+    period = query.get("period", "")
+    address = query.get("address", "")
+    mode = query.get("mode", "")
+    if period == STATS_ALL_TIME and not address and not mode:
+        return 200, stake_stats.get_period(period=STATS_ALL_TIME)
+    if period:
+        # Rolling windows are not kept locally and addresses are kept per year and month only
+        return 400, {"message": "Not valid period"}
+    timeframe = get_timeframe(year=query.get("year", ""), month=query.get("month", ""))
+    if not timeframe:
+        return 400, {"message": "Not valid year or month"}
+    if mode == "addresses":
+        return 200, {
+            "timeframe": timeframe,
+            "addresses": stake_stats.get_addresses(period=timeframe),
+        }
+    if address:
+        if not ADDRESS_PATTERN.fullmatch(address):
+            return 400, {"message": "Not valid address"}
+        stats = stake_stats.get_period(period=f"{timeframe}#{address}")
+        return 200, {**stats, "timeframe": timeframe, "address": address}
+    return 200, stake_stats.get_period(period=timeframe)
+
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving stake stats (read-only - GET method only).
+    """
+
+    server_version = "VerusStakeStats"
+
+    def log_message(self, format: str, *args) -> None:
+        # Local dashboards poll often - requests are not logged
+        pass
+
+    def _send_json(self, data: dict, status_code: int = 200) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status_code == 405:
+            self.send_header("Allow", "GET")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != STATS_PATH:
+            self._send_json({"message": "Not Found"}, status_code=404)
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        status_code, data = get_stats_response(
+            stake_stats=self.server.stake_stats, query=query
+        )
+        self._send_json(data, status_code=status_code)
+
+    def _send_method_not_allowed(self) -> None:
+        self._send_json({"message": "Method Not Allowed"}, status_code=405)
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = _send_method_not_allowed
+
+
+class StatsServer(HTTPServer):
+    """
+    The class representing local read-only HTTP server of stake stats run in a background thread.
+    Requests are handled in a thread pool - stats are read from memory (no wallet or AWS API calls).
+    """
+
+    def __init__(
+        self,
+        stake_stats: StakeStats,
+        host: str = STATS_HOST,
+        port: int = 0,
+        max_workers: int = STATS_MAX_WORKERS,
+    ) -> None:
+        super().__init__((host, port), StatsRequestHandler)
+        self.stake_stats = stake_stats
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="stats-server"
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{STATS_PATH}"
+
+    def process_request(self, request, client_address) -> None:
+        """
+        Handle request in thread pool.
+        """
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def start(self) -> None:
+        """
+        Serve requests in background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving requests, wait for handled ones and close server socket.
+        """
+        self.shutdown()
+        self.executor.shutdown(wait=True)
+        self.server_close()
+        if self._thread:
+            self._thread.join()
@@ -1,36 +1,46 @@
 resource "aws_api_gateway_rest_api" "verus_api" {
+  count = local.rest_api_count
+
   name        = "${local.name_prefix}-api-${random_id.name.hex}"
   description = "Invoke Lambda function when a new stake appears in your Verus (VRSC) wallet."
 }
 
 resource "aws_api_gateway_resource" "verus_api" {
-  parent_id   = aws_api_gateway_rest_api.verus_api.root_resource_id
+  count = local.rest_api_count
+
+  parent_id   = aws_api_gateway_rest_api.verus_api[0].root_resource_id
   path_part   = "stake"
-  rest_api_id = aws_api_gateway_rest_api.verus_api.id
+  rest_api_id = aws_api_gateway_rest_api.verus_api[0].id
 }
 
 resource "aws_api_gateway_authorizer" "verus_auth" {
+  count = local.rest_api_count
+
   name          = "Verus-API-Authorizer"
   type          = "COGNITO_USER_POOLS"
-  rest_api_id   = aws_api_gateway_rest_api.verus_api.id
+  rest_api_id   = aws_api_gateway_rest_api.verus_api[0].id
   provider_arns = [aws_cognito_user_pool.this.arn]
 }
 
 # API Gateway - GET
 resource "aws_api_gateway_method" "verus_api_get" {
+  count = local.rest_api_count
+
   authorization = "COGNITO_USER_POOLS"
   //  authorization = "NONE"
-  authorizer_id        = aws_api_gateway_authorizer.verus_auth.id
+  authorizer_id        = aws_api_gateway_authorizer.verus_auth[0].id
   http_method          = "GET"
-  resource_id          = aws_api_gateway_resource.verus_api.id
-  rest_api_id          = aws_api_gateway_rest_api.verus_api.id
+  resource_id          = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id          = aws_api_gateway_rest_api.verus_api[0].id
   authorization_scopes = aws_cognito_resource_server.this.scope_identifiers
 }
 
 resource "aws_api_gateway_integration" "verus_api_get" {
-  http_method             = aws_api_gateway_method.verus_api_get.http_method
-  resource_id             = aws_api_gateway_resource.verus_api.id
-  rest_api_id             = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  http_method             = aws_api_gateway_method.verus_api_get[0].http_method
+  resource_id             = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id             = aws_api_gateway_rest_api.verus_api[0].id
   integration_http_method = "POST"
   type                    = "AWS"
   uri                     = aws_lambda_function.verus_lambda_get.invoke_arn
@@ -41,6 +51,17 @@ resource "aws_api_gateway_integration" "verus_api_get" {
 {
     "year": "$input.params('year')",
     "month": "$input.params('month')",
+    "wallet_id": "$input.params('wallet_id')",
+    "scope": "$input.params('scope')",
+    "period": "$input.params('period')",
+    "mode": "$input.params('mode')",
+    "from": "$input.params('from')",
+    "to": "$input.params('to')",
+    "limit": "$input.params('limit')",
+    "cursor": "$input.params('cursor')",
+    "order": "$input.params('order')",
+    "address": "$input.params('address')",
+    "client_id": "$context.authorizer.claims.client_id",
     "http_method": "$context.httpMethod"
 }
 EOF
@@ -48,17 +69,21 @@ EOF
 }
 
 resource "aws_api_gateway_method_response" "verus_api_method_response_get_200" {
-  http_method = aws_api_gateway_method.verus_api_get.http_method
-  resource_id = aws_api_gateway_resource.verus_api.id
-  rest_api_id = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  http_method = aws_api_gateway_method.verus_api_get[0].http_method
+  resource_id = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id = aws_api_gateway_rest_api.verus_api[0].id
   status_code = "200"
 }
 
 resource "aws_api_gateway_integration_response" "verus_api_integration_response_get_200" {
-  http_method       = aws_api_gateway_method.verus_api_get.http_method
-  resource_id       = aws_api_gateway_resource.verus_api.id
-  rest_api_id       = aws_api_gateway_rest_api.verus_api.id
-  status_code       = aws_api_gateway_method_response.verus_api_method_response_get_200.status_code
+  count = local.rest_api_count
+
+  http_method       = aws_api_gateway_method.verus_api_get[0].http_method
+  resource_id       = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id       = aws_api_gateway_rest_api.verus_api[0].id
+  status_code       = aws_api_gateway_method_response.verus_api_method_response_get_200[0].status_code
   selection_pattern = ""
   content_handling  = "CONVERT_TO_TEXT"
   depends_on        = [aws_api_gateway_integration.verus_api_get]
@@ -66,21 +91,25 @@ resource "aws_api_gateway_integration_response" "verus_api_integration_response_
 
 # API Gateway - POST
 resource "aws_api_gateway_method" "verus_api_post" {
+  count = local.rest_api_count
+
   //  authorization = "NONE"
   authorization = "COGNITO_USER_POOLS"
-  authorizer_id = aws_api_gateway_authorizer.verus_auth.id
+  authorizer_id = aws_api_gateway_authorizer.verus_auth[0].id
   http_method   = "POST"
-  resource_id   = aws_api_gateway_resource.verus_api.id
-  rest_api_id   = aws_api_gateway_rest_api.verus_api.id
+  resource_id   = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id   = aws_api_gateway_rest_api.verus_api[0].id
   request_models = {
-    "application/json" = aws_api_gateway_model.verus_api_post_model.name
+    "application/json" = aws_api_gateway_model.verus_api_post_model[0].name
   }
-  request_validator_id = aws_api_gateway_request_validator.verus_api_post_validate_body.id
+  request_validator_id = aws_api_gateway_request_validator.verus_api_post_validate_body[0].id
   authorization_scopes = aws_cognito_resource_server.this.scope_identifiers
 }
 
 resource "aws_api_gateway_model" "verus_api_post_model" {
-  rest_api_id  = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  rest_api_id  = aws_api_gateway_rest_api.verus_api[0].id
   name         = "StakePOST"
   description  = "JSON schema for stake POST method"
   content_type = "application/json"
@@ -102,6 +131,20 @@ resource "aws_api_gateway_model" "verus_api_post_model" {
           "description": "Stake amount",
           "type": "number",
           "minimum": 0
+      },
+      "wallet_id": {
+          "description": "Wallet id (Cognito client id is used if not provided)",
+          "type": "string",
+          "pattern": "^[A-Za-z0-9_.:-]{1,64}$"
+      },
+      "detected_at": {
+          "description": "Time the stake was detected by the checker (used for latency metrics)",
+          "type": "integer"
+      },
+      "address": {
+          "description": "Staking address (used for per-address aggregates)",
+          "type": "string",
+          "pattern": "^[A-Za-z0-9]{1,64}$"
       }
   },
   "required": ["txid", "time", "amount"]
@@ -110,15 +153,19 @@ EOF
 }
 
 resource "aws_api_gateway_request_validator" "verus_api_post_validate_body" {
+  count = local.rest_api_count
+
   name                  = "POST-body-validator"
-  rest_api_id           = aws_api_gateway_rest_api.verus_api.id
+  rest_api_id           = aws_api_gateway_rest_api.verus_api[0].id
   validate_request_body = true
 }
 
 resource "aws_api_gateway_integration" "verus_api_post" {
-  http_method             = aws_api_gateway_method.verus_api_post.http_method
-  resource_id             = aws_api_gateway_resource.verus_api.id
-  rest_api_id             = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  http_method             = aws_api_gateway_method.verus_api_post[0].http_method
+  resource_id             = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id             = aws_api_gateway_rest_api.verus_api[0].id
   integration_http_method = "POST"
   type                    = "AWS"
   uri                     = aws_lambda_function.verus_lambda_post.invoke_arn
@@ -128,6 +175,7 @@ resource "aws_api_gateway_integration" "verus_api_post" {
     "application/json" = <<EOF
 {
     "body": $input.json('$'),
+    "client_id": "$context.authorizer.claims.client_id",
     "http_method": "$context.httpMethod"
 }
 EOF
@@ -135,31 +183,126 @@ EOF
 }
 
 resource "aws_api_gateway_method_response" "verus_api_method_response_post_200" {
-  http_method = aws_api_gateway_method.verus_api_post.http_method
-  resource_id = aws_api_gateway_resource.verus_api.id
-  rest_api_id = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  http_method = aws_api_gateway_method.verus_api_post[0].http_method
+  resource_id = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id = aws_api_gateway_rest_api.verus_api[0].id
   status_code = "200"
 }
 
 resource "aws_api_gateway_integration_response" "verus_api_integration_response_post_200" {
-  http_method       = aws_api_gateway_method.verus_api_post.http_method
-  resource_id       = aws_api_gateway_resource.verus_api.id
-  rest_api_id       = aws_api_gateway_rest_api.verus_api.id
-  status_code       = aws_api_gateway_method_response.verus_api_method_response_post_200.status_code
+  count = local.rest_api_count
+
+  http_method       = aws_api_gateway_method.verus_api_post[0].http_method
+  resource_id       = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id       = aws_api_gateway_rest_api.verus_api[0].id
+  status_code       = aws_api_gateway_method_response.verus_api_method_response_post_200[0].status_code
   selection_pattern = ""
   content_handling  = "CONVERT_TO_TEXT"
   depends_on        = [aws_api_gateway_integration.verus_api_post]
 }
 
+# API Gateway - DELETE (compensation for orphaned stake)
+resource "aws_api_gateway_method" "verus_api_delete" {
+  count = local.rest_api_count
+
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.verus_auth[0].id
+  http_method   = "DELETE"
+  resource_id   = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id   = aws_api_gateway_rest_api.verus_api[0].id
+  request_models = {
+    "application/json" = aws_api_gateway_model.verus_api_delete_model[0].name
+  }
+  request_validator_id = aws_api_gateway_request_validator.verus_api_post_validate_body[0].id
+  authorization_scopes = aws_cognito_resource_server.this.scope_identifiers
+}
+
+resource "aws_api_gateway_model" "verus_api_delete_model" {
+  count = local.rest_api_count
+
+  rest_api_id  = aws_api_gateway_rest_api.verus_api[0].id
+  name         = "StakeDELETE"
+  description  = "JSON schema for stake DELETE method"
+  content_type = "application/json"
+  schema       = <<EOF
+{
+  "$schema": "http://json-schema.org/draft-04/schema#",
+  "title" : "Orphaned Stake",
+  "type" : "object",
+  "properties": {
+      "txid": {
+          "description": "Stake transaction (tx) id",
+          "type": "string"
+      },
+      "wallet_id": {
+          "description": "Wallet id (Cognito client id is used if not provided)",
+          "type": "string",
+          "pattern": "^[A-Za-z0-9_.:-]{1,64}$"
+      }
+  },
+  "required": ["txid"]
+}
+EOF
+}
+
+resource "aws_api_gateway_integration" "verus_api_delete" {
+  count = local.rest_api_count
+
+  http_method             = aws_api_gateway_method.verus_api_delete[0].http_method
+  resource_id             = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id             = aws_api_gateway_rest_api.verus_api[0].id
+  integration_http_method = "POST"
+  type                    = "AWS"
+  uri                     = aws_lambda_function.verus_lambda_post.invoke_arn
+  connection_type         = "INTERNET"
+  passthrough_behavior    = "NEVER"
+  request_templates = {
+    "application/json" = <<EOF
+{
+    "body": $input.json('$'),
+    "client_id": "$context.authorizer.claims.client_id",
+    "http_method": "$context.httpMethod"
+}
+EOF
+  }
+}
+
+resource "aws_api_gateway_method_response" "verus_api_method_response_delete_200" {
+  count = local.rest_api_count
+
+  http_method = aws_api_gateway_method.verus_api_delete[0].http_method
+  resource_id = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id = aws_api_gateway_rest_api.verus_api[0].id
+  status_code = "200"
+}
+
+resource "aws_api_gateway_integration_response" "verus_api_integration_response_delete_200" {
+  count = local.rest_api_count
+
+  http_method       = aws_api_gateway_method.verus_api_delete[0].http_method
+  resource_id       = aws_api_gateway_resource.verus_api[0].id
+  rest_api_id       = aws_api_gateway_rest_api.verus_api[0].id
+  status_code       = aws_api_gateway_method_response.verus_api_method_response_delete_200[0].status_code
+  selection_pattern = ""
+  content_handling  = "CONVERT_TO_TEXT"
+  depends_on        = [aws_api_gateway_integration.verus_api_delete]
+}
+
 resource "aws_api_gateway_deployment" "verus_api" {
-  rest_api_id = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  rest_api_id = aws_api_gateway_rest_api.verus_api[0].id
   triggers = {
     redeployment = sha1(jsonencode([
-      aws_api_gateway_resource.verus_api.id,
-      aws_api_gateway_method.verus_api_get.id,
-      aws_api_gateway_integration.verus_api_get.id,
-      aws_api_gateway_method.verus_api_post.id,
-      aws_api_gateway_integration.verus_api_post.id
+      aws_api_gateway_resource.verus_api[0].id,
+      aws_api_gateway_method.verus_api_get[0].id,
+      aws_api_gateway_integration.verus_api_get[0].id,
+      aws_api_gateway_method.verus_api_post[0].id,
+      aws_api_gateway_integration.verus_api_post[0].id,
+      aws_api_gateway_method.verus_api_delete[0].id,
+      aws_api_gateway_integration.verus_api_delete[0].id
     ]))
   }
   lifecycle {
@@ -168,12 +311,16 @@ resource "aws_api_gateway_deployment" "verus_api" {
 }
 
 resource "aws_api_gateway_stage" "verus_api" {
-  deployment_id = aws_api_gateway_deployment.verus_api.id
-  rest_api_id   = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  deployment_id = aws_api_gateway_deployment.verus_api[0].id
+  rest_api_id   = aws_api_gateway_rest_api.verus_api[0].id
   stage_name    = local.api_stage
 }
 
 resource "aws_api_gateway_rest_api_policy" "verus_api" {
-  rest_api_id = aws_api_gateway_rest_api.verus_api.id
+  count = local.rest_api_count
+
+  rest_api_id = aws_api_gateway_rest_api.verus_api[0].id
   policy      = data.aws_iam_policy_document.verus_api_resource_ip_limit_policy.json
 }
@@ -0,0 +1,91 @@
+# HTTP API (API Gateway v2) - deployed instead of REST API when var.api_type = "http".
+# Lambda proxy integration passes requests to handlers as-is (payload format 2.0) and JWT authorizer
+# validates Cognito access tokens without separate authorizer invocation.
+# Note: wallet_ip resource policy is supported by REST API only.
+resource "aws_apigatewayv2_api" "verus_api" {
+  count = local.http_api_count
+
+  name          = "${local.name_prefix}-http-api-${random_id.name.hex}"
+  description   = "Invoke Lambda function when a new stake appears in your Verus (VRSC) wallet."
+  protocol_type = "HTTP"
+}
+
+resource "aws_apigatewayv2_authorizer" "verus_auth" {
+  count = local.http_api_count
+
+  name             = "Verus-API-Authorizer"
+  api_id           = aws_apigatewayv2_api.verus_api[0].id
+  authorizer_type  = "JWT"
+  identity_sources = ["$request.header.Authorization"]
+
+  jwt_configuration {
+    # Access tokens are accepted only from listed app clients ('client_id' claim) - REST API Cognito
+    # authorizer accepts all clients of the user pool
+    audience = concat([aws_cognito_user_pool_client.this.id], var.extra_cognito_client_ids)
+    issuer   = "https://${aws_cognito_user_pool.this.endpoint}"
+  }
+}
+
+# HTTP API - GET
+resource "aws_apigatewayv2_integration" "verus_api_get" {
+  count = local.http_api_count
+
+  api_id                 = aws_apigatewayv2_api.verus_api[0].id
+  integration_type       = "AWS_PROXY"
+  integration_uri        = aws_lambda_function.verus_lambda_get.invoke_arn
+  integration_method     = "POST"
+  payload_format_version = "2.0"
+}
+
+resource "aws_apigatewayv2_route" "verus_api_get" {
+  count = local.http_api_count
+
+  api_id               = aws_apigatewayv2_api.verus_api[0].id
+  route_key            = "GET /stake"
+  target               = "integrations/${aws_apigatewayv2_integration.verus_api_get[0].id}"
+  authorization_type   = "JWT"
+  authorizer_id        = aws_apigatewayv2_authorizer.verus_auth[0].id
+  authorization_scopes = aws_cognito_resource_server.this.scope_identifiers
+}
+
+# HTTP API - POST
+resource "aws_apigatewayv2_integration" "verus_api_post" {
+  count = local.http_api_count
+
+  api_id                 = aws_apigatewayv2_api.verus_api[0].id
+  integration_type       = "AWS_PROXY"
+  integration_uri        = aws_lambda_function.verus_lambda_post.invoke_arn
+  integration_method     = "POST"
+  payload_format_version = "2.0"
+}
+
+resource "aws_apigatewayv2_route" "verus_api_post" {
+  count = local.http_api_count
+
+  api_id               = aws_apigatewayv2_api.verus_api[0].id
+  route_key            = "POST /stake"
+  target               = "integrations/${aws_apigatewayv2_integration.verus_api_post[0].id}"
+  authorization_type   = "JWT"
+  authorizer_id        = aws_apigatewayv2_authorizer.verus_auth[0].id
+  authorization_scopes = aws_cognito_resource_server.this.scope_identifiers
+}
+
+# HTTP API - DELETE (compensation for orphaned stake) - handled by POST Lambda
+resource "aws_apigatewayv2_route" "verus_api_delete" {
+  count = local.http_api_count
+
+  api_id               = aws_apigatewayv2_api.verus_api[0].id
+  route_key            = "DELETE /stake"
+  target               = "integrations/${aws_apigatewayv2_integration.verus_api_post[0].id}"
+  authorization_type   = "JWT"
+  authorizer_id        = aws_apigatewayv2_authorizer.verus_auth[0].id
+  authorization_scopes = aws_cognito_resource_server.this.scope_identifiers
+}
+
+resource "aws_apigatewayv2_stage" "verus_api" {
+  count = local.http_api_count
+
+  api_id      = aws_apigatewayv2_api.verus_api[0].id
+  name        = local.api_stage
+  auto_deploy = true
+}
@@ -1,25 +1,97 @@
 resource "aws_dynamodb_table" "verus_stakes_txids_table" {
   name           = "${local.name_prefix}-stakes-txids-table-${random_id.name.hex}"
-  billing_mode   = "PROVISIONED"
-  read_capacity  = 1
-  write_capacity = 1
-  hash_key       = "tx_id"
+  billing_mode   = var.dynamodb_billing_mode
+  read_capacity  = local.dynamodb_capacity
+  write_capacity = local.dynamodb_capacity
+  hash_key       = "wallet_id"
+  range_key      = "tx_id"
+
+  attribute {
+    name = "wallet_id"
+    type = "S"
+  }
 
   attribute {
     name = "tx_id"
     type = "S"
   }
+
+  attribute {
+    name = "stake_ts"
+    type = "N"
+  }
+
+  # Listing of wallet's stakes in a time window (newest first)
+  global_secondary_index {
+    name               = "stake_ts_index"
+    hash_key           = "wallet_id"
+    range_key          = "stake_ts"
+    read_capacity      = local.dynamodb_capacity
+    write_capacity     = local.dynamodb_capacity
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["stake_amount"]
+  }
+
+  # Table capacity is changed by autoscaling (index capacity is set to min capacity on changes of index block)
+  lifecycle {
+    ignore_changes = [read_capacity, write_capacity]
+  }
 }
 
 resource "aws_dynamodb_table" "verus_stakes_values_table" {
   name           = "${local.name_prefix}-stakes-values-table-${random_id.name.hex}"
-  billing_mode   = "PROVISIONED"
-  read_capacity  = 1
-  write_capacity = 1
-  hash_key       = "ts_id"
+  billing_mode   = var.dynamodb_billing_mode
+  read_capacity  = local.dynamodb_capacity
+  write_capacity = local.dynamodb_capacity
+  hash_key       = "wallet_id"
+  range_key      = "ts_id"
+
+  attribute {
+    name = "wallet_id"
+    type = "S"
+  }
 
   attribute {
     name = "ts_id"
     type = "S"
   }
+
+  # Per-day buckets (rolling windows) expire when they drop out of the longest window
+  ttl {
+    attribute_name = "expire_at"
+    enabled        = true
+  }
+
+  # Table capacity is changed by autoscaling
+  lifecycle {
+    ignore_changes = [read_capacity, write_capacity]
+  }
+}
+
+# Autoscaling of tables and index capacity (provisioned capacity mode only)
+resource "aws_appautoscaling_target" "dynamodb" {
+  for_each = local.dynamodb_autoscaling_targets
+
+  min_capacity       = var.dynamodb_min_capacity
+  max_capacity       = var.dynamodb_max_capacity
+  resource_id        = each.value.resource_id
+  scalable_dimension = each.value.dimension
+  service_namespace  = "dynamodb"
+}
+
+resource "aws_appautoscaling_policy" "dynamodb" {
+  for_each = local.dynamodb_autoscaling_targets
+
+  name               = "${local.name_prefix}-${replace(each.key, "_", "-")}-autoscaling"
+  policy_type        = "TargetTrackingScaling"
+  resource_id        = aws_appautoscaling_target.dynamodb[each.key].resource_id
+  scalable_dimension = aws_appautoscaling_target.dynamodb[each.key].scalable_dimension
+  service_namespace  = aws_appautoscaling_target.dynamodb[each.key].service_namespace
+
+  target_tracking_scaling_policy_configuration {
+    predefined_metric_specification {
+      predefined_metric_type = each.value.metric
+    }
+    target_value = var.dynamodb_target_utilization
+  }
 }
@@ -34,18 +34,18 @@ resource "aws_iam_role_policy" "verus_role_inline_policy_dynamodb_post" {
     Version = "2012-10-17"
     Statement = [
       {
-        Sid = "PutItemToVerusStakesTxidsTable"
+        Sid = "GetPutDeleteItemToVerusStakesTxidsTable"
         Action = [
+          "dynamodb:GetItem",
           "dynamodb:PutItem",
+          "dynamodb:DeleteItem",
         ]
         Effect   = "Allow"
         Resource = aws_dynamodb_table.verus_stakes_txids_table.arn
       },
       {
-        Sid = "PutGetUpdateItemToVerusStakesValuesTable"
+        Sid = "UpdateItemToVerusStakesValuesTable"
         Action = [
-          "dynamodb:PutItem",
-          "dynamodb:GetItem",
           "dynamodb:UpdateItem"
         ]
         Effect   = "Allow"
@@ -73,13 +73,22 @@ resource "aws_iam_role_policy" "verus_role_inline_policy_dynamodb_get" {
     Version = "2012-10-17"
     Statement = [
       {
-        Sid = "GetItemFromVerusStakesValuesTable"
+        Sid = "GetItemQueryVerusStakesValuesTable"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:Query",
         ]
         Effect   = "Allow"
         Resource = aws_dynamodb_table.verus_stakes_values_table.arn
       },
+      {
+        Sid = "QueryVerusStakesTxidsTableIndex"
+        Action = [
+          "dynamodb:Query",
+        ]
+        Effect   = "Allow"
+        Resource = "${aws_dynamodb_table.verus_stakes_txids_table.arn}/index/stake_ts_index"
+      },
     ]
   })
 }
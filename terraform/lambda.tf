@@ -1,26 +1,28 @@
 resource "aws_lambda_function" "verus_lambda_get" {
-  filename         = data.archive_file.lambda_get_zip.output_path
+  filename         = "${local.artifacts_dir}/lambda_function_get_payload.zip"
   function_name    = "${local.name_prefix}-lambda-get-${random_id.name.hex}"
   description      = "Returns the number of stakes and their total value for the selected time period."
   role             = aws_iam_role.verus_iam_role_for_lambda_get.arn
   handler          = "lambda_function_get.lambda_handler_get"
-  source_code_hash = data.archive_file.lambda_get_zip.output_base64sha256
+  source_code_hash = filebase64sha256("${local.artifacts_dir}/lambda_function_get_payload.zip")
   runtime          = "python3.11"
 
   environment {
     variables = {
+      DYNAMODB_TXIDS_NAME  = aws_dynamodb_table.verus_stakes_txids_table.id
       DYNAMODB_VALUES_NAME = aws_dynamodb_table.verus_stakes_values_table.id
+      AWS_MAX_ATTEMPTS     = var.lambda_max_attempts
     }
   }
 }
 
 resource "aws_lambda_function" "verus_lambda_post" {
-  filename         = data.archive_file.lambda_post_zip.output_path
+  filename         = "${local.artifacts_dir}/lambda_function_post_payload.zip"
   function_name    = "${local.name_prefix}-lambda-post-${random_id.name.hex}"
   description      = "Put data to DynamDB and publish a msg to SNS topic when new stake appears in Verus wallet."
   role             = aws_iam_role.verus_iam_role_for_lambda_post.arn
   handler          = "lambda_function_post.lambda_handler_post"
-  source_code_hash = data.archive_file.lambda_post_zip.output_base64sha256
+  source_code_hash = filebase64sha256("${local.artifacts_dir}/lambda_function_post_payload.zip")
   runtime          = "python3.11"
 
   environment {
@@ -28,6 +30,7 @@ resource "aws_lambda_function" "verus_lambda_post" {
       TOPIC_ARN            = aws_sns_topic.verus_topic.arn
       DYNAMODB_TXIDS_NAME  = aws_dynamodb_table.verus_stakes_txids_table.id
       DYNAMODB_VALUES_NAME = aws_dynamodb_table.verus_stakes_values_table.id
+      AWS_MAX_ATTEMPTS     = var.lambda_max_attempts
     }
   }
 }
@@ -37,9 +40,9 @@ resource "aws_lambda_permission" "verus_api_lambda_get" {
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.verus_lambda_get.function_name
   principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.verus_api.execution_arn}/*/*/*"
+  source_arn    = "${local.api_execution_arn}/*/*/*"
   # Can be tightened using:
-  # source_arn    = "${aws_api_gateway_rest_api.verus_api.execution_arn}/*/${aws_api_gateway_method.verus_api_get.http_method}${aws_api_gateway_resource.verus_api.path}"
+  # source_arn    = "${aws_api_gateway_rest_api.verus_api[0].execution_arn}/*/${aws_api_gateway_method.verus_api_get[0].http_method}${aws_api_gateway_resource.verus_api[0].path}"
 }
 
 resource "aws_lambda_permission" "verus_api_lambda_post" {
@@ -47,7 +50,7 @@ resource "aws_lambda_permission" "verus_api_lambda_post" {
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.verus_lambda_post.function_name
   principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.verus_api.execution_arn}/*/*/*"
+  source_arn    = "${local.api_execution_arn}/*/*/*"
   # Can be tightened using:
-  # source_arn    = "${aws_api_gateway_rest_api.verus_api.execution_arn}/*/${aws_api_gateway_method.verus_api_post.http_method}${aws_api_gateway_resource.verus_api.path}"
+  # source_arn    = "${aws_api_gateway_rest_api.verus_api[0].execution_arn}/*/${aws_api_gateway_method.verus_api_post[0].http_method}${aws_api_gateway_resource.verus_api[0].path}"
 }
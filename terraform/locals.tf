@@ -4,4 +4,45 @@ locals {
   domain_prefix = "${var.cognito_pool_domain}-${random_string.name.id}"
   name_prefix   = "${local.project}-${local.environment}"
   api_stage     = "vrsc-${local.environment}"
+  # Only one API Gateway type is deployed - REST API (mapping templates) or HTTP API (Lambda proxy)
+  rest_api_count    = var.api_type == "rest" ? 1 : 0
+  http_api_count    = var.api_type == "http" ? 1 : 0
+  api_execution_arn = var.api_type == "rest" ? aws_api_gateway_rest_api.verus_api[0].execution_arn : aws_apigatewayv2_api.verus_api[0].execution_arn
+  # DynamoDB capacity units set only in provisioned capacity mode (scaled by autoscaling)
+  dynamodb_provisioned = var.dynamodb_billing_mode == "PROVISIONED"
+  dynamodb_capacity    = local.dynamodb_provisioned ? var.dynamodb_min_capacity : null
+  dynamodb_autoscaling_targets = local.dynamodb_provisioned ? {
+    txids_table_read = {
+      resource_id = "table/${aws_dynamodb_table.verus_stakes_txids_table.name}"
+      dimension   = "dynamodb:table:ReadCapacityUnits"
+      metric      = "DynamoDBReadCapacityUtilization"
+    }
+    txids_table_write = {
+      resource_id = "table/${aws_dynamodb_table.verus_stakes_txids_table.name}"
+      dimension   = "dynamodb:table:WriteCapacityUnits"
+      metric      = "DynamoDBWriteCapacityUtilization"
+    }
+    txids_index_read = {
+      resource_id = "table/${aws_dynamodb_table.verus_stakes_txids_table.name}/index/stake_ts_index"
+      dimension   = "dynamodb:index:ReadCapacityUnits"
+      metric      = "DynamoDBReadCapacityUtilization"
+    }
+    txids_index_write = {
+      resource_id = "table/${aws_dynamodb_table.verus_stakes_txids_table.name}/index/stake_ts_index"
+      dimension   = "dynamodb:index:WriteCapacityUnits"
+      metric      = "DynamoDBWriteCapacityUtilization"
+    }
+    values_table_read = {
+      resource_id = "table/${aws_dynamodb_table.verus_stakes_values_table.name}"
+      dimension   = "dynamodb:table:ReadCapacityUnits"
+      metric      = "DynamoDBReadCapacityUtilization"
+    }
+    values_table_write = {
+      resource_id = "table/${aws_dynamodb_table.verus_stakes_values_table.name}"
+      dimension   = "dynamodb:table:WriteCapacityUnits"
+      metric      = "DynamoDBWriteCapacityUtilization"
+    }
+  } : {}
+  # Deterministic Lambda zips built by build_lambdas.py (shared by all regions)
+  artifacts_dir = "${path.module}/files"
 }
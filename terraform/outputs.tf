@@ -1,6 +1,6 @@
 output "api_url" {
   description = "Verus API URL"
-  value       = "${aws_api_gateway_stage.verus_api.invoke_url}/${aws_api_gateway_resource.verus_api.path_part}"
+  value       = var.api_type == "rest" ? "${aws_api_gateway_stage.verus_api[0].invoke_url}/${aws_api_gateway_resource.verus_api[0].path_part}" : "${aws_apigatewayv2_stage.verus_api[0].invoke_url}/stake"
 }
 
 output "cognito_client_id" {
@@ -42,3 +42,60 @@ variable "cognito_pool_domain" {
   type        = string
   default     = "verus-creds"
 }
+
+variable "api_type" {
+  description = "API Gateway type - 'rest' (REST API with Cognito authorizer) or 'http' (HTTP API with JWT authorizer)"
+  type        = string
+  default     = "rest"
+
+  validation {
+    condition     = contains(["rest", "http"], var.api_type)
+    error_message = "The api_type must be 'rest' or 'http'."
+  }
+}
+
+variable "extra_cognito_client_ids" {
+  description = "Ids of additional Cognito app clients (fe. one per wallet host) accepted by HTTP API JWT authorizer"
+  type        = list(string)
+  default     = []
+}
+
+variable "dynamodb_billing_mode" {
+  description = "DynamoDB tables capacity mode - 'PROVISIONED' (with autoscaling) or 'PAY_PER_REQUEST' (on-demand)"
+  type        = string
+  default     = "PROVISIONED"
+
+  validation {
+    condition     = contains(["PROVISIONED", "PAY_PER_REQUEST"], var.dynamodb_billing_mode)
+    error_message = "The dynamodb_billing_mode must be 'PROVISIONED' or 'PAY_PER_REQUEST'."
+  }
+}
+
+variable "dynamodb_min_capacity" {
+  description = "Min read/write capacity units of DynamoDB tables and index (provisioned capacity mode)"
+  type        = number
+  default     = 1
+}
+
+variable "dynamodb_max_capacity" {
+  description = "Max read/write capacity units of DynamoDB tables and index autoscaling (provisioned capacity mode)"
+  type        = number
+  default     = 10
+}
+
+variable "dynamodb_target_utilization" {
+  description = "Target utilization (%) of consumed to provisioned capacity kept by autoscaling (provisioned capacity mode)"
+  type        = number
+  default     = 70
+
+  validation {
+    condition     = var.dynamodb_target_utilization >= 20 && var.dynamodb_target_utilization <= 90
+    error_message = "The dynamodb_target_utilization must be between 20 and 90."
+  }
+}
+
+variable "lambda_max_attempts" {
+  description = "Max attempts (first call and retries) of AWS API calls made by Lambda functions (adaptive retry mode)"
+  type        = number
+  default     = 5
+}
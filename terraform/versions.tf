@@ -10,9 +10,5 @@ terraform {
       source  = "hashicorp/random"
       version = "~> 3.7.2"
     }
-    archive = {
-      source  = "hashicorp/archive"
-      version = "~> 2.7.1"
-    }
   }
 }
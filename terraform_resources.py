@@ -1,25 +1,309 @@
 import argparse
+import hashlib
 import os
 import subprocess
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
 
-from dotenv import load_dotenv
 
-from utils import EnvApiFile, TerraformBackendBlock, get_path
+from build_lambdas import build_artifacts
+from utils import EnvApiFile, TerraformBackendBlock, get_path, load_env_file
 
 
-def store_terraform_output() -> None:
+# Output lines of regions deployed concurrently are printed one at a time
+print_lock = threading.Lock()
+# Saved plan and deploy cache (hashes of deployment inputs) are stored in terraform data dir
+PLAN_FILENAME = "deploy.tfplan"
+DEPLOY_CACHE_FILENAME = "deploy_cache.json"
+
+
+def get_region_env(region: Optional[str] = None) -> Optional[dict]:
+    """
+    Return environment of terraform commands run for one of many regions (None - single region deployment).
+    Each region has its own data dir (providers, selected workspace) and workspace named as region (state).
+    Regions are deployed concurrently - terraform can't prompt for input.
+    """
+    if region is None:
+        return None
+    return {**os.environ, "TF_DATA_DIR": f".terraform-{region}", "TF_INPUT": "0"}
+
+
+def get_env_api_filename(region: Optional[str] = None) -> str:
+    """
+    Return name of .env-api file storing API data of deployment.
+    """
+    if region is None:
+        return ".env-api"
+    return f".env-api-{region}"
+
+
+def run_terraform(options: List[str], region: Optional[str] = None) -> int:
+    """
+    Run terraform command and return its exit code.
+    Output of command run for one of many regions is prefixed with region name.
+    """
+    if region is None:
+        return subprocess.run(args=options).returncode
+    process = subprocess.Popen(
+        args=options,
+        env=get_region_env(region=region),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    for line in process.stdout:
+        print_output(line=line, region=region)
+    return process.wait()
+
+
+def print_output(line: str, region: Optional[str] = None) -> None:
+    """
+    Print terraform output line. Line of one of many regions is prefixed with region name.
+    """
+    line = line.rstrip("\n")
+    if region is None:
+        print(line, flush=True)
+        return
+    with print_lock:
+        print(f"[{region}] {line}", flush=True)
+
+
+def get_data_dir(region: Optional[str] = None) -> Path:
+    """
+    Return terraform data dir of deployment (relative to terraform dir).
+    """
+    if region is None:
+        return Path(".terraform")
+    return Path(f".terraform-{region}")
+
+
+def get_deploy_hash(terraform_vars: List[str], region: Optional[str] = None) -> str:
+    """
+    Return hash of deployment inputs - Terraform files, backend config, Lambda sources and variables.
+    """
+    paths = (
+        sorted(Path(".").glob("*.tf"))
+        + sorted(Path(".").glob("*.tfbackend"))
+        # Lambda zips are built from Lambda sources (identical sources give identical zips)
+        + sorted(Path("files").glob("*_payload.zip"))
+    )
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{path}\0".encode())
+        digest.update(path.read_bytes())
+    digest.update(json.dumps([region or "default", *terraform_vars]).encode())
+    return digest.hexdigest()
+
+
+def load_deploy_cache(region: Optional[str] = None) -> dict:
+    """
+    Return deploy cache - hashes of inputs of saved plan ('plan_hash') and last build ('applied_hash').
+    """
+    try:
+        return json.loads(
+            get_data_dir(region).joinpath(DEPLOY_CACHE_FILENAME).read_text()
+        )
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return {}
+
+
+def save_deploy_cache(cache: dict, region: Optional[str] = None) -> None:
+    """
+    Store deploy cache in terraform data dir (removed with data dir on backend change).
+    """
+    get_data_dir(region).joinpath(DEPLOY_CACHE_FILENAME).write_text(json.dumps(cache))
+
+
+def clear_deploy_cache(region: Optional[str] = None) -> None:
+    """
+    Remove deploy cache and saved plan.
+    """
+    for filename in [DEPLOY_CACHE_FILENAME, PLAN_FILENAME]:
+        get_data_dir(region).joinpath(filename).unlink(missing_ok=True)
+
+
+def plan_resources(terraform_vars: List[str], region: Optional[str] = None) -> bool:
+    """
+    Run 'terraform plan' and save plan in terraform data dir (applied by build). Return True if plan succeeded.
+    """
+    plan_path = get_data_dir(region).joinpath(PLAN_FILENAME)
+    options = ["terraform", "plan", f"-out={plan_path}"] + terraform_vars
+    if run_terraform(options=options, region=region):
+        return False
+    cache = load_deploy_cache(region=region)
+    cache["plan_hash"] = get_deploy_hash(terraform_vars=terraform_vars, region=region)
+    save_deploy_cache(cache=cache, region=region)
+    return True
+
+
+def apply_plan(region: Optional[str] = None) -> bool:
+    """
+    Apply saved plan. Return True if apply succeeded.
+    """
+    plan_path = get_data_dir(region).joinpath(PLAN_FILENAME)
+    returncode = run_terraform(
+        options=["terraform", "apply", str(plan_path)], region=region
+    )
+    # Saved plan is applied once (stale plan is rejected by terraform) - next build plans again
+    plan_path.unlink(missing_ok=True)
+    return not returncode
+
+
+def prepare_build(
+    terraform_vars: List[str], region: Optional[str] = None, force: bool = False
+) -> Optional[str]:
+    """
+    Prepare build and return its status (None if plan failed):
+    - 'unchanged' - inputs haven't changed since last build (terraform is skipped);
+    - 'saved' - plan saved with the same inputs exists (applied directly);
+    - 'planned' - new plan was created (applied after approval).
+    """
+    deploy_hash = get_deploy_hash(terraform_vars=terraform_vars, region=region)
+    cache = load_deploy_cache(region=region)
+    env_api_path = get_path(name=f"new_stake_script/{get_env_api_filename(region)}")
+    if not force and cache.get("applied_hash") == deploy_hash and env_api_path:
+        print_output(
+            line="No changes in Terraform files, Lambda sources and variables since last build - skipping terraform",
+            region=region,
+        )
+        return "unchanged"
+    plan_saved = get_data_dir(region).joinpath(PLAN_FILENAME).exists()
+    if plan_saved and cache.get("plan_hash") == deploy_hash:
+        return "saved"
+    if not plan_resources(terraform_vars=terraform_vars, region=region):
+        return None
+    return "planned"
+
+
+def apply_build(terraform_vars: List[str], region: Optional[str] = None) -> bool:
+    """
+    Apply saved plan and store API data in .env-api file. Return True if apply succeeded.
+    """
+    deploy_hash = get_deploy_hash(terraform_vars=terraform_vars, region=region)
+    if not apply_plan(region=region):
+        return False
+    save_deploy_cache(cache={"applied_hash": deploy_hash}, region=region)
+    store_terraform_output(region=region)
+    return True
+
+
+def build_resources(
+    terraform_vars: List[str], region: Optional[str] = None, force: bool = False
+) -> bool:
+    """
+    Apply changes and store API data in .env-api file. Return True if build succeeded.
+    Terraform is skipped if inputs haven't changed since last build, plan saved with the same inputs
+    is applied directly, otherwise plan is created and applied after approval.
+    """
+    status = prepare_build(terraform_vars=terraform_vars, region=region, force=force)
+    if status is None:
+        return False
+    if status == "unchanged":
+        return True
+    if status == "planned" and not get_approval(
+        question="Do you want to perform these actions?"
+    ):
+        print("Apply cancelled.")
+        return False
+    return apply_build(terraform_vars=terraform_vars, region=region)
+
+
+def plan_destroy(terraform_vars: List[str], region: Optional[str] = None) -> bool:
+    """
+    Run 'terraform plan -destroy' and save plan in terraform data dir. Return True if plan succeeded.
+    Saved destroy plan is never applied by build - its inputs hash is removed from deploy cache.
+    """
+    cache = load_deploy_cache(region=region)
+    cache.pop("plan_hash", None)
+    save_deploy_cache(cache=cache, region=region)
+    plan_path = get_data_dir(region).joinpath(PLAN_FILENAME)
+    options = ["terraform", "plan", "-destroy", f"-out={plan_path}"] + terraform_vars
+    return not run_terraform(options=options, region=region)
+
+
+def get_approval(question: str) -> bool:
+    """
+    Ask operator to approve shown changes - only 'yes' is accepted.
+    """
+    answer = input(f"{question}\nOnly 'yes' will be accepted to approve: ")
+    return answer == "yes"
+
+
+def get_terraform_vars(region: str, profile: str) -> List[str]:
+    """
+    Return terraform variables options.
+    """
+    # Get SNS Topic subscription email from env var
+    email_to_notify = os.getenv("EMAIL_TO_NOTIFY")
+    wallet_ip = os.getenv("WALLET_PUBLIC_IP")
+    options = [
+        f"-var=region={region}",
+        f"-var=profile={profile}",
+        f"-var=sns_email={email_to_notify}",
+    ]
+    if wallet_ip:
+        options.append(f"-var=wallet_ip={wallet_ip}")
+    # API Gateway type - 'rest' (default) or 'http'
+    api_type = os.getenv("API_TYPE")
+    if api_type:
+        options.append(f"-var=api_type={api_type}")
+    # Additional Cognito app clients accepted by HTTP API (comma-separated ids)
+    extra_client_ids = [
+        client_id
+        for client_id in os.getenv("COGNITO_EXTRA_CLIENT_IDS", "").split(",")
+        if client_id
+    ]
+    if extra_client_ids:
+        options.append(f"-var=extra_cognito_client_ids={json.dumps(extra_client_ids)}")
+    # DynamoDB capacity mode - 'PROVISIONED' (default, with autoscaling) or 'PAY_PER_REQUEST'
+    dynamodb_billing_mode = os.getenv("DYNAMODB_BILLING_MODE")
+    if dynamodb_billing_mode:
+        options.append(f"-var=dynamodb_billing_mode={dynamodb_billing_mode}")
+    # Max attempts of AWS API calls made by Lambda functions
+    lambda_max_attempts = os.getenv("LAMBDA_MAX_ATTEMPTS")
+    if lambda_max_attempts:
+        options.append(f"-var=lambda_max_attempts={lambda_max_attempts}")
+    return options
+
+
+def build_lambda_artifacts() -> None:
+    """
+    Build Lambda zips referenced by terraform files.
+    """
+    for artifact in build_artifacts().values():
+        bytecode = (
+            "with bytecode"
+            if artifact["bytecode"]
+            else "without bytecode (Lambda runtime's Python not found)"
+        )
+        print(
+            f"Lambda artifact {Path(artifact['path']).name}: {artifact['size_bytes']} bytes {bytecode}"
+        )
+
+
+def store_terraform_output(region: Optional[str] = None) -> None:
     """
     Function store necessary data from terraform output to .env-api file.
     Stored data will be used with API call.
     """
+    env_api_filename = get_env_api_filename(region=region)
     try:
-        terraform_output_data_json = subprocess.getoutput("terraform output -json")
-        terraform_output_data: dict = json.loads(terraform_output_data_json)
+        terraform_output_data_json = subprocess.run(
+            args=["terraform", "output", "-json"],
+            env=get_region_env(region=region),
+            capture_output=True,
+            text=True,
+        ).stdout
+        terraform_output_data = json.loads(terraform_output_data_json)
         cognito_scopes_list: list = terraform_output_data["cognito_scopes"]["value"]
         # Initialize .env-api file
         env_api_file = EnvApiFile(
+            filename=env_api_filename,
             notification_api_url=terraform_output_data["api_url"]["value"],
             cognito_client_id=terraform_output_data["cognito_client_id"]["value"],
             cognito_client_secret=terraform_output_data["cognito_client_secret"][
@@ -32,7 +316,7 @@ def store_terraform_output() -> None:
         print("Issue with terraform output. Exiting the script...")
         sys.exit()
     # Write terraform output data to .env-api file.
-    print("Store terraform output data to .env-api file")
+    print(f"Store terraform output data to {env_api_filename} file")
     env_api_file.store()
 
 
@@ -43,24 +327,13 @@ def build_resources_wrapper(command_params: dict) -> None:
     # Check whether '.terraform' dir exist - if not initialize Terraform working directory
     if not get_path(name="terraform/.terraform", directory=True):
         init_terraform_wrapper()
-    aws_region = command_params["region"]
-    aws_profile = command_params["profile"]
-    # Get SNS Topic subscription email from env var
-    email_to_notify = os.getenv("EMAIL_TO_NOTIFY")
-    wallet_ip = os.getenv("WALLET_PUBLIC_IP")
-    options = [
-        "terraform",
-        "apply",
-        f"-var=region={aws_region}",
-        f"-var=profile={aws_profile}",
-        f"-var=sns_email={email_to_notify}",
-    ]
-    if wallet_ip:
-        options.append(f"-var=wallet_ip={wallet_ip}")
-    # Run 'terraform apply'
-    subprocess.run(args=options)
-    # Run 'terraform output api_url' to get necessary data for API call
-    store_terraform_output()
+    terraform_vars = get_terraform_vars(
+        region=command_params["region"], profile=command_params["profile"]
+    )
+    if not build_resources(
+        terraform_vars=terraform_vars, force=command_params.get("force", False)
+    ):
+        sys.exit(1)
 
 
 def destroy_resources_wrapper() -> None:
@@ -70,6 +343,7 @@ def destroy_resources_wrapper() -> None:
     options = ["terraform", "destroy"]
     # Run 'terraform destroy'
     subprocess.run(args=options)
+    clear_deploy_cache()
     # Clear .env-api file
     print("Clearing data in .env-api file...")
     EnvApiFile().store()
@@ -78,31 +352,21 @@ def destroy_resources_wrapper() -> None:
 def plan_resources_wrapper(command_params: dict) -> None:
     """
     Function run by the parser to plan AWS resources.
+    Plan is saved - next build applies it if inputs haven't changed.
     """
     # Check whether '.terraform' dir exist - if not initialize Terraform working directory
     if not get_path(name="terraform/.terraform", directory=True):
         init_terraform_wrapper()
-    aws_region = command_params["region"]
-    aws_profile = command_params["profile"]
-    # Get SNS Topic subscription email from env var
-    email_to_notify = os.getenv("EMAIL_TO_NOTIFY")
-    wallet_ip = os.getenv("WALLET_PUBLIC_IP")
-    options = [
-        "terraform",
-        "plan",
-        f"-var=region={aws_region}",
-        f"-var=profile={aws_profile}",
-        f"-var=sns_email={email_to_notify}",
-    ]
-    if wallet_ip:
-        options.append(f"-var=wallet_ip={wallet_ip}")
-    # Run 'terraform plan'
-    subprocess.run(args=options)
+    terraform_vars = get_terraform_vars(
+        region=command_params["region"], profile=command_params["profile"]
+    )
+    if not plan_resources(terraform_vars=terraform_vars):
+        sys.exit(1)
 
 
-def init_terraform_wrapper() -> None:
+def setup_backend() -> List[str]:
     """
-    Function run by the parser to initialize Terraform working directory.
+    Setup backend based on config file existence and return 'terraform init' options.
     """
     tf_backend_filename = "config.s3.tfbackend"
     backend_handler = TerraformBackendBlock(
@@ -112,15 +376,118 @@ def init_terraform_wrapper() -> None:
     # Setup backend based on config file existence
     backend_handler.setup_backend()
 
-    # Initialize terraform
     if backend_handler._backend_config_exists():
         print("🚀 Initializing Terraform with S3 backend...")
-        options = ["terraform", "init", f"-backend-config={tf_backend_filename}"]
-    else:
-        print("🚀 Initializing Terraform with local backend...")
-        options = ["terraform", "init"]
+        return ["terraform", "init", f"-backend-config={tf_backend_filename}"]
+    print("🚀 Initializing Terraform with local backend...")
+    return ["terraform", "init"]
+
+
+def init_terraform_wrapper() -> None:
+    """
+    Function run by the parser to initialize Terraform working directory.
+    """
+    # Initialize terraform
+    subprocess.run(args=setup_backend())
+
+
+def prepare_region(
+    action: str,
+    region: str,
+    profile: str,
+    init_options: List[str],
+    force: bool = False,
+) -> Optional[str]:
+    """
+    Plan action for one of many regions in region's data dir and workspace.
+    Return build status (see prepare_build()), 'planned' for plan and destroy or None if planning failed.
+    Plan saved by earlier run is shown - all plans are seen before changes are approved.
+    """
+    if not get_path(name=f"terraform/.terraform-{region}", directory=True):
+        if run_terraform(options=init_options, region=region):
+            return None
+    workspace_options = ["terraform", "workspace", "select", "-or-create", region]
+    if run_terraform(options=workspace_options, region=region):
+        return None
+    terraform_vars = get_terraform_vars(region=region, profile=profile)
+    if action == "plan":
+        return "planned" if plan_resources(terraform_vars, region=region) else None
+    if action == "destroy":
+        return "planned" if plan_destroy(terraform_vars, region=region) else None
+    status = prepare_build(terraform_vars=terraform_vars, region=region, force=force)
+    if status == "saved":
+        plan_path = get_data_dir(region).joinpath(PLAN_FILENAME)
+        if run_terraform(options=["terraform", "show", str(plan_path)], region=region):
+            return None
+    return status
 
-    subprocess.run(args=options)
+
+def apply_region(action: str, region: str, profile: str) -> bool:
+    """
+    Apply saved plan of one of many regions. Return True if apply succeeded.
+    """
+    terraform_vars = get_terraform_vars(region=region, profile=profile)
+    if action == "build":
+        return apply_build(terraform_vars=terraform_vars, region=region)
+    if not apply_plan(region=region):
+        return False
+    clear_deploy_cache(region=region)
+    print_output(
+        line=f"Clearing data in {get_env_api_filename(region=region)} file...",
+        region=region,
+    )
+    EnvApiFile(filename=get_env_api_filename(region=region)).store()
+    return True
+
+
+def run_concurrently(func, action: str, regions: List[str], *args) -> dict:
+    """
+    Run func(action, region, *args) for each region concurrently and return results by region.
+    Not valid terraform output (already reported) is the region's failure (None).
+    """
+    with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+        futures = {
+            region: executor.submit(func, action, region, *args) for region in regions
+        }
+    results = {}
+    for region, future in futures.items():
+        try:
+            results[region] = future.result()
+        except SystemExit:
+            results[region] = None
+    return results
+
+
+def run_regions_wrapper(
+    action: str, regions: List[str], profile: str, force: bool = False
+) -> None:
+    """
+    Run action ('plan', 'build' or 'destroy') in many regions concurrently.
+    Plans of all regions are created (and printed) first, changes are approved once and then
+    saved plans are applied - terraform runs without prompts.
+    """
+    # Backend block is set up once - all regions share terraform dir
+    init_options = setup_backend()
+    statuses = run_concurrently(
+        prepare_region, action, regions, profile, init_options, force
+    )
+    failed = [region for region, status in statuses.items() if status is None]
+    if failed:
+        print(f"{action.capitalize()} failed in regions: {', '.join(failed)}")
+        sys.exit(1)
+    to_apply = [region for region, status in statuses.items() if status != "unchanged"]
+    if action != "plan" and to_apply:
+        if not get_approval(
+            question=f"Do you want to {action} AWS resources in regions: {', '.join(to_apply)}?"
+        ):
+            print(f"{action.capitalize()} cancelled.")
+            sys.exit(1)
+        results = run_concurrently(apply_region, action, to_apply, profile)
+        failed = [region for region, succeeded in results.items() if not succeeded]
+        if failed:
+            print(f"{action.capitalize()} failed in regions: {', '.join(failed)}")
+            sys.exit(1)
+    print(f"{action.capitalize()} finished in regions: {', '.join(regions)}")
 
 
 if __name__ == "__main__":
@@ -129,8 +496,9 @@ if __name__ == "__main__":
     if not env_path:
         print(f"File {env_file} not exists!")
         sys.exit(1)
-    # Get environment variables from .env file
-    load_dotenv(env_path)
+    # Get environment variables from .env file (already set variables are not overridden)
+    for env_name, env_value in load_env_file(path=env_path).items():
+        os.environ.setdefault(env_name, env_value or "")
     # Create parent parser
     parser_parent = argparse.ArgumentParser(
         description="The script deploys AWS resources with terraform"
@@ -138,9 +506,10 @@ if __name__ == "__main__":
     # Add arguments
     parser_parent.add_argument(
         "--region",
-        default="eu-west-1",
-        type=str,
-        help="AWS region in which resources will be deployed (default: eu-west-1)",
+        default=["eu-west-1"],
+        type=lambda regions: [region for region in regions.split(",") if region],
+        help="AWS region in which resources will be deployed - comma-separated list of regions "
+        "is deployed concurrently (default: eu-west-1)",
     )
     parser_parent.add_argument(
         "--profile",
@@ -160,6 +529,11 @@ if __name__ == "__main__":
     parser_plan.set_defaults(func=plan_resources_wrapper)
     # Create parser for 'build' command
     parser_build = subparsers.add_parser(name="build", help="Build AWS environment")
+    parser_build.add_argument(
+        "--force",
+        action="store_true",
+        help="run terraform even if nothing changed since last build",
+    )
     parser_build.set_defaults(func=build_resources_wrapper)
     # Create parser for 'destroy' command
     parser_destroy = subparsers.add_parser(
@@ -172,8 +546,24 @@ if __name__ == "__main__":
     # Change dir to 'terraform'
     os.chdir("terraform")
 
-    if args.action in ["build", "plan"]:
-        func_params = {"region": args.region, "profile": args.profile}
+    if args.action in ["build", "plan", "destroy"]:
+        # Lambda zips are built once for all regions (terraform reads them in plan)
+        build_lambda_artifacts()
+
+    if args.action in ["build", "plan", "destroy"] and len(args.region) > 1:
+        # Each region in own data dir and workspace, API data stored in '.env-api-<region>' files
+        run_regions_wrapper(
+            action=args.action,
+            regions=args.region,
+            profile=args.profile,
+            force=getattr(args, "force", False),
+        )
+    elif args.action in ["build", "plan"]:
+        func_params = {
+            "region": args.region[0],
+            "profile": args.profile,
+            "force": getattr(args, "force", False),
+        }
         # Call selected action
         args.func(func_params)
     elif args.action == "destroy":
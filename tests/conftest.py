@@ -1,11 +1,25 @@
 from pytest import fixture
 from psutil import Popen, Process
+import json
+import logging
 import os
 from typing import Dict, Tuple
 
 import boto3
 from moto import mock_aws
 
+# Imported first - adds Lambda functions directory (handlers' shared module) to sys.path
+from local_stack import (
+    STAKE_TS_INDEX,
+    FakeApiServer,
+    FakeVerusRpcServer,
+    FakeVerusWallet,
+    LambdaApiServer,
+    LocalStack,
+)
+from lambda_cold_start import FakeDynamoDBServer
+import lambda_common
+from new_stake_script import check_new_stake
 from new_stake_script.check_new_stake import (
     VerusProcess,
     VerusStakeChecker,
@@ -15,6 +29,58 @@ from new_stake_script.check_new_stake import (
 )
 
 
+# Metric units allowed by CloudWatch Embedded Metric Format (EMF) specification
+EMF_UNITS = {
+    "Seconds",
+    "Microseconds",
+    "Milliseconds",
+    "Bytes",
+    "Kilobytes",
+    "Megabytes",
+    "Gigabytes",
+    "Terabytes",
+    "Bits",
+    "Kilobits",
+    "Megabits",
+    "Gigabits",
+    "Terabits",
+    "Percent",
+    "Count",
+    "Bytes/Second",
+    "Kilobytes/Second",
+    "Megabytes/Second",
+    "Gigabytes/Second",
+    "Terabytes/Second",
+    "Bits/Second",
+    "Kilobits/Second",
+    "Megabits/Second",
+    "Gigabits/Second",
+    "Terabits/Second",
+    "Count/Second",
+    "None",
+}
+
+
+def validate_emf_document(document: dict) -> None:
+    """
+    Validate document against CloudWatch Embedded Metric Format specification (AssertionError if not valid).
+    """
+    metadata = document["_aws"]
+    assert isinstance(metadata["Timestamp"], int)
+    assert metadata["CloudWatchMetrics"]
+    for directive in metadata["CloudWatchMetrics"]:
+        assert isinstance(directive["Namespace"], str) and directive["Namespace"]
+        for dimension_set in directive["Dimensions"]:
+            assert len(dimension_set) <= 30
+            for dimension in dimension_set:
+                assert isinstance(document[dimension], str)
+        assert 0 < len(directive["Metrics"]) <= 100
+        for metric in directive["Metrics"]:
+            assert metric.get("Unit", "None") in EMF_UNITS
+            value = document[metric["Name"]]
+            assert isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
 def create_dummy_processes() -> Tuple:
     """
     Create dummy 'sleep' process and dummy 'VerusProcess'.
@@ -146,9 +212,30 @@ def dynamodb(aws_credentials):
     Create mocked DynamoDB service resource.
     """
     with mock_aws():
+        # Lambda clients are cached - new clients have to be created for each mocked AWS account
+        lambda_common.get_client.cache_clear()
         yield boto3.resource("dynamodb")
 
 
+@fixture
+def throttling_dynamodb_server(monkeypatch):
+    """
+    Run local DynamoDB endpoint answering first 'throttled_requests' API calls with throttling error.
+    Lambda clients call local endpoint with 3 max attempts and retries don't sleep.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    monkeypatch.setenv("AWS_MAX_ATTEMPTS", "3")
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    with FakeDynamoDBServer() as server:
+        monkeypatch.setenv("AWS_ENDPOINT_URL_DYNAMODB", server.url)
+        lambda_common.get_client.cache_clear()
+        yield server
+    # Clients of local endpoint are not reused by other tests
+    lambda_common.get_client.cache_clear()
+
+
 @fixture
 def aws_dummy_stake_txids_table(dynamodb):
     """
@@ -157,8 +244,16 @@ def aws_dummy_stake_txids_table(dynamodb):
     table_name = "verus_stakes_txids_table_test"
     table = dynamodb.create_table(
         TableName=table_name,
-        AttributeDefinitions=[{"AttributeName": "tx_id", "AttributeType": "S"}],
-        KeySchema=[{"AttributeName": "tx_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "wallet_id", "AttributeType": "S"},
+            {"AttributeName": "tx_id", "AttributeType": "S"},
+            {"AttributeName": "stake_ts", "AttributeType": "N"},
+        ],
+        KeySchema=[
+            {"AttributeName": "wallet_id", "KeyType": "HASH"},
+            {"AttributeName": "tx_id", "KeyType": "RANGE"},
+        ],
+        GlobalSecondaryIndexes=[STAKE_TS_INDEX],
         BillingMode="PROVISIONED",
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
     )
@@ -175,8 +270,14 @@ def aws_dummy_stake_values_table(dynamodb):
     table_name = "verus_stakes_txids_table_test"
     table = dynamodb.create_table(
         TableName=table_name,
-        AttributeDefinitions=[{"AttributeName": "ts_id", "AttributeType": "S"}],
-        KeySchema=[{"AttributeName": "ts_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "wallet_id", "AttributeType": "S"},
+            {"AttributeName": "ts_id", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "wallet_id", "KeyType": "HASH"},
+            {"AttributeName": "ts_id", "KeyType": "RANGE"},
+        ],
         BillingMode="PROVISIONED",
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
     )
@@ -194,15 +295,29 @@ def aws_dummy_dynamodb_both_tables(dynamodb):
     table_values_name = "verus_stakes_values_table_test"
     table_txids = dynamodb.create_table(
         TableName=table_txids_name,
-        AttributeDefinitions=[{"AttributeName": "tx_id", "AttributeType": "S"}],
-        KeySchema=[{"AttributeName": "tx_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "wallet_id", "AttributeType": "S"},
+            {"AttributeName": "tx_id", "AttributeType": "S"},
+            {"AttributeName": "stake_ts", "AttributeType": "N"},
+        ],
+        KeySchema=[
+            {"AttributeName": "wallet_id", "KeyType": "HASH"},
+            {"AttributeName": "tx_id", "KeyType": "RANGE"},
+        ],
+        GlobalSecondaryIndexes=[STAKE_TS_INDEX],
         BillingMode="PROVISIONED",
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
     )
     table_values = dynamodb.create_table(
         TableName=table_values_name,
-        AttributeDefinitions=[{"AttributeName": "ts_id", "AttributeType": "S"}],
-        KeySchema=[{"AttributeName": "ts_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "wallet_id", "AttributeType": "S"},
+            {"AttributeName": "ts_id", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "wallet_id", "KeyType": "HASH"},
+            {"AttributeName": "ts_id", "KeyType": "RANGE"},
+        ],
         BillingMode="PROVISIONED",
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
     )
@@ -247,6 +362,45 @@ def dummy_lambda_event_post() -> dict:
     return event_post
 
 
+@fixture
+def dummy_lambda_event_get_http() -> dict:
+    """
+    Return dummy GET request data (HTTP API proxy event - payload format version 2.0).
+    """
+    event_get = {
+        "version": "2.0",
+        "routeKey": "GET /stake",
+        "rawQueryString": "year=2011&month=11",
+        "queryStringParameters": {"year": "2011", "month": "11"},
+        "requestContext": {
+            "authorizer": {"jwt": {"claims": {"client_id": "http-client"}}},
+            "http": {"method": "GET", "path": "/stake"},
+        },
+        "isBase64Encoded": False,
+    }
+    return event_get
+
+
+@fixture
+def dummy_lambda_event_post_http() -> dict:
+    """
+    Return dummy POST request data (HTTP API proxy event - payload format version 2.0).
+    """
+    event_post = {
+        "version": "2.0",
+        "routeKey": "POST /stake",
+        "body": json.dumps(
+            {"txid": "qwerty123456", "time": 1234567890, "amount": 123.123}
+        ),
+        "requestContext": {
+            "authorizer": {"jwt": {"claims": {"client_id": "http-client"}}},
+            "http": {"method": "POST", "path": "/stake"},
+        },
+        "isBase64Encoded": False,
+    }
+    return event_post
+
+
 @fixture
 def dummy_stake_txs() -> tuple:
     """
@@ -300,3 +454,143 @@ def dummy_list_txs() -> list:
         },
     ]
     return txs
+
+
+@fixture
+def fake_verus_wallet(tmp_path):
+    """
+    Run local stand-in for Verus wallet ('verusd' process and 'verus' CLI).
+    """
+    wallet = FakeVerusWallet(directory=tmp_path)
+    wallet.start()
+    yield wallet
+    wallet.stop()
+
+
+@fixture
+def fake_verus_rpc_server(fake_verus_wallet):
+    """
+    Run local stand-in for Verus daemon JSON-RPC interface (answering with local wallet stand-in data).
+    """
+    server = FakeVerusRpcServer(wallet=fake_verus_wallet)
+    server.start()
+    yield server
+    server.stop()
+
+
+@fixture
+def fake_verus_conf_file(tmp_path, fake_verus_rpc_server) -> str:
+    """
+    Create Verus daemon config file pointing to local JSON-RPC stand-in and return its absolute path.
+    """
+    conf_path = tmp_path.joinpath("VRSC.conf")
+    fake_verus_rpc_server.write_conf_file(path=conf_path)
+    return str(conf_path)
+
+
+@fixture
+def fake_api_server():
+    """
+    Run local stand-in for Cognito token endpoint and API Gateway.
+    """
+    server = FakeApiServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@fixture
+def fake_env_api_file(tmp_path, fake_api_server) -> str:
+    """
+    Create API env file pointing to local API stand-in and return its absolute path.
+    """
+    env_api_path = tmp_path.joinpath(".env-api-local")
+    fake_api_server.write_env_api_file(path=env_api_path)
+    return str(env_api_path)
+
+
+@fixture
+def lambda_api_server(aws_credentials):
+    """
+    Run local stand-in for Cognito and API Gateway with Lambda handlers (moto-backed DynamoDB and SNS).
+    """
+    server = LambdaApiServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@fixture
+def lambda_env_api_file(tmp_path, lambda_api_server) -> str:
+    """
+    Create API env file pointing to local API stand-in with Lambda handlers and return its absolute path.
+    """
+    env_api_path = tmp_path.joinpath(".env-api-lambda")
+    lambda_api_server.write_env_api_file(path=env_api_path)
+    return str(env_api_path)
+
+
+@fixture(autouse=True)
+def tmp_stake_log(tmp_path, monkeypatch):
+    """
+    Write stake checker's log file in tmp dir (instead of 'stake.log' in current dir) and return its path.
+    Used by every test - tests run in tmp dir, so no test writes files in current dir.
+    """
+    # Log file is opened relative to current dir when loggers config is loaded (on first use)
+    monkeypatch.chdir(tmp_path)
+    check_new_stake.setup_logging()
+    listener = check_new_stake.log_listener
+    handlers = listener.handlers
+    log_path = tmp_path.joinpath("stake.log")
+    file_handler = logging.FileHandler(log_path, encoding="utf8")
+    file_handler.setLevel(handlers[0].level)
+    file_handler.setFormatter(handlers[0].formatter)
+    listener.handlers = (file_handler,)
+    yield log_path
+    listener.handlers = handlers
+    file_handler.close()
+
+
+@fixture
+def local_stack(tmp_path, tmp_stake_log):
+    """
+    Run complete local stand-in stack: Verus wallet with JSON-RPC server and Cognito and API Gateway
+    with Lambda handlers (moto-backed DynamoDB and SNS).
+    """
+    stack = LocalStack(directory=tmp_path)
+    stack.start()
+    yield stack
+    stack.stop()
+
+
+@fixture
+def emf_documents(capsys):
+    """
+    Return function parsing EMF documents printed by Lambda handlers since last call
+    (each document is validated against EMF specification).
+    """
+
+    def parse() -> list:
+        documents = []
+        for line in capsys.readouterr().out.splitlines():
+            if not line.startswith("{"):
+                continue
+            document = json.loads(line)
+            if "_aws" in document:
+                validate_emf_document(document)
+                documents.append(document)
+        return documents
+
+    return parse
+
+
+@fixture
+def restore_loggers():
+    """
+    Restore handlers of custom loggers after test reconfigures them.
+    """
+    loggers = [logging.getLogger(name) for name in ["file_log", "cli_log"]]
+    handlers = {logger.name: logger.handlers[:] for logger in loggers}
+    yield
+    for logger in loggers:
+        logger.handlers = handlers[logger.name]
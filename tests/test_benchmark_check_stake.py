@@ -0,0 +1,192 @@
+from pytest import mark
+
+from new_stake_script.check_new_stake import (
+    STAKE_CONFIRMATIONS,
+    StakeTransaction,
+    StakeTransactions,
+    VerusProcess,
+    VerusStakeChecker,
+)
+
+
+STAKE_TXS_SIZES = [10, 100, 1000]
+
+
+def create_stake_txs(size: int) -> StakeTransactions:
+    """
+    Return StakeTransactions collection with 'size' stake txs added in reverse time order.
+    """
+    stake_txs = StakeTransactions()
+    for number in reversed(range(size)):
+        stake_txs.add_stake_tx(
+            StakeTransaction(
+                txid=f"tx{number:05d}",
+                time=1632750000 + number,
+                amount=12.0,
+                address="RXXX",
+            )
+        )
+    return stake_txs
+
+
+def create_stake_checker(tmp_path, env_api_file: str) -> VerusStakeChecker:
+    """
+    Return VerusStakeChecker object using tx history file in tmp dir and local API env file.
+    """
+    return VerusStakeChecker(
+        tx_hist_filename=str(tmp_path.joinpath("tx_history_bench.json")),
+        env_api_filename=env_api_file,
+    )
+
+
+@mark.parametrize("size", STAKE_TXS_SIZES)
+def test_benchmark_stake_txs_add(benchmark, size):
+    """
+    GIVEN StakeTransactions collection
+    WHEN 'size' stake txs are added to collection
+    THEN all stake txs are in collection
+    """
+    stake_txs = benchmark(create_stake_txs, size)
+    assert len(stake_txs.txs) == size
+
+
+@mark.parametrize("size", STAKE_TXS_SIZES)
+def test_benchmark_stake_txs_get_last_stake_txid(benchmark, size):
+    """
+    GIVEN StakeTransactions collection with 'size' stake txs
+    WHEN method get_last_stake_txid() is called
+    THEN most recent txid is returned
+    """
+    stake_txs = create_stake_txs(size)
+    txid_last = benchmark(stake_txs.get_last_stake_txid)
+    assert txid_last == f"tx{size - 1:05d}"
+
+
+@mark.parametrize("size", STAKE_TXS_SIZES)
+def test_benchmark_stake_txs_get_new_stakes(benchmark, size):
+    """
+    GIVEN StakeTransactions collection with 'size' stake txs
+    WHEN method get_new_stakes_txs() with txid from the middle of collection is called
+    THEN newer half of stake txs is returned
+    """
+    stake_txs = create_stake_txs(size)
+    txid_middle = f"tx{size // 2 - 1:05d}"
+    new_stake_txs = benchmark(stake_txs.get_new_stakes_txs, txid_last=txid_middle)
+    assert len(new_stake_txs) == size // 2
+
+
+def test_benchmark_create_tx_hist_file(
+    benchmark, tmp_path, fake_verus_wallet, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object
+    WHEN method _create_tx_hist_file() is called
+    THEN tx history file exists
+    """
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    benchmark(stake_checker._create_tx_hist_file)
+    assert stake_checker.tx_hist_file_path.exists()
+
+
+def test_benchmark_read_tx_hist_file(
+    benchmark, tmp_path, fake_verus_wallet, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object with existing tx history file
+    WHEN method _read_tx_hist_file() is called
+    THEN tx history file content is returned
+    """
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    content = benchmark(stake_checker._read_tx_hist_file)
+    assert content == stake_checker._initial_tx_hist_file_content
+
+
+def test_benchmark_process_discovery(benchmark, fake_verus_wallet):
+    """
+    GIVEN running 'verusd' process
+    WHEN process base directory is discovered
+    THEN wallet directory is returned
+    """
+    verus_process = VerusProcess()
+    directory = benchmark(lambda: verus_process.directory)
+    assert directory == str(fake_verus_wallet.directory)
+
+
+def test_benchmark_checker_run_no_change(
+    benchmark,
+    tmp_path,
+    tmp_stake_log,
+    fake_verus_wallet,
+    fake_api_server,
+    fake_env_api_file,
+):
+    """
+    GIVEN no new block since last check
+    WHEN VerusStakeChecker is created and run (single cron invocation)
+    THEN no stake is posted to API
+    """
+    fake_verus_wallet.add_stake(txid="tx00000", time=1632750000)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+
+    def run_checker():
+        create_stake_checker(tmp_path, fake_env_api_file).run()
+
+    benchmark.pedantic(run_checker, rounds=20, warmup_rounds=1)
+    assert fake_api_server.stakes == []
+
+
+def test_benchmark_checker_run_new_block(
+    benchmark,
+    tmp_path,
+    tmp_stake_log,
+    fake_verus_wallet,
+    fake_api_server,
+    fake_env_api_file,
+):
+    """
+    GIVEN new block without wallet's stake since last check
+    WHEN VerusStakeChecker is created and run (single cron invocation)
+    THEN no stake is posted to API
+    """
+    fake_verus_wallet.add_stake(txid="tx00000", time=1632750000)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+
+    def run_checker():
+        create_stake_checker(tmp_path, fake_env_api_file).run()
+
+    benchmark.pedantic(run_checker, setup=fake_verus_wallet.add_block, rounds=20)
+    assert fake_api_server.stakes == []
+
+
+def test_benchmark_checker_run_new_stake(
+    benchmark,
+    tmp_path,
+    tmp_stake_log,
+    fake_verus_wallet,
+    fake_api_server,
+    fake_env_api_file,
+):
+    """
+    GIVEN wallet with a new confirmed stake since last check
+    WHEN VerusStakeChecker is created and run (single cron invocation)
+    THEN new stake is posted to API
+    """
+    fake_verus_wallet.add_stake(txid="tx00000", time=1632750000)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+    stakes_number = iter(range(1, 1000))
+    txids = []
+
+    def add_stake():
+        number = next(stakes_number)
+        txids.append(f"tx{number:05d}")
+        fake_verus_wallet.add_stake(txid=txids[-1], time=1632750000 + number)
+        # Stake is posted after required number of confirmations
+        fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS - 1)
+        fake_api_server.stakes = []
+
+    def run_checker():
+        create_stake_checker(tmp_path, fake_env_api_file).run()
+        # Number of rounds depends on benchmark options - each round posts its own stake
+        assert [stake["txid"] for stake in fake_api_server.stakes] == [txids[-1]]
+
+    benchmark.pedantic(run_checker, setup=add_stake, rounds=20)
@@ -0,0 +1,28 @@
+from new_stake_script.check_new_stake import STAKE_CONFIRMATIONS
+
+
+def test_benchmark_end_to_end_detection_to_persist(benchmark, local_stack):
+    """
+    GIVEN local stand-in stack and wallet with a new confirmed stake since last check
+    WHEN VerusStakeChecker is created and run (single cron invocation)
+    THEN stake is detected via Verus JSON-RPC and persisted in DynamoDB by Lambda handler
+    """
+    local_stack.wallet.add_stake(txid="tx00000", time=1632750000)
+    local_stack.create_stake_checker().run()
+    stakes_number = iter(range(1, 1000))
+    txids = []
+
+    def add_stake():
+        number = next(stakes_number)
+        txids.append(f"tx{number:05d}")
+        local_stack.wallet.add_stake(txid=txids[-1], time=1632750000 + number)
+        local_stack.wallet.add_blocks(STAKE_CONFIRMATIONS - 1)
+        local_stack.api_server.persisted_at.clear()
+
+    def run_checker():
+        local_stack.create_stake_checker().run()
+        # Number of rounds depends on benchmark options - each round persists its own stake
+        assert list(local_stack.api_server.persisted_at) == [txids[-1]]
+
+    benchmark.pedantic(run_checker, setup=add_stake, rounds=10)
+    assert local_stack.api_server.lambda_errors == []
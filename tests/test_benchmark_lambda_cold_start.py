@@ -0,0 +1,28 @@
+from pytest import fixture, mark
+
+from lambda_cold_start import FakeDynamoDBServer, run_cold_start
+
+
+@fixture(scope="module")
+def fake_dynamodb_server():
+    """
+    Run local DynamoDB endpoint answering each API call with empty response.
+    """
+    with FakeDynamoDBServer() as server:
+        yield server
+
+
+@mark.parametrize("name", ["get", "post"])
+def test_benchmark_lambda_cold_start(benchmark, fake_dynamodb_server, name):
+    """
+    GIVEN Lambda module not imported yet (fresh interpreter)
+    WHEN module is imported and its handler is invoked for the first time
+    THEN boto3 and its resource model layer are not loaded
+    """
+    stats = benchmark.pedantic(
+        run_cold_start, args=(name, fake_dynamodb_server.url), rounds=5
+    )
+    benchmark.extra_info["import_ms"] = stats["import_ms"]
+    benchmark.extra_info["first_invocation_ms"] = stats["first_invocation_ms"]
+    assert "botocore.client" in stats["modules"]
+    assert "boto3" not in stats["modules"]
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# The new_stake_script directory is deployed standalone - its modules use flat imports
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent.joinpath("new_stake_script"))
+)
+from stake_analytics import StakeHistory, summarize  # noqa: E402
+
+WALLETS = 36
+YEARS = 3
+STAKES_PER_DAY = 4
+START = 1609459200
+
+
+def create_stake_history() -> StakeHistory:
+    """
+    Return random stake history of WALLETS wallets over YEARS years.
+    """
+    rng = np.random.default_rng(seed=1)
+    size = WALLETS * YEARS * 365 * STAKES_PER_DAY
+    return StakeHistory(
+        wallets=np.array([f"wallet-{number:02d}" for number in range(WALLETS)]),
+        wallet_idx=rng.integers(0, WALLETS, size=size),
+        times=rng.integers(START, START + YEARS * 365 * 86400, size=size),
+        amounts=rng.uniform(1, 24, size=size),
+    )
+
+
+def test_benchmark_stake_analytics_summarize(benchmark):
+    """
+    GIVEN stake history of dozens of wallets over years
+    WHEN summarize() func is invoked over whole history
+    THEN summary of all wallets is returned
+    """
+    history = create_stake_history()
+    summary = benchmark(
+        summarize,
+        history=history,
+        start=START,
+        end=START + YEARS * 365 * 86400 - 1,
+        eligible_balances={str(wallet): 1000.0 for wallet in history.wallets},
+        stake_supply=1e7,
+    )
+    benchmark.extra_info["stakes"] = len(history.times)
+    assert len(summary["wallets"]) == WALLETS
@@ -0,0 +1,109 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent.joinpath("new_stake_script")
+# Modules needed only when new stake has to be uploaded
+HEAVY_MODULES = ["requests", "urllib3", "dotenv", "logging.config"]
+
+# Single cron invocation without new stake - run in a fresh interpreter
+NO_CHANGE_RUN_CODE = r"""
+import json, re, sys, time
+start = time.perf_counter()
+{eager_imports}
+from check_new_stake import VerusStakeChecker
+VerusStakeChecker(tx_hist_filename=sys.argv[1], env_api_filename=sys.argv[2]).run()
+wall_time = time.perf_counter() - start
+# Peak RSS of this interpreter only (ru_maxrss would include the parent's peak inherited on exec)
+with open("/proc/self/status") as file:
+    max_rss_kb = int(re.search(r"VmHWM:\s+(\d+)", file.read()).group(1))
+print(json.dumps({{
+    "wall_time": wall_time,
+    "max_rss_kb": max_rss_kb,
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Return cumulative import time (us) of each module from '-X importtime' output.
+    """
+    import_times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        import_times[module.strip()] = int(cumulative)
+    return import_times
+
+
+def run_no_change_check(tmp_path, env_api_file: str, eager_imports: str = "") -> Dict:
+    """
+    Run stake checker without new stake in a fresh interpreter and return its stats.
+    """
+    code = NO_CHANGE_RUN_CODE.format(eager_imports=eager_imports)
+    tx_hist_file = str(tmp_path.joinpath("tx_history_startup.json"))
+    response = subprocess.run(
+        args=[sys.executable, "-c", code, tx_hist_file, env_api_file],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(response.stdout)
+
+
+def test_benchmark_startup_importtime(benchmark):
+    """
+    GIVEN check_new_stake module
+    WHEN module is imported in a fresh interpreter with '-X importtime'
+    THEN HTTP, dotenv and logging config modules are not imported
+    """
+
+    def import_module() -> Dict[str, int]:
+        response = subprocess.run(
+            args=[sys.executable, "-X", "importtime", "-c", "import check_new_stake"],
+            cwd=SCRIPT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return parse_importtime(response.stderr)
+
+    import_times = benchmark.pedantic(import_module, rounds=5)
+    benchmark.extra_info["import_time_us"] = import_times["check_new_stake"]
+    for module in HEAVY_MODULES:
+        assert module not in import_times
+
+
+def test_benchmark_startup_no_change_run(
+    benchmark, tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN wallet without new transactions since last check
+    WHEN stake checker is run in a fresh interpreter
+    THEN heavy modules are not loaded and run uses less memory than with eager imports
+    """
+    fake_verus_wallet.add_stake(txid="tx00000", time=1632750000)
+    # First run stores current txcount - next runs take the no-change path
+    run_no_change_check(tmp_path, fake_env_api_file)
+    stats = benchmark.pedantic(
+        run_no_change_check, args=(tmp_path, fake_env_api_file), rounds=5
+    )
+    stats_eager = run_no_change_check(
+        tmp_path,
+        fake_env_api_file,
+        eager_imports="import requests, dotenv, logging.config",
+    )
+    benchmark.extra_info["wall_time"] = stats["wall_time"]
+    benchmark.extra_info["wall_time_eager_imports"] = stats_eager["wall_time"]
+    benchmark.extra_info["max_rss_kb"] = stats["max_rss_kb"]
+    benchmark.extra_info["max_rss_kb_eager_imports"] = stats_eager["max_rss_kb"]
+    for module in HEAVY_MODULES:
+        assert module not in stats["modules"]
+    assert stats["max_rss_kb"] < stats_eager["max_rss_kb"]
+    assert fake_api_server.stakes == []
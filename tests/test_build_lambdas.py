@@ -0,0 +1,96 @@
+import re
+import zipfile
+from pathlib import Path
+
+from build_lambdas import (
+    LAMBDA_MODULES,
+    LAMBDA_SHARED_MODULES,
+    LAMBDA_RUNTIME,
+    ZIP_DATE_TIME,
+    build_artifacts,
+    get_runtime_python,
+)
+
+
+def test_build_artifacts_deterministic(tmp_path):
+    """
+    GIVEN Lambda sources
+    WHEN artifacts are built twice in different dirs
+    THEN artifacts and their hashes are identical
+    """
+    report_first = build_artifacts(output_dir=tmp_path.joinpath("first"))
+    report_second = build_artifacts(output_dir=tmp_path.joinpath("second"))
+    for module in LAMBDA_MODULES:
+        assert (
+            report_first[module]["base64sha256"]
+            == report_second[module]["base64sha256"]
+        )
+        assert (
+            Path(report_first[module]["path"]).read_bytes()
+            == Path(report_second[module]["path"]).read_bytes()
+        )
+
+
+def test_build_artifacts_up_to_date(tmp_path):
+    """
+    GIVEN already built artifacts
+    WHEN artifacts are built again from the same sources
+    THEN artifacts are not rewritten
+    """
+    build_artifacts(output_dir=tmp_path)
+    report = build_artifacts(output_dir=tmp_path)
+    assert not any(artifact["updated"] for artifact in report.values())
+
+
+def test_build_artifacts_content(tmp_path):
+    """
+    GIVEN Lambda sources
+    WHEN artifacts are built
+    THEN each artifact holds only its module, shared modules and their unchecked hash-based bytecode
+    with fixed timestamps
+    """
+    report = build_artifacts(output_dir=tmp_path)
+    for module in LAMBDA_MODULES:
+        with zipfile.ZipFile(report[module]["path"]) as zip_file:
+            infos = zip_file.infolist()
+            artifact_modules = [module, *LAMBDA_SHARED_MODULES]
+            pyc_names = [
+                f"__pycache__/{name}.cpython-311.pyc" for name in artifact_modules
+            ]
+            assert [info.filename for info in infos] == sorted(
+                pyc_names + [f"{name}.py" for name in artifact_modules]
+            )
+            assert all(info.date_time == ZIP_DATE_TIME for info in infos)
+            for pyc_name in pyc_names:
+                # pyc header flags: hash-based (bit 0) without source check (bit 1)
+                assert zip_file.read(pyc_name)[4:8] == (1).to_bytes(4, "little")
+        assert report[module]["bytecode"] is True
+
+
+def test_build_artifacts_import_time(tmp_path):
+    """
+    GIVEN Lambda sources
+    WHEN artifacts are built with cold-start measurement
+    THEN size and import time of each artifact are reported
+    """
+    report = build_artifacts(output_dir=tmp_path, rounds=1)
+    for module in LAMBDA_MODULES:
+        assert (
+            report[module]["size_bytes"]
+            == tmp_path.joinpath(f"{module}_payload.zip").stat().st_size
+        )
+        assert report[module]["import_ms"] > 0
+
+
+def test_lambda_runtime():
+    """
+    GIVEN Lambda functions defined in terraform files
+    WHEN their runtime is compared with artifacts' runtime
+    THEN runtimes are the same and interpreter matching runtime is found
+    """
+    lambda_tf = (
+        Path(__file__).resolve().parent.parent.joinpath("terraform", "lambda.tf")
+    )
+    runtimes = set(re.findall(r'runtime\s*=\s*"(.+)"', lambda_tf.read_text()))
+    assert runtimes == {LAMBDA_RUNTIME}
+    assert get_runtime_python() is not None
@@ -0,0 +1,155 @@
+import csv
+import gzip
+import sys
+from pathlib import Path
+
+# The new_stake_script directory is deployed standalone - its modules use flat imports
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent.joinpath("new_stake_script"))
+)
+from call_aws_api import EXPORT_OVERLAP_SECONDS, ApiCall, get_time_window  # noqa: E402
+
+
+def post_stakes(api_call: ApiCall, stakes: list) -> None:
+    """
+    Post stakes ('txid', 'time', 'amount') to API.
+    """
+    for stake in stakes:
+        api_call.api.call(method="post", data=stake)
+
+
+def read_export_file(path: Path) -> list:
+    """
+    Return rows of gzip'd CSV export file (all gzip members).
+    """
+    with gzip.open(path, mode="rt", newline="") as file:
+        return list(csv.reader(file))
+
+
+def test_get_time_window_month():
+    """
+    GIVEN validated date with year and month (December)
+    WHEN get_time_window() func is invoked
+    THEN time window covers the whole month
+    """
+    time_window = get_time_window(date={"year": "2021", "month": "12"})
+    assert time_window == {"from": 1638316800, "to": 1640995199}
+
+
+def test_get_time_window_year():
+    """
+    GIVEN validated date with year only
+    WHEN get_time_window() func is invoked
+    THEN time window covers the whole year
+    """
+    time_window = get_time_window(date={"year": "2021"})
+    assert time_window == {"from": 1609459200, "to": 1640995199}
+
+
+def test_list_stakes(lambda_env_api_file):
+    """
+    GIVEN stakes posted to local API
+    WHEN ApiCall's list_stakes() method is invoked with small page size
+    THEN all stakes are streamed through pages newest first
+    """
+    api_call = ApiCall(env_api_filename=lambda_env_api_file)
+    stakes = [
+        {"txid": f"tx{number}", "time": 1000 + number, "amount": 1.5}
+        for number in range(5)
+    ]
+    post_stakes(api_call, stakes)
+    listed = list(api_call.list_stakes(time_window={}, limit=2))
+    assert [stake["txid"] for stake in listed] == ["tx4", "tx3", "tx2", "tx1", "tx0"]
+
+
+def test_export_stakes_incremental(lambda_env_api_file, tmp_path):
+    """
+    GIVEN exported stakes and new stakes posted to local API (one with the same time as the last exported)
+    WHEN ApiCall's export_stakes() method is invoked with 'incremental'
+    THEN only new stakes are appended to export file (oldest first)
+    """
+    api_call = ApiCall(env_api_filename=lambda_env_api_file)
+    output_path = tmp_path.joinpath("stakes.csv.gz")
+    post_stakes(
+        api_call,
+        [
+            {"txid": f"tx{number}", "time": 1000 + number, "amount": 1.5}
+            for number in range(3)
+        ],
+    )
+    exported_count = api_call.export_stakes(
+        output_filename=str(output_path), time_window={}
+    )
+    post_stakes(
+        api_call,
+        [
+            {"txid": "tx2-same-time", "time": 1002, "amount": 2.0},
+            {"txid": "tx3", "time": 1003, "amount": 3.0},
+        ],
+    )
+    exported_count_incremental = api_call.export_stakes(
+        output_filename=str(output_path), time_window={}, incremental=True
+    )
+    rows = read_export_file(output_path)
+    assert exported_count == 3
+    assert exported_count_incremental == 2
+    assert rows[0] == ["txid", "time", "date_utc", "amount"]
+    assert [row[0] for row in rows[1:]] == ["tx0", "tx1", "tx2", "tx2-same-time", "tx3"]
+    assert rows[-1] == ["tx3", "1003", "1970-01-01T00:16:43+00:00", "3.0"]
+
+
+def test_export_stakes_incremental_late_stakes(lambda_env_api_file, tmp_path):
+    """
+    GIVEN exported stakes and stakes older than the last exported posted later to local API
+    WHEN ApiCall's export_stakes() method is invoked with 'incremental'
+    THEN late stakes within overlap window are appended to export file once - older ones are not
+    """
+    api_call = ApiCall(env_api_filename=lambda_env_api_file)
+    output_path = tmp_path.joinpath("stakes.csv.gz")
+    last_time = 2 * EXPORT_OVERLAP_SECONDS
+    post_stakes(
+        api_call,
+        [
+            {"txid": "tx0", "time": last_time - 10, "amount": 1.5},
+            {"txid": "tx1", "time": last_time, "amount": 1.5},
+        ],
+    )
+    api_call.export_stakes(output_filename=str(output_path), time_window={})
+    post_stakes(
+        api_call,
+        [
+            {"txid": "tx-late", "time": last_time - 5, "amount": 2.0},
+            {
+                "txid": "tx-too-late",
+                "time": last_time - EXPORT_OVERLAP_SECONDS - 1,
+                "amount": 2.0,
+            },
+        ],
+    )
+    exported_counts = [
+        api_call.export_stakes(
+            output_filename=str(output_path), time_window={}, incremental=True
+        )
+        for _ in range(2)
+    ]
+    rows = read_export_file(output_path)
+    assert exported_counts == [1, 0]
+    assert [row[0] for row in rows[1:]] == ["tx0", "tx1", "tx-late"]
+
+
+def test_export_stakes_incremental_no_new_stakes(lambda_env_api_file, tmp_path):
+    """
+    GIVEN exported stakes without new stakes posted to local API
+    WHEN ApiCall's export_stakes() method is invoked with 'incremental'
+    THEN no stakes are exported and export file is not changed
+    """
+    api_call = ApiCall(env_api_filename=lambda_env_api_file)
+    output_path = tmp_path.joinpath("stakes.csv.gz")
+    post_stakes(api_call, [{"txid": "tx0", "time": 1000, "amount": 1.5}])
+    api_call.export_stakes(output_filename=str(output_path), time_window={})
+    content = output_path.read_bytes()
+    exported_count = api_call.export_stakes(
+        output_filename=str(output_path), time_window={}, incremental=True
+    )
+    assert exported_count == 0
+    assert output_path.read_bytes() == content
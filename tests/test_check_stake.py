@@ -1,12 +1,27 @@
+import json
+import logging
 import os
+import time
 from pathlib import Path
 from unittest import mock
 
+import pytest
+
 from new_stake_script.check_new_stake import (
+    STAKE_CONFIRMATIONS,
+    STAKE_MATURITY,
+    ApiCallError,
     StakeTransaction,
     StakeTransactions,
+    VerusRpc,
     VerusStakeChecker,
+    configure_logging,
+    get_tx_confirmations,
+    load_config_file,
+    parse_env_file,
+    set_log_cycle_id,
 )
+from new_stake_script import check_new_stake
 
 
 def test_process_exist(dummy_process):
@@ -150,6 +165,10 @@ def test_verus_state_checker_run_new_stake(
     verus_stake_checker.wallet_info = dummy_wallet_no_stake
     # Mock _process_call() method
     mocker.patch.object(VerusStakeChecker, "_process_call", return_value=dummy_list_txs)
+    # New stake comes with new block - chain tip changes between runs
+    mocker.patch.object(
+        VerusStakeChecker, "_get_best_block_hash", side_effect=["hash-1", "hash-2"]
+    )
     # First run - after first run txcounts should have the same values
     verus_stake_checker.run()
     txcont_last_first_run = verus_stake_checker.txcount_hist
@@ -163,6 +182,495 @@ def test_verus_state_checker_run_new_stake(
     assert verus_stake_checker.txcount_current != txcount_current_first_run
 
 
+def test_verus_state_checker_run_chain_tip_not_changed(
+    mocker, verus_stake_checker, dummy_tx_hist_file_content
+):
+    """
+    GIVEN VerusStakeChecker object
+    WHEN created VerusStakeChecker with chain tip equal to the one stored in tx history file
+    THEN wallet info is not fetched from Verus process api
+    """
+    dummy_tx_hist_file_content["bestblockhash_previous"] = "hash-1"
+    mocker.patch.object(
+        VerusStakeChecker, "_get_best_block_hash", return_value="hash-1"
+    )
+    mocked_wallet_info = mocker.patch.object(VerusStakeChecker, "_get_wallet_info")
+    verus_stake_checker.run()
+    mocked_wallet_info.assert_not_called()
+
+
+def test_verus_state_checker_run_chain_tip_changed(
+    mocker, verus_stake_checker, dummy_tx_hist_file_content, dummy_wallet_no_stake
+):
+    """
+    GIVEN VerusStakeChecker object
+    WHEN created VerusStakeChecker with chain tip different from the one stored in tx history file
+    THEN wallet info is fetched from Verus process api and new chain tip is stored
+    """
+    dummy_tx_hist_file_content["bestblockhash_previous"] = "hash-1"
+    mocker.patch.object(
+        VerusStakeChecker, "_get_best_block_hash", return_value="hash-2"
+    )
+    mocked_wallet_info = mocker.patch.object(
+        VerusStakeChecker, "_get_wallet_info", return_value=dummy_wallet_no_stake
+    )
+    mocker.patch.object(VerusStakeChecker, "_process_call", return_value=[])
+    verus_stake_checker.run()
+    mocked_wallet_info.assert_called_once()
+    assert verus_stake_checker._best_block_hash_hist == "hash-2"
+
+
+def create_stake_checker(tmp_path, env_api_file: str) -> VerusStakeChecker:
+    """
+    Return VerusStakeChecker object using tx history file in tmp dir (Verus JSON-RPC not configured).
+    """
+    return VerusStakeChecker(
+        tx_hist_filename=str(tmp_path.joinpath("tx_history_test.json")),
+        env_api_filename=env_api_file,
+        verus_conf_path=tmp_path.joinpath("VRSC.conf"),
+    )
+
+
+def create_stake_checker_with_new_stakes(
+    tmp_path, fake_verus_wallet, env_api_file: str, stakes_number: int
+) -> VerusStakeChecker:
+    """
+    Return VerusStakeChecker object after first run and add 'stakes_number' new confirmed stakes to wallet.
+    """
+    fake_verus_wallet.add_stake(txid="tx00", time=1632750000)
+    create_stake_checker(tmp_path, env_api_file).run()
+    for number in range(1, stakes_number + 1):
+        fake_verus_wallet.add_stake(txid=f"tx{number:02d}", time=1632750000 + number)
+    fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS)
+    return create_stake_checker(tmp_path, env_api_file)
+
+
+def test_verus_state_checker_run_many_new_stakes(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object with several new confirmed stakes in wallet
+    WHEN VerusStakeChecker is run
+    THEN all new stakes are posted concurrently with single access token and most recent stake txid is stored
+    """
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=10
+    )
+    stake_checker.run()
+    assert sorted(stake["txid"] for stake in fake_api_server.stakes) == [
+        f"tx{number:02d}" for number in range(1, 11)
+    ]
+    assert fake_api_server.token_requests == 1
+    assert stake_checker.tx_hist_data["txid_stake_previous"] == "tx10"
+    assert stake_checker.txcount_hist == stake_checker.txcount_current
+
+
+def test_verus_state_checker_run_stake_detection_time(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object with new confirmed stake in wallet
+    WHEN VerusStakeChecker is run
+    THEN stake is posted with time it was detected by checker
+    """
+    time_before = int(time.time())
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=1
+    )
+    stake_checker.run()
+    assert fake_api_server.stakes[0]["detected_at"] >= time_before
+
+
+def test_verus_state_checker_run_stake_address(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object with new confirmed stake in wallet
+    WHEN VerusStakeChecker is run
+    THEN stake is posted with its staking address
+    """
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=1
+    )
+    stake_checker.run()
+    assert fake_api_server.stakes[0]["address"] == "RXXX"
+
+
+def test_verus_state_checker_run_new_stakes_partly_posted(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object with several new confirmed stakes in wallet and API rejecting one of them
+    WHEN VerusStakeChecker is run twice (API error fixed before second run)
+    THEN not posted stake stays pending and only this stake is posted on second run
+    """
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=5
+    )
+    fake_api_server.fail_txids = {"tx03"}
+    stake_checker.run()
+    assert stake_checker.tx_hist_data["txid_stake_previous"] == "tx05"
+    assert stake_checker.pending_stakes["tx03"]["posted"] is False
+    assert len(fake_api_server.stakes) == 4
+    # Second run - only not posted stake is posted again
+    fake_api_server.fail_txids = set()
+    fake_api_server.stakes = []
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    stake_checker.run()
+    assert [stake["txid"] for stake in fake_api_server.stakes] == ["tx03"]
+    assert all(stake["posted"] for stake in stake_checker.pending_stakes.values())
+
+
+def test_verus_state_checker_run_stake_not_confirmed(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object and new stake with less than required confirmations
+    WHEN VerusStakeChecker is run before and after stake gets required confirmations
+    THEN stake is posted only after required confirmations
+    """
+    fake_verus_wallet.add_stake(txid="tx00", time=1632750000)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+    fake_verus_wallet.add_stake(txid="tx01", time=1632750001)
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    stake_checker.run()
+    assert fake_api_server.stakes == []
+    assert stake_checker.pending_stakes["tx01"]["confirmations"] == 1
+    fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS - 1)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+    assert [stake["txid"] for stake in fake_api_server.stakes] == ["tx01"]
+
+
+def test_verus_state_checker_run_stake_orphaned_before_posting(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object and new stake orphaned before required confirmations
+    WHEN VerusStakeChecker is run
+    THEN stake is not posted and no longer tracked
+    """
+    fake_verus_wallet.add_stake(txid="tx00", time=1632750000)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+    fake_verus_wallet.add_stake(txid="tx01", time=1632750001)
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+    fake_verus_wallet.orphan_stake(txid="tx01")
+    fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS)
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    stake_checker.run()
+    assert fake_api_server.stakes == []
+    assert fake_api_server.removed_txids == []
+    assert stake_checker.pending_stakes == {}
+
+
+def test_verus_state_checker_run_posted_stake_orphaned(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object and posted stake orphaned before maturity
+    WHEN VerusStakeChecker is run
+    THEN stake is removed from API and no longer tracked
+    """
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=2
+    )
+    stake_checker.run()
+    fake_verus_wallet.orphan_stake(txid="tx02")
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    stake_checker.run()
+    assert fake_api_server.removed_txids == ["tx02"]
+    assert [stake["txid"] for stake in fake_api_server.stakes] == ["tx01"]
+    assert list(stake_checker.pending_stakes) == ["tx01"]
+
+
+def test_verus_state_checker_run_stake_stats(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object with two new confirmed stakes in wallet
+    WHEN VerusStakeChecker is run before and after one of posted stakes is orphaned
+    THEN stake stats of posted stakes are updated and stored in tx history file
+    """
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=2
+    )
+    stake_checker.run()
+    assert stake_checker.stake_stats.get_period("2021-09")["stakes_count"] == 2
+    fake_verus_wallet.orphan_stake(txid="tx02")
+    create_stake_checker(tmp_path, fake_env_api_file).run()
+    stake_stats = create_stake_checker(tmp_path, fake_env_api_file).stake_stats
+    assert stake_stats.to_dict() == {
+        "2021-09": [12.0, 1],
+        "2021": [12.0, 1],
+        "2021-09#RXXX": [12.0, 1],
+        "2021#RXXX": [12.0, 1],
+        "all": [12.0, 1],
+    }
+
+
+def test_verus_state_checker_run_posted_stake_matured(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN VerusStakeChecker object and posted stake
+    WHEN VerusStakeChecker is run after stake matures
+    THEN stake is no longer tracked
+    """
+    stake_checker = create_stake_checker_with_new_stakes(
+        tmp_path, fake_verus_wallet, fake_env_api_file, stakes_number=1
+    )
+    stake_checker.run()
+    assert list(stake_checker.pending_stakes) == ["tx01"]
+    fake_verus_wallet.add_blocks(STAKE_MATURITY)
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    stake_checker.run()
+    assert stake_checker.pending_stakes == {}
+
+
+LOGGING_CONF_TEST = """
+[loggers]
+keys=root,file_log,cli_log
+
+[handlers]
+keys=file_hand,cli_hand
+
+[formatters]
+keys=log_format
+
+[logger_root]
+level=INFO
+handlers=cli_hand
+
+[logger_file_log]
+handlers=file_hand
+qualname=file_log
+propagate=0
+
+[logger_cli_log]
+handlers=cli_hand
+qualname=cli_log
+propagate=0
+
+[handler_file_hand]
+class=logging.handlers.RotatingFileHandler
+level=INFO
+formatter=log_format
+args=('{log_path}', 'a', 400, 2, 'utf8')
+
+[handler_cli_hand]
+class=logging.StreamHandler
+level=INFO
+formatter=log_format
+args=(sys.stdout,)
+
+[formatter_log_format]
+format=%(asctime)s - %(message)s
+"""
+
+
+def test_configure_logging_json_lines_rotation(tmp_path, restore_loggers):
+    """
+    GIVEN loggers config with rotating file handler
+    WHEN file logger is used after configure_logging() func with 'json' format is invoked
+    THEN records are written by queue listener as JSON lines with cycle id and log file is rotated
+    """
+    log_path = tmp_path.joinpath("stake.log")
+    conf_path = tmp_path.joinpath("logging.conf")
+    conf_path.write_text(LOGGING_CONF_TEST.format(log_path=log_path))
+    listener = configure_logging(conf_path=conf_path, log_format="json")
+    set_log_cycle_id("cycle-01")
+    for number in range(10):
+        logging.getLogger("file_log").info(f"New stake in wallet {number}")
+    # Queued records are written when listener is stopped
+    listener.stop()
+    assert tmp_path.joinpath("stake.log.1").exists()
+    assert not tmp_path.joinpath("stake.log.3").exists()
+    entry = json.loads(log_path.read_text().splitlines()[-1])
+    assert entry["message"] == "New stake in wallet 9"
+    assert entry["cycle_id"] == "cycle-01"
+    assert entry["level"] == "INFO"
+
+
+def test_configure_logging_keeps_cycle_id_of_queued_record(tmp_path, restore_loggers):
+    """
+    GIVEN file log record queued under cycle id 'cycle-A'
+    WHEN cycle id changes to 'cycle-B' before queue listener writes the record
+    THEN record is written with cycle id 'cycle-A'
+    """
+    log_path = tmp_path.joinpath("stake.log")
+    conf_path = tmp_path.joinpath("logging.conf")
+    conf_path.write_text(LOGGING_CONF_TEST.format(log_path=log_path))
+    listener = configure_logging(conf_path=conf_path, log_format="json")
+    # Records stay queued until listener is started again
+    listener.stop()
+    set_log_cycle_id("cycle-A")
+    logging.getLogger("file_log").info("New stake in wallet")
+    set_log_cycle_id("cycle-B")
+    listener.start()
+    listener.stop()
+    entry = json.loads(log_path.read_text().splitlines()[-1])
+    assert entry["cycle_id"] == "cycle-A"
+
+
+def test_configure_logging_text_format(tmp_path, restore_loggers):
+    """
+    GIVEN loggers config with rotating file handler
+    WHEN file logger is used after configure_logging() func with default format is invoked
+    THEN records are written with formatter from loggers config
+    """
+    log_path = tmp_path.joinpath("stake.log")
+    conf_path = tmp_path.joinpath("logging.conf")
+    conf_path.write_text(LOGGING_CONF_TEST.format(log_path=log_path))
+    listener = configure_logging(conf_path=conf_path)
+    logging.getLogger("file_log").error("Stake tx01 not posted to API")
+    listener.stop()
+    assert log_path.read_text().endswith(" - Stake tx01 not posted to API\n")
+
+
+def test_verus_stake_checker_run_sets_cycle_id(
+    tmp_path, fake_verus_wallet, fake_env_api_file
+):
+    """
+    GIVEN two VerusStakeChecker objects
+    WHEN VerusStakeChecker is run
+    THEN each checker has own cycle id which is set as current log cycle id
+    """
+    stake_checker = create_stake_checker(tmp_path, fake_env_api_file)
+    assert (
+        stake_checker.cycle_id
+        != create_stake_checker(tmp_path, fake_env_api_file).cycle_id
+    )
+    stake_checker.run()
+    assert check_new_stake.log_cycle_id == stake_checker.cycle_id
+
+
+def test_get_tx_confirmations():
+    """
+    GIVEN 'gettransaction' responses of confirmed and orphaned txs
+    WHEN get_tx_confirmations() func is invoked
+    THEN number of confirmations or -1 (orphaned tx) is returned
+    """
+    assert get_tx_confirmations({"confirmations": 5, "category": "mint"}) == 5
+    assert get_tx_confirmations({"confirmations": 0, "category": "orphan"}) == -1
+    assert (
+        get_tx_confirmations({"confirmations": 0, "details": [{"category": "orphan"}]})
+        == -1
+    )
+
+
+def test_verus_rpc_batch(
+    fake_verus_wallet, fake_verus_rpc_server, fake_verus_conf_file
+):
+    """
+    GIVEN VerusRpc object configured with Verus daemon config file
+    WHEN invoked batch() method with known and not known txids
+    THEN (result, error) of each call is returned with single JSON-RPC request
+    """
+    fake_verus_wallet.add_stake(txid="tx01", time=1632750001)
+    verus_rpc = VerusRpc(conf_path=fake_verus_conf_file)
+    responses = verus_rpc.batch(
+        method="gettransaction", params_list=[["tx01"], ["tx99"]]
+    )
+    assert responses[0][0]["txid"] == "tx01"
+    assert responses[0][0]["confirmations"] == 1
+    assert responses[1] == (
+        None,
+        {"code": -5, "message": "Invalid or non-wallet transaction id"},
+    )
+    assert fake_verus_rpc_server.requests == 1
+
+
+def test_verus_state_checker_run_confirmations_json_rpc(
+    tmp_path,
+    fake_verus_wallet,
+    fake_api_server,
+    fake_env_api_file,
+    fake_verus_rpc_server,
+    fake_verus_conf_file,
+):
+    """
+    GIVEN VerusStakeChecker object configured with Verus daemon JSON-RPC and several new confirmed stakes
+    WHEN VerusStakeChecker is run
+    THEN confirmations of all stakes are fetched with single JSON-RPC request and stakes are posted
+    """
+    fake_verus_wallet.add_stake(txid="tx00", time=1632750000)
+    VerusStakeChecker(
+        tx_hist_filename=str(tmp_path.joinpath("tx_history_test.json")),
+        env_api_filename=fake_env_api_file,
+        verus_conf_path=fake_verus_conf_file,
+    ).run()
+    for number in range(1, 6):
+        fake_verus_wallet.add_stake(txid=f"tx{number:02d}", time=1632750000 + number)
+    fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS)
+    fake_verus_rpc_server.requests = 0
+    VerusStakeChecker(
+        tx_hist_filename=str(tmp_path.joinpath("tx_history_test.json")),
+        env_api_filename=fake_env_api_file,
+        verus_conf_path=fake_verus_conf_file,
+    ).run()
+    assert len(fake_api_server.stakes) == 5
+    assert fake_verus_rpc_server.requests == 1
+    assert fake_verus_rpc_server.calls == 5
+
+
+def test_verus_rpc_batch_not_configured(tmp_path):
+    """
+    GIVEN VerusRpc object without Verus daemon config file
+    WHEN invoked batch() method
+    THEN None is returned (JSON-RPC not available)
+    """
+    verus_rpc = VerusRpc(conf_path=tmp_path.joinpath("VRSC.conf"))
+    assert verus_rpc.batch(method="gettransaction", params_list=[["tx01"]]) is None
+
+
+def test_load_config_file_cached(mocker, tmp_path):
+    """
+    GIVEN env file
+    WHEN env file is loaded several times without changes
+    THEN env file is parsed once and callers get copies of parsed config
+    """
+    env_path = tmp_path.joinpath(".env-api")
+    env_path.write_text("NOTIFICATION_API_URL='https://example.com'\n")
+    parser = mocker.Mock(side_effect=parse_env_file)
+    config = load_config_file(path=env_path, parser=parser)
+    config["NOTIFICATION_API_URL"] = "changed"
+    assert load_config_file(path=env_path, parser=parser) == {
+        "NOTIFICATION_API_URL": "https://example.com"
+    }
+    assert parser.call_count == 1
+
+
+def test_load_config_file_changed(mocker, tmp_path):
+    """
+    GIVEN loaded env file
+    WHEN env file is replaced with new content
+    THEN env file is parsed again
+    """
+    env_path = tmp_path.joinpath(".env-api")
+    env_path.write_text("WALLET_ID='wallet-1'\n")
+    parser = mocker.Mock(side_effect=parse_env_file)
+    load_config_file(path=env_path, parser=parser)
+    new_env_path = tmp_path.joinpath(".env-api.tmp")
+    new_env_path.write_text("WALLET_ID='wallet-22'\n")
+    os.replace(new_env_path, env_path)
+    assert load_config_file(path=env_path, parser=parser) == {"WALLET_ID": "wallet-22"}
+    assert parser.call_count == 2
+
+
+def test_verus_rpc_conf_cached(mocker, tmp_path):
+    """
+    GIVEN VerusRpc object configured with Verus daemon config file
+    WHEN config is read several times
+    THEN config file is read once
+    """
+    conf_path = tmp_path.joinpath("VRSC.conf")
+    conf_path.write_text("rpcuser=user\nrpcpassword=password\n")
+    verus_rpc = VerusRpc(conf_path=conf_path)
+    read_text = mocker.spy(Path, "read_text")
+    assert verus_rpc._read_conf() == {"rpcuser": "user", "rpcpassword": "password"}
+    assert verus_rpc._read_conf() == {"rpcuser": "user", "rpcpassword": "password"}
+    assert read_text.call_count == 1
+
+
 def test_stake_transaction_correct():
     """
     GIVEN dummy stake tx
@@ -326,7 +834,7 @@ def test_api_gateway_cognito_check_response_status_not_200(mocker, api_cognito):
     """
     GIVEN ApiGatewayCognito object with dummy env_data
     WHEN invoked _check_response_status() method with response status_code != 200
-    THEN sys.exit is called
+    THEN ApiCallError is raised
     """
     # Mock logger attr
     mocker.patch.object(api_cognito, "logger")
@@ -334,11 +842,8 @@ def test_api_gateway_cognito_check_response_status_not_200(mocker, api_cognito):
     mocked_response_obj = mock.Mock()
     mocked_response_obj.status_code = 404
     mocked_response_obj.text = "Sth is wrong"
-    mocked_exit = mocker.patch("sys.exit")
-    api_cognito._check_response_status(response=mocked_response_obj)
-    # Assertions
-    mocked_exit.assert_called_once()
-    mocked_exit.assert_called()
+    with pytest.raises(ApiCallError):
+        api_cognito._check_response_status(response=mocked_response_obj)
 
 
 def test_api_gateway_cognito_check_response_status_not_200_logger(mocker, api_cognito):
@@ -350,13 +855,13 @@ def test_api_gateway_cognito_check_response_status_not_200_logger(mocker, api_co
     mocked_response_obj = mock.Mock()
     mocked_response_obj.status_code = 404
     mocked_response_obj.text = "Sth is wrong"
-    mocker.patch("sys.exit")
     # mocked_logger = mocker.patch('new_stake_script.check_new_stake.logger')
     mocked_logger = mocker.patch.object(api_cognito, "logger")
     desired_log_entry = (
         f"API response: {mocked_response_obj.status_code} {mocked_response_obj.text}"
     )
-    api_cognito._check_response_status(response=mocked_response_obj)
+    with pytest.raises(ApiCallError):
+        api_cognito._check_response_status(response=mocked_response_obj)
     # Assertions
     mocked_logger.error.assert_called_with(desired_log_entry)
 
@@ -377,6 +882,76 @@ def test_api_gateway_cognito_get_access_token(mocker, api_cognito):
     assert api_cognito._get_access_token() == "valid-token"
 
 
+def test_api_gateway_cognito_get_access_token_cached(mocker, api_cognito):
+    """
+    GIVEN ApiGatewayCognito object with dummy env_data
+    WHEN invoked _get_access_token() method several times
+    THEN access token is fetched from Cognito only once
+    """
+    mocked_fetch = mocker.patch.object(
+        api_cognito,
+        "_fetch_access_token",
+        return_value={"access_token": "valid-token", "expires_in": 3600},
+    )
+    assert api_cognito._get_access_token() == "valid-token"
+    assert api_cognito._get_access_token() == "valid-token"
+    mocked_fetch.assert_called_once()
+
+
+def test_api_gateway_cognito_dispatch_error(mocker, api_cognito):
+    """
+    GIVEN ApiGatewayCognito object with dummy env_data
+    WHEN invoked dispatch() method and API responds with error
+    THEN False is returned and script is not terminated
+    """
+    mocker.patch.object(api_cognito, "_get_access_token", return_value="valid-token")
+    mocked_post = mocker.patch("requests.post", autospec=True)
+    mocked_post.return_value = mock.Mock(status_code=500, text="Internal Server Error")
+    assert api_cognito.dispatch(method="post", data={"txid": "tx01"}) is False
+
+
+def test_api_gateway_cognito_dispatch_access_token_error(mocker, api_cognito):
+    """
+    GIVEN ApiGatewayCognito object with dummy env_data
+    WHEN invoked dispatch() method and access token request fails
+    THEN False is returned and script is not terminated
+    """
+    mocker.patch.object(api_cognito, "logger")
+    mocked_post = mocker.patch("requests.post", autospec=True)
+    mocked_post.return_value = mock.Mock(status_code=400, text="invalid_client")
+    assert api_cognito.dispatch(method="post", data={"txid": "tx01"}) is False
+    mocked_post.assert_called_once()
+
+
+def test_api_gateway_cognito_call_access_token_error(mocker, api_cognito):
+    """
+    GIVEN ApiGatewayCognito object with dummy env_data
+    WHEN invoked call() method and access token request fails
+    THEN script is terminated
+    """
+    mocker.patch.object(api_cognito, "logger")
+    mocked_post = mocker.patch("requests.post", autospec=True)
+    mocked_post.return_value = mock.Mock(status_code=400, text="invalid_client")
+    with pytest.raises(SystemExit):
+        api_cognito.call(method="post", data={"txid": "tx01"})
+
+
+def test_api_gateway_cognito_send_wallet_id(mocker, api_cognito):
+    """
+    GIVEN ApiGatewayCognito object with WALLET_ID in env_data
+    WHEN invoked send() method
+    THEN wallet id is added to posted data
+    """
+    api_cognito.wallet_id = "wallet-01"
+    mocker.patch.object(api_cognito, "_get_access_token", return_value="valid-token")
+    mocked_post = mocker.patch("requests.post", autospec=True)
+    api_cognito.send(method="post", data={"txid": "tx01"})
+    assert mocked_post.call_args.kwargs["json"] == {
+        "txid": "tx01",
+        "wallet_id": "wallet-01",
+    }
+
+
 def test_api_gateway_cognito_check_http_method_not_allowed(mocker, api_cognito):
     """
     GIVEN ApiGatewayCognito object with dummy env_data
@@ -1,28 +1,91 @@
-from datetime import date
+from datetime import date, datetime, timezone
+import base64
 import json
+import os
 
-from lambda_functions.lambda_function_post import (
+import boto3
+from botocore.exceptions import ClientError
+from pytest import raises
+
+from lambda_common import (
+    ALL_TIME_TS_ID,
+    DEFAULT_WALLET_ID,
+    FLEET_WALLET_ID,
+    MetricsLogger,
+    RetryCounter,
     get_timestamp_id,
-    put_stake_txids_db,
-    put_stake_values_db,
-    get_db_item,
-    update_db_item,
+)
+from lambda_functions.lambda_function_post import (
+    get_wallet_id,
+    get_stake_txid_put,
+    get_stake_values_update,
+    put_stake_db,
+    get_stake_txids_db,
+    remove_stake_db,
+    parse_event,
+    validate_stake,
+    validate_stake_txid,
     lambda_handler_post,
 )
 from lambda_functions.lambda_function_get import (
+    get_wallet_id as get_wallet_id_query,
     check_str_is_number,
+    decode_cursor,
+    encode_cursor,
+    get_db_item,
+    get_day_buckets,
+    list_stakes,
+    sum_rolling_window,
     sanitize_query_params,
+    parse_event as parse_event_get,
     lambda_handler_get,
 )
 
 
+def put_stake_txids_db(
+    stake: dict, table_name: str, wallet_id: str = DEFAULT_WALLET_ID
+) -> None:
+    """
+    Add stake item to DynamoDB table (list of individual stake txs) without aggregates.
+    """
+    boto3.client("dynamodb").put_item(
+        **get_stake_txid_put(stake=stake, table_name=table_name, wallet_id=wallet_id)
+    )
+
+
+def put_stake_values_db(table_name: str, stake: dict, timestamp: str) -> None:
+    """
+    Add stake to aggregate of given timestamp (time period) in DynamoDB table.
+    """
+    boto3.client("dynamodb").update_item(
+        **get_stake_values_update(
+            table_name=table_name, stake=stake, timestamp=timestamp
+        )
+    )
+
+
+def get_failing_day_bucket_update(table_name: str, wallet_id: str, **kwargs) -> dict:
+    """
+    Return update of day bucket cancelling transaction (condition of not existing item fails).
+    """
+    return {
+        "TableName": table_name,
+        "Key": {"wallet_id": {"S": wallet_id}, "ts_id": {"S": "day#"}},
+        "UpdateExpression": "ADD stakes_count :c",
+        "ConditionExpression": "attribute_exists(ts_id)",
+        "ExpressionAttributeValues": {":c": {"N": "1"}},
+    }
+
+
 def test_item_not_exist_in_stake_txids_db(aws_dummy_stake_txids_table):
     """
     GIVEN Empty DynamoDB table.
     WHEN Get relevant item from DynamoDB table.
     THEN Item with specified 'tx_id' not exist.
     """
-    response = aws_dummy_stake_txids_table.get_item(Key={"tx_id": "qwerty123456"})
+    response = aws_dummy_stake_txids_table.get_item(
+        Key={"wallet_id": DEFAULT_WALLET_ID, "tx_id": "qwerty123456"}
+    )
     item = response.get("Item", {})
     assert item == {}
 
@@ -33,37 +96,47 @@ def test_item_not_exist_in_stake_values_db(aws_dummy_stake_values_table):
     WHEN Get relevant item from DynamoDB table.
     THEN Item with specified 'ts_id' not exist.
     """
-    response = aws_dummy_stake_values_table.get_item(Key={"ts_id": "2021-08"})
+    response = aws_dummy_stake_values_table.get_item(
+        Key={"wallet_id": DEFAULT_WALLET_ID, "ts_id": "2021-08"}
+    )
     item = response.get("Item", {})
     assert item == {}
 
 
-def test_put_stake_txids_db_correct(aws_dummy_stake_txids_table, dummy_stake_data):
+def test_put_stake_db_txid_correct(aws_dummy_dynamodb_both_tables, dummy_stake_data):
     """
     GIVEN Stake data from POST request.
-    WHEN The stake data is put into a relevant DynamoDB table.
-    THEN Item with desired 'tx_id' exist in relevant DynamoDB table and is correct.
+    WHEN The stake data is put into DynamoDB tables twice.
+    THEN Item with desired 'tx_id' exist in relevant DynamoDB table and is correct - second put is rejected.
     """
-    table_name = aws_dummy_stake_txids_table.name
-    put_stake_txids_db(stake=dummy_stake_data, table_name=table_name)
-    response = aws_dummy_stake_txids_table.get_item(Key={"tx_id": "qwerty123456"})
-    item = response.get("Item", {})
-    assert dummy_stake_data["time"] == item["stake_ts"]
-    assert dummy_stake_data["amount"] == float(item["stake_amount"])
+    table_txid_name = os.environ["DYNAMODB_TXIDS_NAME"]
+    put_params = {
+        "stake": dummy_stake_data,
+        "table_txid_name": table_txid_name,
+        "table_values_name": os.environ["DYNAMODB_VALUES_NAME"],
+    }
+    assert put_stake_db(**put_params) is True
+    assert put_stake_db(**put_params) is False
+    stake = get_stake_txids_db(txid="qwerty123456", table_name=table_txid_name)
+    assert dummy_stake_data["time"] == stake["time"]
+    assert dummy_stake_data["amount"] == stake["amount"]
 
 
-def test_put_stake_txids_db_incorrect(aws_dummy_stake_txids_table, dummy_stake_data):
+def test_put_stake_db_txid_incorrect(aws_dummy_dynamodb_both_tables, dummy_stake_data):
     """
     GIVEN Stake data from POST request.
-    WHEN The stake data is put into a relevant DynamoDB table.
+    WHEN The stake data is put into DynamoDB tables.
     THEN Item with desired 'tx_id' exist in relevant DynamoDB table but is incorrect.
     """
-    table_name = aws_dummy_stake_txids_table.name
-    put_stake_txids_db(stake=dummy_stake_data, table_name=table_name)
-    response = aws_dummy_stake_txids_table.get_item(Key={"tx_id": "qwerty123456"})
-    item = response.get("Item", {})
-    assert 1234567891 != item["stake_ts"]
-    assert 123.321 != float(item["stake_amount"])
+    table_txid_name = os.environ["DYNAMODB_TXIDS_NAME"]
+    put_stake_db(
+        stake=dummy_stake_data,
+        table_txid_name=table_txid_name,
+        table_values_name=os.environ["DYNAMODB_VALUES_NAME"],
+    )
+    stake = get_stake_txids_db(txid="qwerty123456", table_name=table_txid_name)
+    assert 1234567891 != stake["time"]
+    assert 123.321 != stake["amount"]
 
 
 def test_put_stake_values_db_correct_year_month(
@@ -78,7 +151,9 @@ def test_put_stake_values_db_correct_year_month(
     put_stake_values_db(
         table_name=table_name, stake=dummy_stake_data, timestamp="2021-01"
     )
-    response = aws_dummy_stake_values_table.get_item(Key={"ts_id": "2021-01"})
+    response = aws_dummy_stake_values_table.get_item(
+        Key={"wallet_id": DEFAULT_WALLET_ID, "ts_id": "2021-01"}
+    )
     item = response.get("Item", {})
     assert int(item["stakes_count"]) == 1
     assert float(item["stakes_amount"]) == 123.123
@@ -94,7 +169,9 @@ def test_put_stake_values_db_correct_year(
     """
     table_name = aws_dummy_stake_values_table.name
     put_stake_values_db(table_name=table_name, stake=dummy_stake_data, timestamp="2021")
-    response = aws_dummy_stake_values_table.get_item(Key={"ts_id": "2021"})
+    response = aws_dummy_stake_values_table.get_item(
+        Key={"wallet_id": DEFAULT_WALLET_ID, "ts_id": "2021"}
+    )
     item = response.get("Item", {})
     assert int(item["stakes_count"]) == 1
     assert float(item["stakes_amount"]) == 123.123
@@ -160,27 +237,6 @@ def test_get_db_item_year_and_year_month(
     assert item_year_month
 
 
-def test_update_db_item(aws_dummy_stake_values_table, dummy_stake_data):
-    """
-    GIVEN Stake data to update with relevant timestamp.
-    WHEN Executing the update of an item in the DynamoDB table.
-    THEN Items with desired 'ts_id' is updated.
-    """
-    table_name = aws_dummy_stake_values_table.name
-    timestamp = "2021-03"
-    updated_stake_data = {"stakes_amount": 150.1, "stakes_count": 2}
-    # Put dummy data into table
-    put_stake_values_db(
-        table_name=table_name, stake=dummy_stake_data, timestamp=timestamp
-    )
-    update_db_item(
-        table_name=table_name, part_key=timestamp, updated_data=updated_stake_data
-    )
-    item = get_db_item(table_name=table_name, part_key=timestamp)
-    assert int(item["stakes_count"]) == 2
-    assert float(item["stakes_amount"]) == 150.1
-
-
 def test_lambda_handler_get_request(
     aws_dummy_dynamodb_both_tables, dummy_lambda_event_get
 ):
@@ -190,7 +246,12 @@ def test_lambda_handler_get_request(
     THEN Desired func return.
     """
     response_test = lambda_handler_get(event=dummy_lambda_event_get, context={})
-    response_desired = {"timeframe": "2011-11", "stakes_count": 0, "stakes_amount": 0}
+    response_desired = {
+        "wallet_id": DEFAULT_WALLET_ID,
+        "timeframe": "2011-11",
+        "stakes_count": 0,
+        "stakes_amount": 0,
+    }
     body = {"statusCode": 200, "body": json.dumps(response_desired)}
     assert response_test == body
 
@@ -211,6 +272,821 @@ def test_lambda_handler_post_request(
     assert response_test == response_desired
 
 
+def test_lambda_handler_get_request_http_api(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_get_http
+):
+    """
+    GIVEN HTTP API proxy event (payload format version 2.0) for GET request.
+    WHEN Executing the lambda_handler() func.
+    THEN Stakes data of wallet from JWT claims is returned.
+    """
+    response_test = lambda_handler_get(event=dummy_lambda_event_get_http, context={})
+    response_desired = {
+        "wallet_id": "http-client",
+        "timeframe": "2011-11",
+        "stakes_count": 0,
+        "stakes_amount": 0,
+    }
+    assert response_test == {"statusCode": 200, "body": json.dumps(response_desired)}
+
+
+def test_lambda_handler_post_request_http_api(
+    aws_dummy_dynamodb_both_tables,
+    dummy_lambda_event_post_http,
+    dummy_lambda_event_get_http,
+):
+    """
+    GIVEN HTTP API proxy event (payload format version 2.0) for POST request.
+    WHEN Executing the lambda_handler() func.
+    THEN Stake is stored in partition of wallet from JWT claims.
+    """
+    response_test = lambda_handler_post(event=dummy_lambda_event_post_http, context={})
+    assert response_test == {
+        "statusCode": 200,
+        "body": json.dumps("Tables updated and notification sent!"),
+    }
+    event_get = {
+        **dummy_lambda_event_get_http,
+        "queryStringParameters": {"period": "all"},
+    }
+    response_get = json.loads(lambda_handler_get(event=event_get, context={})["body"])
+    assert response_get["wallet_id"] == "http-client"
+    assert response_get["stakes_count"] == 1
+
+
+def test_lambda_handler_post_request_http_api_not_valid_body(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post_http
+):
+    """
+    GIVEN HTTP API proxy event for POST request with not valid body (not validated by HTTP API).
+    WHEN Executing the lambda_handler() func.
+    THEN Response with status code 400 is returned.
+    """
+    for body in ["not-json", json.dumps({"txid": "qwerty123456", "amount": 1.0})]:
+        event = {**dummy_lambda_event_post_http, "body": body}
+        response_test = lambda_handler_post(event=event, context={})
+        assert response_test["statusCode"] == 400
+
+
+def test_parse_event_post_http_api_base64_body(dummy_lambda_event_post_http):
+    """
+    GIVEN HTTP API proxy event with base64 encoded body.
+    WHEN parse_event() func is invoked.
+    THEN Event in REST API mapping template shape with decoded body is returned.
+    """
+    body = dummy_lambda_event_post_http["body"]
+    event = {
+        **dummy_lambda_event_post_http,
+        "body": base64.b64encode(body.encode()).decode(),
+        "isBase64Encoded": True,
+    }
+    assert parse_event(event=event) == {
+        "body": json.loads(body),
+        "client_id": "http-client",
+        "http_method": "POST",
+    }
+
+
+def test_parse_event_rest_api_unchanged(
+    dummy_lambda_event_get, dummy_lambda_event_post
+):
+    """
+    GIVEN REST API events (shaped by mapping templates).
+    WHEN parse_event() funcs are invoked.
+    THEN Events are returned unchanged.
+    """
+    assert parse_event_get(event=dummy_lambda_event_get) == dummy_lambda_event_get
+    assert parse_event(event=dummy_lambda_event_post) == dummy_lambda_event_post
+
+
+def test_parse_event_get_http_api_no_query_params(dummy_lambda_event_get_http):
+    """
+    GIVEN HTTP API proxy event for GET request without query params.
+    WHEN parse_event() func is invoked.
+    THEN All query params are set to empty strings.
+    """
+    event = {**dummy_lambda_event_get_http, "queryStringParameters": None}
+    event_parsed = parse_event_get(event=event)
+    assert event_parsed["year"] == ""
+    assert event_parsed["cursor"] == ""
+    assert event_parsed["client_id"] == "http-client"
+    assert event_parsed["http_method"] == "GET"
+
+
+def test_validate_stake(dummy_stake_data):
+    """
+    GIVEN Stake data with correct and not valid values.
+    WHEN validate_stake() func is invoked.
+    THEN Only stake data matching 'StakePOST' model is valid.
+    """
+    assert validate_stake(dummy_stake_data) is True
+    assert validate_stake({**dummy_stake_data, "wallet_id": "wallet-01"}) is True
+    assert validate_stake({**dummy_stake_data, "wallet_id": "bad wallet"}) is False
+    assert validate_stake({**dummy_stake_data, "time": "1234567890"}) is False
+    assert validate_stake({**dummy_stake_data, "amount": -1}) is False
+    assert validate_stake({**dummy_stake_data, "txid": ""}) is False
+    assert validate_stake({**dummy_stake_data, "detected_at": 1234567899}) is True
+    assert validate_stake({**dummy_stake_data, "detected_at": "now"}) is False
+    assert validate_stake({**dummy_stake_data, "address": "RXXX"}) is True
+    assert validate_stake({**dummy_stake_data, "address": "2021#RXXX"}) is False
+    assert validate_stake(None) is False
+
+
+def test_validate_stake_txid():
+    """
+    GIVEN Stake data with correct and not valid txid.
+    WHEN validate_stake_txid() func is invoked.
+    THEN Only stake data matching 'StakeDELETE' model is valid.
+    """
+    assert validate_stake_txid({"txid": "qwerty123456"}) is True
+    assert validate_stake_txid({"txid": "qwerty123456", "wallet_id": "w-1"}) is True
+    assert validate_stake_txid({"txid": ""}) is False
+    assert validate_stake_txid({"txid": 123}) is False
+    assert validate_stake_txid({}) is False
+
+
+def test_remove_stake_db(aws_dummy_dynamodb_both_tables, dummy_stake_data):
+    """
+    GIVEN Stake stored in 'stake_txids' table.
+    WHEN remove_stake_db() func is invoked twice.
+    THEN Removed stake is returned first and None on second call.
+    """
+    table_txid_name = os.environ["DYNAMODB_TXIDS_NAME"]
+    table_values_name = os.environ["DYNAMODB_VALUES_NAME"]
+    put_stake_db(
+        stake=dummy_stake_data,
+        table_txid_name=table_txid_name,
+        table_values_name=table_values_name,
+    )
+    remove_params = {
+        "txid": dummy_stake_data["txid"],
+        "table_txid_name": table_txid_name,
+        "table_values_name": table_values_name,
+    }
+    stake_removed = remove_stake_db(**remove_params)
+    assert stake_removed["txid"] == dummy_stake_data["txid"]
+    assert stake_removed["amount"] == dummy_stake_data["amount"]
+    assert remove_stake_db(**remove_params) is None
+    assert (
+        get_stake_txids_db(txid=dummy_stake_data["txid"], table_name=table_txid_name)
+        is None
+    )
+
+
+def test_remove_stake_db_transaction_cancelled(
+    aws_dummy_dynamodb_both_tables, dummy_stake_data, mocker
+):
+    """
+    GIVEN Transaction removing stake cancelled by aggregate update (not by already removed stake).
+    WHEN remove_stake_db() func is invoked and then invoked again.
+    THEN Error is raised and stake stays stored and counted - the retry removes and subtracts it.
+    """
+    table_txid_name = os.environ["DYNAMODB_TXIDS_NAME"]
+    table_values_name = os.environ["DYNAMODB_VALUES_NAME"]
+    put_stake_db(
+        stake=dummy_stake_data,
+        table_txid_name=table_txid_name,
+        table_values_name=table_values_name,
+    )
+    # Conditional update of the day bucket fails
+    mocker.patch(
+        "lambda_functions.lambda_function_post.get_day_bucket_update",
+        side_effect=get_failing_day_bucket_update,
+    )
+    with raises(ClientError) as error:
+        remove_stake_db(
+            txid=dummy_stake_data["txid"],
+            table_txid_name=table_txid_name,
+            table_values_name=table_values_name,
+        )
+    assert error.value.response["Error"]["Code"] == "TransactionCanceledException"
+    assert get_stake_txids_db(txid=dummy_stake_data["txid"], table_name=table_txid_name)
+    item_all = get_db_item(table_name=table_values_name, part_key=ALL_TIME_TS_ID)
+    assert int(item_all["stakes_count"]) == 1
+    mocker.stopall()
+    assert remove_stake_db(
+        txid=dummy_stake_data["txid"],
+        table_txid_name=table_txid_name,
+        table_values_name=table_values_name,
+    )
+    item_all = get_db_item(table_name=table_values_name, part_key=ALL_TIME_TS_ID)
+    assert int(item_all["stakes_count"]) == 0
+
+
+def test_lambda_handler_delete_request(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda events for POST and DELETE requests of the same stake.
+    WHEN Executing the lambda_handler() func.
+    THEN Stake is removed, aggregates are decremented and second DELETE returns 404.
+    """
+    event_delete = {
+        "body": {"txid": dummy_lambda_event_post["body"]["txid"]},
+        "http_method": "DELETE",
+    }
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    response_test = lambda_handler_post(event=event_delete, context={})
+    assert response_test == {"statusCode": 200, "body": json.dumps("Stake removed")}
+    table_name = os.environ["DYNAMODB_VALUES_NAME"]
+    for wallet_id in [DEFAULT_WALLET_ID, FLEET_WALLET_ID]:
+        item_all = get_db_item(
+            table_name=table_name, part_key=ALL_TIME_TS_ID, wallet_id=wallet_id
+        )
+        assert int(item_all["stakes_count"]) == 0
+        assert float(item_all["stakes_amount"]) == 0
+    days = get_day_buckets(table_name=table_name, window=1)
+    assert sum_rolling_window(days=days, window=1)["stakes_count"] == 0
+    response_test = lambda_handler_post(event=event_delete, context={})
+    assert response_test == {"statusCode": 404, "body": json.dumps("Stake not found")}
+
+
+def test_lambda_handler_delete_request_not_valid_body(aws_dummy_dynamodb_both_tables):
+    """
+    GIVEN Lambda event for DELETE request without txid.
+    WHEN Executing the lambda_handler() func.
+    THEN Bad request response is returned.
+    """
+    response_test = lambda_handler_post(
+        event={"body": {}, "http_method": "DELETE"}, context={}
+    )
+    assert response_test["statusCode"] == 400
+
+
+def test_lambda_handler_post_request_emf_metrics(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post, emf_documents
+):
+    """
+    GIVEN Lambda event for POST request with stake detection time.
+    WHEN Executing the lambda_handler() func.
+    THEN Single valid EMF document with stake age, detection latency, DynamoDB latencies and payload size is logged.
+    """
+    event = {
+        **dummy_lambda_event_post,
+        "body": {**dummy_lambda_event_post["body"], "detected_at": 1234567950},
+    }
+    lambda_handler_post(event=event, context={})
+    documents = emf_documents()
+    assert len(documents) == 1
+    document = documents[0]
+    assert document["Function"] == "post"
+    assert document["Method"] == "POST"
+    assert document["txid"] == "qwerty123456"
+    assert document["DetectionDelay"] == 60
+    assert document["StakeAgeAtIngest"] > document["DetectionToIngestLatency"] > 0
+    assert document["PayloadSize"] == len(json.dumps(event["body"]).encode())
+    metric_names = {
+        metric["Name"] for metric in document["_aws"]["CloudWatchMetrics"][0]["Metrics"]
+    }
+    assert "DynamoDBTransactWriteLatency" in metric_names
+
+
+def test_lambda_handler_get_request_emf_metrics(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_get, emf_documents
+):
+    """
+    GIVEN Lambda event for GET request.
+    WHEN Executing the lambda_handler() func.
+    THEN Valid EMF document with DynamoDB read latency and response size is logged.
+    """
+    response = lambda_handler_get(event=dummy_lambda_event_get, context={})
+    document = emf_documents()[0]
+    assert document["Function"] == "get"
+    assert document["DynamoDBReadLatency"] >= 0
+    assert document["ResponseSize"] == len(response["body"].encode())
+
+
+def test_lambda_handler_get_request_throttled_retried(
+    throttling_dynamodb_server, dummy_lambda_event_get, emf_documents
+):
+    """
+    GIVEN DynamoDB endpoint throttling first two API calls.
+    WHEN Executing the lambda_handler() func.
+    THEN Throttled call is retried and retry & throttle counts are returned in headers and logged.
+    """
+    throttling_dynamodb_server.throttled_requests = 2
+    response = lambda_handler_get(event=dummy_lambda_event_get, context={})
+    assert response["statusCode"] == 200
+    assert response["headers"] == {
+        "X-Retry-Attempts": "2",
+        "X-Throttled-Requests": "2",
+    }
+    document = emf_documents()[0]
+    assert document["AWSRetries"] == 2
+    assert document["AWSThrottles"] == 2
+
+
+def test_lambda_handler_post_request_throttled_retries_exhausted(
+    throttling_dynamodb_server, dummy_lambda_event_post, emf_documents
+):
+    """
+    GIVEN DynamoDB endpoint throttling all API calls.
+    WHEN Executing the lambda_handler() func.
+    THEN Response with status code 503 is returned after max attempts (stake is posted again later).
+    """
+    throttling_dynamodb_server.throttled_requests = 100
+    response = lambda_handler_post(event=dummy_lambda_event_post, context={})
+    assert response["statusCode"] == 503
+    assert response["headers"]["X-Throttled-Requests"] == "3"
+    assert throttling_dynamodb_server.requests == 3
+    document = emf_documents()[-1]
+    assert document["error_code"] == "ProvisionedThroughputExceededException"
+
+
+def test_lambda_handler_get_request_not_throttled(
+    throttling_dynamodb_server, dummy_lambda_event_get
+):
+    """
+    GIVEN DynamoDB endpoint not throttling API calls.
+    WHEN Executing the lambda_handler() func.
+    THEN Response has no retry headers.
+    """
+    response = lambda_handler_get(event=dummy_lambda_event_get, context={})
+    assert response["statusCode"] == 200
+    assert "headers" not in response
+
+
+def test_retry_counter():
+    """
+    GIVEN RetryCounter object.
+    WHEN botocore 'needs-retry' event is emitted after throttled attempt, other error and successful retry.
+    THEN Only attempts after the first one are counted as retries and only throttling errors as throttles.
+    """
+    retry_counter = RetryCounter()
+    throttled = (None, {"Error": {"Code": "ThrottlingException"}})
+    failed = (None, {"Error": {"Code": "InternalServerError"}})
+    retry_counter(response=throttled, attempts=1)
+    retry_counter(response=failed, attempts=2)
+    retry_counter(response=(None, {}), attempts=3)
+    assert retry_counter.retries == 2
+    assert retry_counter.throttles == 1
+    retry_counter.reset()
+    assert (retry_counter.retries, retry_counter.throttles) == (0, 0)
+
+
+def test_metrics_logger_flush(emf_documents):
+    """
+    GIVEN MetricsLogger object with metrics and property.
+    WHEN flush() method is invoked.
+    THEN Single valid EMF document is logged.
+    """
+    metrics = MetricsLogger(function="post", method="POST")
+    metrics.put_metric("PayloadSize", 10, unit="Bytes")
+    with metrics.timer("DynamoDBTxidsWriteLatency"):
+        pass
+    metrics.set_property("txid", "qwerty123456")
+    metrics.flush()
+    document = emf_documents()[0]
+    assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [
+        ["Function", "Method"]
+    ]
+    assert document["PayloadSize"] == 10
+    assert document["txid"] == "qwerty123456"
+
+
+def test_metrics_logger_flush_no_metrics(emf_documents):
+    """
+    GIVEN MetricsLogger object without metrics.
+    WHEN flush() method is invoked.
+    THEN Nothing is logged (EMF document requires at least one metric).
+    """
+    MetricsLogger(function="get", method="GET").flush()
+    assert emf_documents() == []
+
+
+def test_lambda_handler_post_request_wallet_and_fleet_aggregates(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda events for POST requests from two wallets.
+    WHEN Executing the lambda_handler() func.
+    THEN Stakes are aggregated per wallet and fleet-wide (over all wallets).
+    """
+    event_other_wallet = {
+        "body": {"txid": "asdfgh654321", "time": 1234567890, "amount": 10.0},
+        "client_id": "other-client",
+        "http_method": "POST",
+    }
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    lambda_handler_post(event=event_other_wallet, context={})
+    table_name = os.environ["DYNAMODB_VALUES_NAME"]
+    timestamp = get_timestamp_id()
+    item_default = get_db_item(table_name=table_name, part_key=timestamp)
+    item_other = get_db_item(
+        table_name=table_name, part_key=timestamp, wallet_id="other-client"
+    )
+    item_fleet = get_db_item(
+        table_name=table_name, part_key=timestamp, wallet_id=FLEET_WALLET_ID
+    )
+    assert float(item_default["stakes_amount"]) == 123.123
+    assert float(item_other["stakes_amount"]) == 10.0
+    assert int(item_fleet["stakes_count"]) == 2
+    assert float(item_fleet["stakes_amount"]) == 133.123
+
+
+def test_lambda_handler_get_request_fleet(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda event for GET request with 'scope=fleet' query param.
+    WHEN Executing the lambda_handler() func.
+    THEN Fleet-wide stakes data is returned.
+    """
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    event_get = {"year": "", "month": "", "scope": "fleet", "http_method": "GET"}
+    response_test = lambda_handler_get(event=event_get, context={})
+    body = json.loads(response_test["body"])
+    assert body["wallet_id"] == "fleet"
+    assert body["stakes_count"] == 1
+
+
+def test_lambda_handler_post_request_all_time_and_day_buckets(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda events for POST requests of two stakes.
+    WHEN Executing the lambda_handler() func.
+    THEN All-time totals and current day bucket are updated.
+    """
+    event_other_stake = {
+        **dummy_lambda_event_post,
+        "body": {**dummy_lambda_event_post["body"], "txid": "asdfgh654321"},
+    }
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    lambda_handler_post(event=event_other_stake, context={})
+    table_name = os.environ["DYNAMODB_VALUES_NAME"]
+    item_all = get_db_item(table_name=table_name, part_key=ALL_TIME_TS_ID)
+    days = get_day_buckets(table_name=table_name, window=1)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    assert int(item_all["stakes_count"]) == 2
+    assert float(item_all["stakes_amount"]) == 246.246
+    assert days == {today: [246.246, 2]}
+
+
+def test_lambda_handler_post_request_duplicate(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post, mocker
+):
+    """
+    GIVEN Lambda event for POST request sent twice (fe. retried by the stake checker).
+    WHEN Executing the lambda_handler() func.
+    THEN Stake is counted and notified once and duplicate is answered with 200.
+    """
+    mocker.patch.dict(os.environ, {"TOPIC_ARN": "arn:aws:sns:eu-west-1:1:topic"})
+    publish_mock = mocker.patch("lambda_functions.lambda_function_post.publish_to_sns")
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    response_test = lambda_handler_post(event=dummy_lambda_event_post, context={})
+    assert response_test == {
+        "statusCode": 200,
+        "body": json.dumps("Stake already stored"),
+    }
+    assert publish_mock.call_count == 1
+    table_name = os.environ["DYNAMODB_VALUES_NAME"]
+    for wallet_id in [DEFAULT_WALLET_ID, FLEET_WALLET_ID]:
+        item_all = get_db_item(
+            table_name=table_name, part_key=ALL_TIME_TS_ID, wallet_id=wallet_id
+        )
+        assert int(item_all["stakes_count"]) == 1
+        assert float(item_all["stakes_amount"]) == 123.123
+        assert list(
+            get_day_buckets(
+                table_name=table_name, window=1, wallet_id=wallet_id
+            ).values()
+        ) == [[123.123, 1]]
+
+
+def test_put_stake_db_transaction_cancelled(
+    aws_dummy_dynamodb_both_tables, dummy_stake_data, mocker
+):
+    """
+    GIVEN Transaction storing new stake cancelled by aggregate update (not by already stored stake).
+    WHEN put_stake_db() func is invoked.
+    THEN Error is raised and neither stake nor aggregates are stored.
+    """
+    table_txid_name = os.environ["DYNAMODB_TXIDS_NAME"]
+    table_values_name = os.environ["DYNAMODB_VALUES_NAME"]
+    # Conditional update of the day bucket fails
+    mocker.patch(
+        "lambda_functions.lambda_function_post.get_day_bucket_update",
+        side_effect=get_failing_day_bucket_update,
+    )
+    with raises(ClientError) as error:
+        put_stake_db(
+            stake=dummy_stake_data,
+            table_txid_name=table_txid_name,
+            table_values_name=table_values_name,
+        )
+    assert error.value.response["Error"]["Code"] == "TransactionCanceledException"
+    assert (
+        get_stake_txids_db(txid=dummy_stake_data["txid"], table_name=table_txid_name)
+        is None
+    )
+    assert get_db_item(table_name=table_values_name, part_key=ALL_TIME_TS_ID) == {}
+
+
+def test_lambda_handler_get_request_address_aggregates(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Stakes posted from two staking addresses.
+    WHEN Executing the lambda_handler() func for GET request with 'address' filter or 'mode=addresses'.
+    THEN Totals of the address or of all addresses of the period are returned.
+    """
+    for txid, address, amount in [
+        ("tx01", "RXXX", 10.0),
+        ("tx02", "RXXX", 5.0),
+        ("tx03", "RYYY", 1.5),
+    ]:
+        event_post = {
+            **dummy_lambda_event_post,
+            "body": {
+                "txid": txid,
+                "time": 1234567890,
+                "amount": amount,
+                "address": address,
+            },
+        }
+        lambda_handler_post(event=event_post, context={})
+    year, month = get_timestamp_id().split("-")
+    event_get = {"year": year, "month": month, "http_method": "GET"}
+    response_test = lambda_handler_get(
+        event={**event_get, "address": "RXXX"}, context={}
+    )
+    body = json.loads(response_test["body"])
+    assert body["address"] == "RXXX"
+    assert body["timeframe"] == f"{year}-{month}"
+    assert (body["stakes_count"], body["stakes_amount"]) == (2, 15.0)
+    response_test = lambda_handler_get(
+        event={
+            "year": year,
+            "month": "",
+            "mode": "addresses",
+            "scope": "fleet",
+            "http_method": "GET",
+        },
+        context={},
+    )
+    body = json.loads(response_test["body"])
+    assert body["timeframe"] == year
+    assert body["addresses"] == [
+        {"address": "RXXX", "stakes_count": 2, "stakes_amount": 15.0},
+        {"address": "RYYY", "stakes_count": 1, "stakes_amount": 1.5},
+    ]
+    response_test = lambda_handler_get(
+        event={**event_get, "address": "RXXX", "period": "all"}, context={}
+    )
+    assert response_test["statusCode"] == 400
+
+
+def test_lambda_handler_delete_request_address_aggregates(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda events for POST and DELETE requests of the same stake with staking address.
+    WHEN Executing the lambda_handler() func.
+    THEN Stake is subtracted from address' aggregates.
+    """
+    event_post = {
+        **dummy_lambda_event_post,
+        "body": {**dummy_lambda_event_post["body"], "address": "RXXX"},
+    }
+    lambda_handler_post(event=event_post, context={})
+    lambda_handler_post(
+        event={"body": {"txid": event_post["body"]["txid"]}, "http_method": "DELETE"},
+        context={},
+    )
+    item = get_db_item(
+        table_name=os.environ["DYNAMODB_VALUES_NAME"],
+        part_key=f"{get_timestamp_id()}#RXXX",
+    )
+    assert int(item["stakes_count"]) == 0
+    assert float(item["stakes_amount"]) == 0
+
+
+def test_put_stake_db_day_buckets_expire(
+    aws_dummy_dynamodb_both_tables, dummy_stake_data
+):
+    """
+    GIVEN Stakes ingested on different days.
+    WHEN Per-day buckets of rolling window are fetched.
+    THEN Each day has its own bucket expiring after 365 days and only buckets in the window are returned.
+    """
+    table_values_name = os.environ["DYNAMODB_VALUES_NAME"]
+    for number, ingest_date in enumerate(
+        [
+            datetime(2021, 1, 1, 12, tzinfo=timezone.utc),
+            datetime(2021, 12, 31, tzinfo=timezone.utc),
+            datetime(2022, 1, 1, tzinfo=timezone.utc),
+        ]
+    ):
+        put_stake_db(
+            stake={**dummy_stake_data, "txid": f"tx{number}"},
+            table_txid_name=os.environ["DYNAMODB_TXIDS_NAME"],
+            table_values_name=table_values_name,
+            ingest_date=ingest_date,
+        )
+    item = boto3.client("dynamodb").get_item(
+        TableName=table_values_name,
+        Key={"wallet_id": {"S": DEFAULT_WALLET_ID}, "ts_id": {"S": "day#2021-01-01"}},
+    )["Item"]
+    expire_at = datetime.fromtimestamp(int(item["expire_at"]["N"]), tz=timezone.utc)
+    assert expire_at == datetime(2022, 1, 1, tzinfo=timezone.utc)
+    days = get_day_buckets(
+        table_name=table_values_name,
+        window=365,
+        date=datetime(2022, 1, 1, tzinfo=timezone.utc),
+    )
+    assert days == {"2021-12-31": [123.123, 1], "2022-01-01": [123.123, 1]}
+
+
+def test_sum_rolling_window():
+    """
+    GIVEN Per-day buckets.
+    WHEN sum_rolling_window() func is invoked for 7-day window.
+    THEN Only buckets from the last 7 days (including current day) are summed.
+    """
+    days = {"2021-01-01": [1.5, 1], "2021-01-02": [2.0, 2], "2021-01-08": [3.0, 1]}
+    result = sum_rolling_window(
+        days=days, window=7, date=datetime(2021, 1, 8, tzinfo=timezone.utc)
+    )
+    assert result == {"stakes_count": 3, "stakes_amount": 5.0}
+
+
+def test_lambda_handler_get_request_period(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda events for GET request with 'period' query param.
+    WHEN Executing the lambda_handler() func.
+    THEN All-time and rolling window stakes data is returned.
+    """
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    for period in ["all", "7d", "30d", "365d"]:
+        event_get = {"year": "", "month": "", "period": period, "http_method": "GET"}
+        response_test = lambda_handler_get(event=event_get, context={})
+        body = json.loads(response_test["body"])
+        assert body["timeframe"] == period
+        assert body["stakes_count"] == 1
+        assert body["stakes_amount"] == 123.123
+
+
+def test_list_stakes_pagination(aws_dummy_stake_txids_table, dummy_stake_data):
+    """
+    GIVEN Five stakes in DynamoDB table.
+    WHEN list_stakes() func is invoked with page size 2 and cursor from previous page.
+    THEN All stakes are returned newest first in three pages.
+    """
+    table_name = aws_dummy_stake_txids_table.name
+    for number in range(5):
+        stake = {**dummy_stake_data, "txid": f"tx{number}", "time": 1000 + number}
+        put_stake_txids_db(stake=stake, table_name=table_name)
+    pages = []
+    cursor = ""
+    while True:
+        page = list_stakes(
+            table_name=table_name,
+            wallet_id=DEFAULT_WALLET_ID,
+            time_from=0,
+            time_to=2000,
+            limit=2,
+            cursor=cursor,
+        )
+        pages.append([stake["txid"] for stake in page["stakes"]])
+        cursor = page["cursor"]
+        if not cursor:
+            break
+    assert [txid for page in pages for txid in page] == [
+        "tx4",
+        "tx3",
+        "tx2",
+        "tx1",
+        "tx0",
+    ]
+    assert all(len(page) <= 2 for page in pages)
+
+
+def test_list_stakes_time_window(aws_dummy_stake_txids_table, dummy_stake_data):
+    """
+    GIVEN Stakes of two wallets in DynamoDB table.
+    WHEN list_stakes() func is invoked for selected wallet and time window.
+    THEN Only wallet's stakes from time window are returned.
+    """
+    table_name = aws_dummy_stake_txids_table.name
+    for number in range(5):
+        stake = {**dummy_stake_data, "txid": f"tx{number}", "time": 1000 + number}
+        put_stake_txids_db(stake=stake, table_name=table_name)
+        put_stake_txids_db(stake=stake, table_name=table_name, wallet_id="other")
+    page = list_stakes(
+        table_name=table_name, wallet_id="other", time_from=1001, time_to=1003
+    )
+    assert [stake["txid"] for stake in page["stakes"]] == ["tx3", "tx2", "tx1"]
+    assert page["stakes"][0] == {"txid": "tx3", "time": 1003, "amount": 123.123}
+    assert page["cursor"] is None
+
+
+def test_decode_cursor_not_valid():
+    """
+    GIVEN Not valid cursor and cursor of other wallet.
+    WHEN decode_cursor() func is invoked.
+    THEN ValueError is raised.
+    """
+    cursor = encode_cursor({"wallet_id": "other", "tx_id": "tx1", "stake_ts": 1})
+    for cursor_test in ["not-valid-cursor", cursor]:
+        with raises(ValueError):
+            decode_cursor(cursor=cursor_test, wallet_id=DEFAULT_WALLET_ID)
+
+
+def test_lambda_handler_get_request_list(
+    aws_dummy_dynamodb_both_tables, dummy_lambda_event_post
+):
+    """
+    GIVEN Lambda events for GET request with 'mode=list' query param.
+    WHEN Executing the lambda_handler() func.
+    THEN Stakes page is returned and fleet or not valid cursor request is rejected.
+    """
+    lambda_handler_post(event=dummy_lambda_event_post, context={})
+    event_get = {"year": "", "month": "", "mode": "list", "http_method": "GET"}
+    body = json.loads(lambda_handler_get(event=event_get, context={})["body"])
+    assert body["stakes"] == [
+        {"txid": "qwerty123456", "time": 1234567890, "amount": 123.123}
+    ]
+    assert body["cursor"] is None
+    for params in [{"scope": "fleet"}, {"cursor": "not-valid-cursor"}]:
+        response_test = lambda_handler_get(event={**event_get, **params}, context={})
+        assert response_test["statusCode"] == 400
+
+
+def test_get_wallet_id_from_payload():
+    """
+    GIVEN Lambda POST events with 'wallet_id' in payload matching or not matching Cognito client id.
+    WHEN get_wallet_id() func is invoked.
+    THEN Cognito client id is returned or None if payload's wallet id doesn't match it.
+    """
+    event = {"body": {"wallet_id": "client-01"}, "client_id": "client-01"}
+    assert get_wallet_id(event=event) == "client-01"
+    event = {"body": {"wallet_id": "wallet-01"}, "client_id": "client-01"}
+    assert get_wallet_id(event=event) is None
+
+
+def test_get_wallet_id_from_client_id():
+    """
+    GIVEN Lambda POST event without 'wallet_id' in payload.
+    WHEN get_wallet_id() func is invoked.
+    THEN Cognito client id is returned.
+    """
+    event = {"body": {}, "client_id": "client-01"}
+    assert get_wallet_id(event=event) == "client-01"
+
+
+def test_get_wallet_id_not_valid():
+    """
+    GIVEN Lambda POST events without client id - with and without 'wallet_id' (fleet partition) in payload.
+    WHEN get_wallet_id() func is invoked.
+    THEN Default wallet id is returned or None if payload's wallet id doesn't match it.
+    """
+    event = {"body": {}, "client_id": ""}
+    assert get_wallet_id(event=event) == DEFAULT_WALLET_ID
+    event = {"body": {"wallet_id": FLEET_WALLET_ID}, "client_id": ""}
+    assert get_wallet_id(event=event) is None
+
+
+def test_get_wallet_id_query_params():
+    """
+    GIVEN Lambda GET events with 'wallet_id' and 'scope' query params.
+    WHEN get_wallet_id() func is invoked.
+    THEN Cognito client id, None (wallet id of other client) or fleet partition is returned.
+    """
+    event = {"wallet_id": "client-01", "scope": "", "client_id": "client-01"}
+    assert get_wallet_id_query(event=event) == "client-01"
+    event["wallet_id"] = "wallet-01"
+    assert get_wallet_id_query(event=event) is None
+    event["scope"] = "fleet"
+    assert get_wallet_id_query(event=event) == FLEET_WALLET_ID
+
+
+def test_lambda_handler_wallet_id_not_matching_client(
+    aws_dummy_dynamodb_both_tables,
+    dynamodb,
+    dummy_lambda_event_post,
+    dummy_lambda_event_get,
+):
+    """
+    GIVEN Lambda events for POST and GET requests with wallet id of other client.
+    WHEN Executing the lambda_handler() funcs.
+    THEN Requests are rejected with 403 and stake is not stored.
+    """
+    event_post = {
+        **dummy_lambda_event_post,
+        "body": {**dummy_lambda_event_post["body"], "wallet_id": "other-client"},
+    }
+    response_test = lambda_handler_post(event=event_post, context={})
+    assert response_test["statusCode"] == 403
+    event_get = {**dummy_lambda_event_get, "wallet_id": "other-client"}
+    response_test = lambda_handler_get(event=event_get, context={})
+    assert response_test["statusCode"] == 403
+    table = dynamodb.Table(os.environ["DYNAMODB_TXIDS_NAME"])
+    assert table.scan()["Items"] == []
+
+
 def test_check_str_is_number_pos_int():
     """
     GIVEN String value - positive integer.
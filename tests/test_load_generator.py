@@ -0,0 +1,118 @@
+import boto3
+
+from load_generator import LoadGenerator, parse_api_body, percentile
+
+
+def test_percentile():
+    """
+    GIVEN list of latencies
+    WHEN percentile() func is invoked
+    THEN desired percentiles are returned
+    """
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) == 99.01
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0], 90) == 3.0
+
+
+def test_parse_api_body():
+    """
+    GIVEN API Gateway response with Lambda result
+    WHEN parse_api_body() func is invoked
+    THEN Lambda response body is returned as dict
+    """
+    response_data = {"statusCode": 200, "body": '{"stakes_count": 1}'}
+    assert parse_api_body(response_data) == {"stakes_count": 1}
+    assert parse_api_body({"stakes_count": 1}) == {"stakes_count": 1}
+
+
+def test_load_generator_local_consistent(lambda_api_server, lambda_env_api_file):
+    """
+    GIVEN local API stand-in with Lambda handlers
+    WHEN single wallet posts stakes and polls stakes data
+    THEN all requests succeed and aggregated stakes data match posted stakes
+    """
+    report = LoadGenerator(
+        wallets=1,
+        duration=1,
+        post_rate=4,
+        get_rate=2,
+        env_api_filenames=[lambda_env_api_file],
+    ).run()
+    assert report["post"]["requests"] > 0
+    assert report["post"]["errors"] == 0
+    assert report["get"]["ok"] == report["get"]["requests"]
+    assert report["correctness"]["consistent"] is True
+    assert lambda_api_server.lambda_errors == []
+
+
+def test_load_generator_local_http_api(lambda_api_server, lambda_env_api_file):
+    """
+    GIVEN local HTTP API stand-in with Lambda proxy integration (payload format version 2.0)
+    WHEN single wallet posts stakes and polls stakes data
+    THEN all requests succeed and aggregated stakes data match posted stakes
+    """
+    lambda_api_server.api_type = "http"
+    report = LoadGenerator(
+        wallets=1,
+        duration=1,
+        post_rate=4,
+        get_rate=2,
+        env_api_filenames=[lambda_env_api_file],
+    ).run()
+    assert report["post"]["requests"] > 0
+    assert report["post"]["errors"] == 0
+    assert report["correctness"]["consistent"] is True
+    assert lambda_api_server.lambda_errors == []
+
+
+def test_load_generator_local_throttled(lambda_api_server, lambda_env_api_file):
+    """
+    GIVEN local API stand-in with throttling limit
+    WHEN several wallets post stakes faster than the limit
+    THEN part of requests is throttled
+    """
+    lambda_api_server.rate_limit = 2
+    report = LoadGenerator(
+        wallets=3,
+        duration=1,
+        post_rate=5,
+        get_rate=0,
+        env_api_filenames=[lambda_env_api_file],
+    ).run()
+    assert report["post"]["throttled"] > 0
+    assert (
+        report["post"]["ok"] + report["post"]["throttled"] == report["post"]["requests"]
+    )
+
+
+def test_load_generator_local_wallet_ids(lambda_api_server, tmp_path):
+    """
+    GIVEN local API stand-in with Lambda handlers and API env file of each wallet (own Cognito client id)
+    WHEN two wallets post stakes
+    THEN each wallet's stakes are stored in its own partition and aggregates match posted stakes
+    """
+    env_api_filenames = []
+    for index in range(2):
+        env_api_path = tmp_path.joinpath(f".env-api-{index}")
+        lambda_api_server.write_env_api_file(
+            path=env_api_path, client_id=f"load-wallet-{index}"
+        )
+        env_api_filenames.append(str(env_api_path))
+    report = LoadGenerator(
+        wallets=2,
+        duration=1,
+        post_rate=4,
+        get_rate=0,
+        env_api_filenames=env_api_filenames,
+    ).run()
+    assert report["post"]["errors"] == 0
+    assert report["correctness"]["consistent"] is True
+    items = boto3.client("dynamodb").scan(
+        TableName=lambda_api_server.aws_backend.table_txids_name
+    )["Items"]
+    assert {item["wallet_id"]["S"] for item in items} == {
+        "load-wallet-0",
+        "load-wallet-1",
+    }
@@ -0,0 +1,48 @@
+import os
+
+from lambda_common import ALL_TIME_TS_ID
+from lambda_functions.lambda_function_get import get_db_item
+from local_stack import ScriptedChain
+
+
+def test_scripted_chain_steps(fake_verus_wallet):
+    """
+    GIVEN ScriptedChain object with blocks, stakes and orphan steps
+    WHEN all steps are played
+    THEN wallet state follows script and time of stake getting required confirmations is recorded
+    """
+    chain = ScriptedChain(
+        wallet=fake_verus_wallet,
+        script=["stake tx01 10.5", "stake tx02", "block", "orphan tx02", "block"],
+        confirmations=3,
+    )
+    while not chain.finished:
+        chain.step()
+    assert fake_verus_wallet.blockcount == 5
+    assert [tx["category"] for tx in fake_verus_wallet.transactions] == [
+        "mint",
+        "orphan",
+    ]
+    assert fake_verus_wallet.transactions[0]["amount"] == 10.5
+    assert list(chain.confirmed_at) == ["tx01"]
+
+
+def test_local_stack_play(local_stack):
+    """
+    GIVEN local stand-in stack (Verus wallet with JSON-RPC and API Gateway with Lambda handlers)
+    WHEN chain script with stakes and orphaned stake is played with stake checker run after each block
+    THEN only not orphaned stakes are persisted in DynamoDB and their detection-to-persist latency is returned
+    """
+    script = ["stake tx00", "block", "stake tx01 10", "stake tx02 20", "block"]
+    script += ["orphan tx02", "stake tx03 30"] + ["block"] * 3
+    latencies = local_stack.play(script=script)
+    assert sorted(latencies) == ["tx01", "tx03"]
+    assert all(latency >= 0 for latency in latencies.values())
+    item_all = get_db_item(
+        table_name=os.environ["DYNAMODB_VALUES_NAME"],
+        part_key=ALL_TIME_TS_ID,
+        wallet_id=local_stack.api_server.client_id,
+    )
+    assert int(item_all["stakes_count"]) == 2
+    assert float(item_all["stakes_amount"]) == 40
+    assert local_stack.api_server.lambda_errors == []
@@ -0,0 +1,247 @@
+import csv
+import gzip
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The new_stake_script directory is deployed standalone - its modules use flat imports
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent.joinpath("new_stake_script"))
+)
+from stake_analytics import (  # noqa: E402
+    StakeHistory,
+    expected_stakes_count,
+    get_wallet_staking_data,
+    parse_balances,
+    period_yields,
+    stake_intervals,
+    summarize,
+)
+
+DAY = 86400
+START = int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def write_export_file(path: Path, stakes: list) -> None:
+    """
+    Write stakes ('txid', 'time', 'amount') to gzip'd CSV file in export format (two gzip members).
+    """
+    for part, mode in [(stakes[:1], "wt"), (stakes[1:], "at")]:
+        with gzip.open(path, mode=mode, newline="") as file:
+            writer = csv.writer(file)
+            if mode == "wt":
+                writer.writerow(["txid", "time", "date_utc", "amount"])
+            for stake in part:
+                writer.writerow([stake["txid"], stake["time"], "", stake["amount"]])
+
+
+def test_stake_history_from_records():
+    """
+    GIVEN (wallet, time, amount) records of two wallets
+    WHEN StakeHistory object is created
+    THEN records are stored in numpy arrays with wallet indexes
+    """
+    history = StakeHistory.from_records(
+        [("w2", START, 1.0), ("w1", START + 1, 2.0), ("w2", START + 2, 3.0)]
+    )
+    assert list(history.wallets) == ["w1", "w2"]
+    assert list(history.wallet_idx) == [1, 0, 1]
+    assert history.amounts.sum() == 6.0
+
+
+def test_stake_history_from_export_files(tmp_path):
+    """
+    GIVEN gzip'd CSV export files (with appended gzip member) of two wallets
+    WHEN StakeHistory object is loaded from files
+    THEN all stakes are loaded and file names are used as wallet names
+    """
+    stakes = [
+        {"txid": f"tx{number}", "time": START + number * DAY, "amount": 10.0}
+        for number in range(3)
+    ]
+    write_export_file(tmp_path.joinpath("wallet-a.csv.gz"), stakes)
+    write_export_file(tmp_path.joinpath("wallet-b.csv.gz"), stakes[:2])
+    history = StakeHistory.from_export_files(
+        paths=[
+            str(tmp_path.joinpath("wallet-a.csv.gz")),
+            str(tmp_path.joinpath("wallet-b.csv.gz")),
+        ]
+    )
+    assert list(history.wallets) == ["wallet-a", "wallet-b"]
+    assert np.bincount(history.wallet_idx).tolist() == [3, 2]
+
+
+def test_stake_intervals():
+    """
+    GIVEN stake history of two wallets (one with single stake), not sorted by time
+    WHEN stake_intervals() func is invoked
+    THEN mean and max intervals between stakes of each wallet are returned
+    """
+    history = StakeHistory.from_records(
+        [
+            ("w1", START + 3 * DAY, 1.0),
+            ("w2", START + DAY, 1.0),
+            ("w1", START, 1.0),
+            ("w1", START + DAY, 1.0),
+        ]
+    )
+    means, maxs = stake_intervals(history)
+    assert means[0] == 1.5 * DAY
+    assert maxs[0] == 2 * DAY
+    assert np.isnan(means[1]) and np.isnan(maxs[1])
+
+
+def test_period_yields():
+    """
+    GIVEN stake history with stakes in two months
+    WHEN period_yields() func is invoked
+    THEN staked amounts are summed per wallet and month
+    """
+    history = StakeHistory.from_records(
+        [
+            ("w1", START, 1.0),
+            ("w1", START + 40 * DAY, 2.0),
+            ("w2", START + 41 * DAY, 3.0),
+        ]
+    )
+    periods, yields = period_yields(history, period="month")
+    assert [str(period) for period in periods] == ["2022-01", "2022-02"]
+    assert yields.tolist() == [[1.0, 2.0], [0.0, 3.0]]
+
+
+def test_expected_stakes_count():
+    """
+    GIVEN eligible balance equal to 1% of network staking supply
+    WHEN expected_stakes_count() func is invoked for one day
+    THEN 1% of PoS blocks in a day is expected
+    """
+    expected = expected_stakes_count(
+        eligible_balance=np.array([1000.0]), stake_supply=100000.0, seconds=DAY
+    )
+    assert expected.tolist() == [7.2]
+
+
+def test_summarize():
+    """
+    GIVEN stake history of wallet and time window
+    WHEN summarize() func is invoked with eligible balance and network staking supply
+    THEN stakes in window, effective APY and expected stakes count are returned
+    """
+    history = StakeHistory.from_records(
+        [("w1", START + number * DAY, 12.0) for number in range(-5, 10)]
+    )
+    summary = summarize(
+        history=history,
+        start=START,
+        end=START + 10 * DAY - 1,
+        eligible_balances={"w1": 1000.0},
+        stake_supply=100000.0,
+    )
+    wallet_summary = summary["wallets"]["w1"]
+    assert wallet_summary["stakes_count"] == 10
+    assert wallet_summary["stakes_amount"] == 120.0
+    assert wallet_summary["interval_mean_h"] == 24.0
+    assert wallet_summary["yields"] == {"2022-01": 120.0}
+    assert wallet_summary["effective_apy_pct"] == 438.0
+    assert wallet_summary["expected_stakes_count"] == 72.0
+    assert wallet_summary["stakes_ratio"] == 0.14
+
+
+def test_summarize_balance_per_wallet():
+    """
+    GIVEN stake history of two wallets with eligible balance known for one of them
+    WHEN summarize() func is invoked
+    THEN effective APY and expected stakes count are computed with each wallet's own balance only
+    """
+    history = StakeHistory.from_records(
+        [
+            (wallet, START + number * DAY, 12.0)
+            for wallet in ["w1", "w2"]
+            for number in range(10)
+        ]
+    )
+    summary = summarize(
+        history=history,
+        start=START,
+        end=START + 10 * DAY - 1,
+        eligible_balances={"w1": 2000.0},
+        stake_supply=100000.0,
+    )
+    assert summary["wallets"]["w1"]["expected_stakes_count"] == 144.0
+    assert summary["wallets"]["w1"]["effective_apy_pct"] == 219.0
+    assert "effective_apy_pct" not in summary["wallets"]["w2"]
+    assert "expected_stakes_count" not in summary["wallets"]["w2"]
+
+
+def test_parse_balances():
+    """
+    GIVEN eligible balances as 'wallet=balance' values or single balance
+    WHEN parse_balances() func is invoked
+    THEN balances by wallet name are returned - single balance only for single wallet
+    """
+    wallets = np.array(["w1", "w2"])
+    assert parse_balances(["w1=10.5", "w2=3"], wallets=wallets) == {
+        "w1": 10.5,
+        "w2": 3.0,
+    }
+    assert parse_balances(["10"], wallets=wallets[:1]) == {"w1": 10.0}
+    with pytest.raises(ValueError):
+        parse_balances(["10"], wallets=wallets)
+    with pytest.raises(ValueError):
+        parse_balances(["=10"], wallets=wallets)
+
+
+def test_get_wallet_staking_data(mocker, tmp_path):
+    """
+    GIVEN running Verus wallet available with JSON-RPC
+    WHEN get_wallet_staking_data() func is invoked
+    THEN eligible balance and staking supply are returned and tx history file is not created
+    """
+    import check_new_stake
+
+    mocker.patch.object(
+        check_new_stake.VerusProcess,
+        "status",
+        new_callable=mocker.PropertyMock,
+        return_value=True,
+    )
+    batch = mocker.patch.object(
+        check_new_stake.VerusRpc,
+        "batch",
+        side_effect=[
+            [({"eligible_staking_balance": 12.5}, None)],
+            [({"stakingsupply": 1000.0}, None)],
+        ],
+    )
+    mocker.patch.object(
+        check_new_stake.VerusStakeChecker,
+        "tx_hist_file_path",
+        new_callable=mocker.PropertyMock,
+        return_value=tmp_path.joinpath("tx_history.json"),
+    )
+    assert get_wallet_staking_data() == (12.5, 1000.0)
+    assert [call.kwargs["method"] for call in batch.call_args_list] == [
+        "getwalletinfo",
+        "getmininginfo",
+    ]
+    assert not tmp_path.joinpath("tx_history.json").exists()
+
+
+def test_get_wallet_staking_data_not_running(mocker):
+    """
+    GIVEN Verus wallet not running
+    WHEN get_wallet_staking_data() func is invoked
+    THEN zeros are returned
+    """
+    import check_new_stake
+
+    mocker.patch.object(
+        check_new_stake.VerusProcess,
+        "status",
+        new_callable=mocker.PropertyMock,
+        return_value=False,
+    )
+    assert get_wallet_staking_data() == (0.0, 0.0)
@@ -0,0 +1,225 @@
+import json
+import sys
+from pathlib import Path
+from urllib.request import urlopen
+
+# The new_stake_script directory is deployed standalone - its modules use flat imports
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent.joinpath("new_stake_script"))
+)
+from check_new_stake import STAKE_CONFIRMATIONS, VerusStakeChecker  # noqa: E402
+from stake_scheduler import PollingScheduler, StakeDaemon, StakingState  # noqa: E402
+
+
+def create_stake_daemon(tmp_path, env_api_file: str) -> StakeDaemon:
+    """
+    Return StakeDaemon object using tx history and metrics files in tmp dir.
+    """
+    return StakeDaemon(
+        tx_hist_filename=str(tmp_path.joinpath("tx_history_test.json")),
+        env_api_filename=env_api_file,
+        metrics_filename=str(tmp_path.joinpath("scheduler_metrics.json")),
+    )
+
+
+def test_staking_state_mode():
+    """
+    GIVEN 'getmininginfo' and 'getwalletinfo' responses
+    WHEN StakingState object is created
+    THEN wallet is active only when staking with eligible balance and not locked
+    """
+    mining_info = {"staking": True}
+    wallet_info = {"eligible_staking_balance": 100.0}
+    assert StakingState.from_rpc(mining_info, wallet_info).mode == "active"
+    assert StakingState.from_rpc({"staking": False}, wallet_info).mode == "idle"
+    assert (
+        StakingState.from_rpc(mining_info, {"eligible_staking_balance": 0}).mode
+        == "idle"
+    )
+    assert (
+        StakingState.from_rpc(mining_info, {**wallet_info, "unlocked_until": 0}).mode
+        == "idle"
+    )
+    assert StakingState(process_running=False).mode == "down"
+
+
+def test_polling_scheduler_intervals():
+    """
+    GIVEN PollingScheduler object
+    WHEN next interval is requested for different staking states
+    THEN active wallet is checked more often than idle wallet
+    """
+    scheduler = PollingScheduler(active_interval=30, idle_interval=600)
+    active = StakingState(process_running=True, staking=True, eligible_balance=1)
+    idle = StakingState(process_running=True, staking=False)
+    assert scheduler.next_interval(state=active) == 30
+    assert scheduler.next_interval(state=idle) == 600
+
+
+def test_polling_scheduler_backoff():
+    """
+    GIVEN PollingScheduler object
+    WHEN verusd is not running in consecutive checks and then starts
+    THEN interval is doubled up to max value and reset after verusd starts
+    """
+    scheduler = PollingScheduler(backoff_base=60, backoff_max=300)
+    down = StakingState(process_running=False)
+    intervals = [scheduler.next_interval(state=down) for _ in range(5)]
+    assert intervals == [60, 120, 240, 300, 300]
+    idle = StakingState(process_running=True)
+    scheduler.next_interval(state=idle)
+    assert scheduler.down_count == 0
+    assert scheduler.next_interval(state=down) == 60
+
+
+def test_stake_daemon_run_once_active(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN StakeDaemon object and staking wallet with new confirmed stake
+    WHEN single check is run
+    THEN new stake is posted, active interval is returned and metrics are stored
+    """
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    fake_verus_wallet.add_stake(txid="tx00", time=1632750000)
+    daemon.run_once()
+    fake_verus_wallet.add_stake(txid="tx01", time=1632750001)
+    fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS - 1)
+    interval = daemon.run_once()
+    assert interval == daemon.scheduler.active_interval
+    assert [stake["txid"] for stake in fake_api_server.stakes] == ["tx01"]
+    metrics = json.loads(tmp_path.joinpath("scheduler_metrics.json").read_text())
+    assert metrics["mode"] == "active"
+    assert metrics["checks"] == 2
+    assert metrics["eligible_balance"] == 1000.0
+
+
+def test_stake_daemon_run_once_chain_tip_not_moved(
+    mocker, tmp_path, fake_verus_wallet, fake_env_api_file
+):
+    """
+    GIVEN StakeDaemon object and staking wallet without new blocks
+    WHEN consecutive checks are run
+    THEN wallet RPCs are called only when chain tip moves or staking state is too old
+    """
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    daemon.state_refresh_checks = 3
+    wallet_info_spy = mocker.spy(VerusStakeChecker, "_get_wallet_info")
+    for _ in range(2):
+        assert daemon.run_once() == daemon.scheduler.active_interval
+    assert wallet_info_spy.call_count == 1
+    fake_verus_wallet.add_block()
+    daemon.run_once()
+    assert wallet_info_spy.call_count == 2
+    for _ in range(3):
+        assert daemon.run_once() == daemon.scheduler.active_interval
+    assert wallet_info_spy.call_count == 3
+    assert daemon.mode == "active"
+
+
+def test_stake_daemon_stats_server(
+    tmp_path, fake_verus_wallet, fake_api_server, fake_env_api_file
+):
+    """
+    GIVEN StakeDaemon object with stats server and staking wallet with new confirmed stake
+    WHEN checks are run
+    THEN stake stats kept in memory across checks are served by stats server
+    """
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    stats_server = daemon.start_stats_server()
+    try:
+        fake_verus_wallet.add_stake(txid="tx00", time=1632750000)
+        daemon.run_once()
+        fake_verus_wallet.add_stake(txid="tx01", time=1632750001)
+        fake_verus_wallet.add_blocks(STAKE_CONFIRMATIONS - 1)
+        daemon.run_once()
+        with urlopen(f"{stats_server.url}?year=2021&address=RXXX") as response:
+            stats = json.load(response)
+    finally:
+        stats_server.stop()
+    assert stats == {
+        "timeframe": "2021",
+        "stakes_count": 1,
+        "stakes_amount": 12.0,
+        "address": "RXXX",
+    }
+    tx_hist_data = json.loads(tmp_path.joinpath("tx_history_test.json").read_text())
+    assert tx_hist_data["stake_stats"]["all"] == [12.0, 1]
+
+
+def test_stake_daemon_stats_server_stored_stats(
+    tmp_path, fake_verus_wallet, fake_env_api_file
+):
+    """
+    GIVEN StakeDaemon object and tx history file with stake stats of previous run
+    WHEN stats server is started
+    THEN stored stake stats are served before the first check
+    """
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    tx_hist_path = tmp_path.joinpath("tx_history_test.json")
+    tx_hist_path.write_text(
+        json.dumps(
+            {
+                "txid_stake_previous": "",
+                "txcount_previous": "0",
+                "stake_stats": {"all": [36.0, 3]},
+            }
+        )
+    )
+    stats_server = daemon.start_stats_server()
+    try:
+        with urlopen(f"{stats_server.url}?period=all") as response:
+            stats = json.load(response)
+    finally:
+        stats_server.stop()
+    assert daemon.checks == 0
+    assert stats["stakes_count"] == 3
+    assert stats["stakes_amount"] == 36.0
+
+
+def test_stake_daemon_run_once_stake_check_failed(
+    mocker, tmp_path, fake_verus_wallet, fake_env_api_file
+):
+    """
+    GIVEN StakeDaemon object and wallet replying with not valid JSON to stake checker's call
+    WHEN single check is run
+    THEN check doesn't raise and down interval is returned (backoff applies)
+    """
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    mocker.patch.object(
+        VerusStakeChecker,
+        "run",
+        side_effect=json.decoder.JSONDecodeError("Expecting value", "", 0),
+    )
+    assert daemon.run_once() == daemon.scheduler.backoff_base
+    assert daemon.mode == "down"
+    assert daemon.state is None
+
+
+def test_stake_daemon_run_once_idle(tmp_path, fake_verus_wallet, fake_env_api_file):
+    """
+    GIVEN StakeDaemon object and wallet that is not staking
+    WHEN single check is run
+    THEN idle interval is returned
+    """
+    fake_verus_wallet.set_staking(staking=False, eligible_balance=0.0)
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    assert daemon.run_once() == daemon.scheduler.idle_interval
+    assert daemon.mode == "idle"
+
+
+def test_stake_daemon_run_once_verusd_not_running(mocker, tmp_path, fake_env_api_file):
+    """
+    GIVEN StakeDaemon object and verusd process not running
+    WHEN consecutive checks are run
+    THEN backoff interval is returned and error is logged on each check
+    """
+    daemon = create_stake_daemon(tmp_path, fake_env_api_file)
+    daemon.verus_process.name = "test_process_qwerty123"
+    mocked_logger = mocker.patch.object(StakeDaemon, "logger")
+    assert daemon.run_once() == daemon.scheduler.backoff_base
+    assert daemon.run_once() == daemon.scheduler.backoff_base * 2
+    assert mocked_logger.error.call_count == 2
+    metrics = json.loads(tmp_path.joinpath("scheduler_metrics.json").read_text())
+    assert metrics["mode"] == "down"
+    assert metrics["down_count"] == 2
@@ -0,0 +1,131 @@
+import json
+import sys
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from pytest import fixture, raises
+
+# The new_stake_script directory is deployed standalone - its modules use flat imports
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent.joinpath("new_stake_script"))
+)
+from check_new_stake import StakeStats  # noqa: E402
+from stats_server import StatsServer, get_stats_response, get_timeframe  # noqa: E402
+
+
+@fixture
+def stake_stats() -> StakeStats:
+    """
+    Return StakeStats object with three stakes from two staking addresses.
+    """
+    stake_stats = StakeStats()
+    stake_stats.add_stake(stake={"time": 1632750000, "amount": 10.0, "address": "RXXX"})
+    stake_stats.add_stake(stake={"time": 1632750001, "amount": 2.5, "address": "RYYY"})
+    # Stake added by older version - without staking address
+    stake_stats.add_stake(stake={"time": 1609459200, "amount": 1.0})
+    return stake_stats
+
+
+@fixture
+def stats_server(stake_stats):
+    """
+    Return running StatsServer object (random free port).
+    """
+    server = StatsServer(stake_stats=stake_stats)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_stake_stats_add_stake(stake_stats):
+    """
+    GIVEN StakeStats object with stakes
+    WHEN stake is subtracted (orphaned stake)
+    THEN stats of stake's month, year, address and all-time periods are updated
+    """
+    assert stake_stats.get_period("2021-09") == {
+        "timeframe": "2021-09",
+        "stakes_count": 2,
+        "stakes_amount": 12.5,
+    }
+    assert stake_stats.get_period("all")["stakes_count"] == 3
+    stake_stats.add_stake(
+        stake={"time": 1632750001, "amount": 2.5, "address": "RYYY"}, count=-1
+    )
+    assert stake_stats.get_period("2021")["stakes_amount"] == 11.0
+    assert stake_stats.get_addresses("2021-09") == [
+        {"address": "RXXX", "stakes_count": 1, "stakes_amount": 10.0},
+        {"address": "RYYY", "stakes_count": 0, "stakes_amount": 0.0},
+    ]
+
+
+def test_get_timeframe():
+    """
+    GIVEN 'year' and 'month' query params
+    WHEN get_timeframe() func is invoked
+    THEN period of stats is returned or None for not valid params
+    """
+    assert get_timeframe(year="2021", month="9") == "2021-09"
+    assert get_timeframe(year="2021", month="") == "2021"
+    assert len(get_timeframe(year="", month="")) == 7
+    assert get_timeframe(year="21", month="") is None
+    assert get_timeframe(year="2021", month="13") is None
+
+
+def test_get_stats_response(stake_stats):
+    """
+    GIVEN StakeStats object with stakes
+    WHEN get_stats_response() func is invoked with different query params
+    THEN stats in API's GET method response shape or 400 status code are returned
+    """
+    assert get_stats_response(stake_stats, {"period": "all"}) == (
+        200,
+        {"timeframe": "all", "stakes_count": 3, "stakes_amount": 13.5},
+    )
+    assert get_stats_response(stake_stats, {"year": "2021", "address": "RXXX"}) == (
+        200,
+        {
+            "timeframe": "2021",
+            "stakes_count": 1,
+            "stakes_amount": 10.0,
+            "address": "RXXX",
+        },
+    )
+    status_code, data = get_stats_response(
+        stake_stats, {"year": "2021", "month": "09", "mode": "addresses"}
+    )
+    assert status_code == 200
+    assert [item["address"] for item in data["addresses"]] == ["RXXX", "RYYY"]
+    assert get_stats_response(stake_stats, {"period": "7d"})[0] == 400
+    assert get_stats_response(stake_stats, {"address": "RX#X"})[0] == 400
+
+
+def test_stats_server_get(stats_server, stake_stats):
+    """
+    GIVEN running StatsServer object
+    WHEN stats are requested before and after new stake is added
+    THEN current stats are returned
+    """
+    url = f"{stats_server.url}?year=2021&month=1"
+    with urlopen(url) as response:
+        assert response.headers["Content-Type"] == "application/json"
+        assert json.load(response)["stakes_count"] == 1
+    stake_stats.add_stake(stake={"time": 1609459201, "amount": 1.0})
+    with urlopen(url) as response:
+        assert json.load(response)["stakes_count"] == 2
+
+
+def test_stats_server_read_only(stats_server):
+    """
+    GIVEN running StatsServer object
+    WHEN POST request or request of unknown path is sent
+    THEN 405 and 404 status codes are returned
+    """
+    with raises(HTTPError) as error:
+        urlopen(Request(stats_server.url, data=b"{}", method="POST"))
+    assert error.value.code == 405
+    assert error.value.headers["Allow"] == "GET"
+    with raises(HTTPError) as error:
+        urlopen(stats_server.url.replace("/stats", "/other"))
+    assert error.value.code == 404
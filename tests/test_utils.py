@@ -0,0 +1,28 @@
+import stat
+
+from utils import EnvApiFile
+
+
+def test_env_api_file_store_owner_only(mocker, tmp_path):
+    """
+    GIVEN Existing world-readable .env-api file with optional WALLET_ID.
+    WHEN store() method is invoked.
+    THEN File is replaced with mode 0600 and WALLET_ID line is preserved.
+    """
+    env_path = tmp_path.joinpath(".env-api")
+    env_path.write_text("WALLET_ID='wallet-1'\n")
+    env_path.chmod(0o644)
+    mocker.patch.object(
+        EnvApiFile, "_filename_path", new_callable=mocker.PropertyMock
+    ).return_value = env_path
+    EnvApiFile(
+        notification_api_url="https://api.example.com",
+        cognito_client_id="client-id",
+        cognito_client_secret="client-secret",
+        cognito_token_url="https://auth.example.com/oauth2/token",
+        cognito_custom_scopes=["verus-api/api-read"],
+    ).store()
+    assert stat.S_IMODE(env_path.stat().st_mode) == 0o600
+    content = env_path.read_text()
+    assert "WALLET_ID='wallet-1'" in content
+    assert "COGNITO_CLIENT_SECRET='client-secret'" in content
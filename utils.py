@@ -1,11 +1,16 @@
+import os
 from dataclasses import dataclass
 from typing import Union, Optional, Dict, List
 from pathlib import Path, PosixPath
 
-from dotenv import set_key
+from dotenv import dotenv_values
+from dotenv.parser import parse_stream
 import hcl2
 from lark import exceptions as hcl2_exception
 
+# The stake script is deployed standalone (without this module) - config loader is kept there
+from new_stake_script.check_new_stake import load_config_file
+
 
 def get_path(name: str, directory: bool = False) -> Optional[PosixPath]:
     """
@@ -19,6 +24,13 @@ def get_path(name: str, directory: bool = False) -> Optional[PosixPath]:
             return path
 
 
+def load_env_file(path: Path) -> Dict:
+    """
+    Return variables from env file ('KEY=value' lines).
+    """
+    return load_config_file(path=path, parser=dotenv_values)
+
+
 @dataclass
 class TerraformBackendConfigFile:
     """
@@ -42,7 +54,8 @@ class TerraformBackendConfigFile:
             return False
         return True
 
-    def _check_value_syntax(self, content: dict) -> bool:
+    @staticmethod
+    def _check_value_syntax(content: dict) -> bool:
         """
         Verify that value syntax is correct - do not allow value in ${}
         """
@@ -51,20 +64,27 @@ class TerraformBackendConfigFile:
                 return False
         return True
 
+    @staticmethod
+    def _parse_file(path: Path) -> Dict:
+        """
+        Return parsed and validated HCL file content ({"error": True} if not valid).
+        """
+        try:
+            with open(path, "r") as file:
+                hcl_dict = hcl2.load(file)
+        except hcl2_exception.UnexpectedInput:
+            return {"error": True}
+        if not TerraformBackendConfigFile._check_value_syntax(hcl_dict):
+            return {"error": True}
+        return hcl_dict
+
     @property
     def file_content(self) -> Dict:
         """
-        Return HCL file content as python dict object.
+        Return HCL file content as python dict object (parsed again only when file changes).
         """
         if self.check_exist():
-            try:
-                with open(self.filename, "r") as file:
-                    hcl_dict = hcl2.load(file)
-            except hcl2_exception.UnexpectedInput:
-                return {"error": True}
-            if not self._check_value_syntax(hcl_dict):
-                return {"error": True}
-            return hcl_dict
+            return load_config_file(path=self._filename_path, parser=self._parse_file)
         else:
             return {}
 
@@ -214,6 +234,14 @@ class TerraformBackendBlock:
         return tf_files
 
 
+def format_env_line(key: str, value: str) -> str:
+    """
+    Return env file line with single-quoted value.
+    """
+    value = value.replace("'", "\\'")
+    return f"{key}='{value}'\n"
+
+
 @dataclass
 class EnvApiFile:
     """
@@ -260,14 +288,30 @@ class EnvApiFile:
 
     def store(self) -> None:
         """
-        Store env data to .env-api file.
+        Store env data to .env-api file in single write (file is replaced atomically, mode 0600).
+        Other lines of existing file (fe. optional WALLET_ID) are preserved.
         """
-        for data_key, data_value in self._env_data.items():
-            set_key(
-                dotenv_path=self._filename_path,
-                key_to_set=data_key,
-                value_to_set=data_value,
-            )
+        env_data = self._env_data
+        file_path = self._filename_path
+        lines = []
+        if file_path.exists():
+            with open(file_path, "r") as file:
+                for binding in parse_stream(file):
+                    if binding.key in env_data:
+                        value = env_data.pop(binding.key)
+                        lines.append(format_env_line(key=binding.key, value=value))
+                    else:
+                        lines.append(binding.original.string.rstrip("\n") + "\n")
+        lines.extend(
+            format_env_line(key=key, value=value) for key, value in env_data.items()
+        )
+        tmp_path = file_path.with_name(f"{file_path.name}.tmp")
+        # File holds Cognito client secret - readable by owner only (as written by dotenv's set_key)
+        fd = os.open(tmp_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w") as file:
+            file.write("".join(lines))
+        os.replace(tmp_path, file_path)
 
     def clear(self) -> None:
         """